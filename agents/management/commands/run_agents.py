@@ -41,13 +41,16 @@ class Command(BaseCommand):
                 job = AgentJob.objects.filter(status='queued').order_by('created_at').first()
                 
                 if job:
+                    # Claim the job only if it is still queued; queued rematch jobs
+                    # take merged grant ids until then, so re-read them after claiming
+                    claimed = AgentJob.objects.filter(id=job.id, status='queued').update(
+                        status='processing', started_at=timezone.now()
+                    )
+                    if not claimed:
+                        continue
+                    job.refresh_from_db()
                     self.stdout.write(f'Processing job {job.id}: {job.agent_type}')
                     
-                    # Update job status
-                    job.status = 'processing'
-                    job.started_at = timezone.now()
-                    job.save()
-                    
                     try:
                         # Process the job
                         result = processor.process_job(job)
@@ -78,13 +81,14 @@ class Command(BaseCommand):
                         job.save()
                         
                         # Log activity
-                        from collab.models import ActivityLog
-                        ActivityLog.objects.create(
-                            project=job.project,
-                            action_type='generate',
-                            section=job.agent_type,
-                            description=f'Agent job {job.agent_type} {job.status}'
-                        )
+                        if job.project_id:
+                            from collab.models import ActivityLog
+                            ActivityLog.objects.create(
+                                project=job.project,
+                                action_type='generate',
+                                section=job.agent_type,
+                                description=f'Agent job {job.agent_type} {job.status}'
+                            )
                 
                 else:
                     if run_once:
@@ -96,7 +100,9 @@ class Command(BaseCommand):
                 if run_once:
                     break
                 
-                time.sleep(sleep_time)
+                # Drain the queue; only sleep once it is empty
+                if not job:
+                    time.sleep(sleep_time)
                 
             except KeyboardInterrupt:
                 self.stdout.write(self.style.WARNING('Shutting down agent processor...'))
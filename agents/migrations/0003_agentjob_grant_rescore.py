@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='agentjob',
+            name='agent_type',
+            field=models.CharField(choices=[('script', 'Script Analysis'), ('budget', 'Budget Generation'), ('schedule', 'Schedule Generation'), ('grant_scrape', 'Grant Scraping'), ('grant_match', 'Grant Matching'), ('grant_rescore', 'Grant Rescoring'), ('festival_scrape', 'Festival Scraping'), ('festival_match', 'Festival Matching')], max_length=20),
+        ),
+    ]
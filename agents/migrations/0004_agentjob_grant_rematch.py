@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0003_agentjob_grant_rescore'),
+        ('projects', '0002_project_additional_locations_project_company_info_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='agentjob',
+            name='agent_type',
+            field=models.CharField(choices=[('script', 'Script Analysis'), ('budget', 'Budget Generation'), ('schedule', 'Schedule Generation'), ('grant_scrape', 'Grant Scraping'), ('grant_match', 'Grant Matching'), ('grant_rescore', 'Grant Rescoring'), ('grant_rematch', 'Grant Rematching'), ('festival_scrape', 'Festival Scraping'), ('festival_match', 'Festival Matching')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='agentjob',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='agent_jobs', to='projects.project'),
+        ),
+    ]
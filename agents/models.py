@@ -10,6 +10,8 @@ class AgentJob(models.Model):
         ('schedule', 'Schedule Generation'),
         ('grant_scrape', 'Grant Scraping'),
         ('grant_match', 'Grant Matching'),
+        ('grant_rescore', 'Grant Rescoring'),
+        ('grant_rematch', 'Grant Rematching'),
         ('festival_scrape', 'Festival Scraping'),
         ('festival_match', 'Festival Matching'),
     ]
@@ -22,7 +24,8 @@ class AgentJob(models.Model):
     ]
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='agent_jobs')
+    # Blank for catalog-wide jobs such as grant rematching
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='agent_jobs', null=True, blank=True)
     agent_type = models.CharField(max_length=20, choices=AGENT_TYPES)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
     input_params = models.JSONField(default=dict)
@@ -36,4 +39,5 @@ class AgentJob(models.Model):
         ordering = ['created_at']
     
     def __str__(self):
-        return f"{self.get_agent_type_display()} for {self.project.name} ({self.status})"
\ No newline at end of file
+        target = self.project.name if self.project else 'all projects'
+        return f"{self.get_agent_type_display()} for {target} ({self.status})"
\ No newline at end of file
@@ -1,15 +1,25 @@
 """
 Agent processors for handling different types of background jobs.
 """
+import datetime
 import random
 from decimal import Decimal
 from typing import Dict, Any
+from django.db import transaction
 from django.utils import timezone
+from core.utils import currency
 from projects.models import Project
-from breakdown.models import ScriptBreakdown, Scene
+from breakdown.models import ScriptBreakdown, Scene, Location
 from budgets.models import Budget, BudgetItem
+from budgets.services import BudgetEngine
+from budgets.versioning import create_budget_version, commit_lines
 from schedules.models import Schedule, ShootDay
+from schedules.services import generate_schedule, reschedule
+from schedules.shoot_calendar import assign_dates, DEFAULT_CALL_TIME
+from grants import ingest, typeahead
 from grants.models import Grant, GrantMatch
+from grants.services import rematch_grants, rescore_project
+from festivals import ingest as festival_ingest
 from festivals.models import Festival, FestivalMatch
 
 
@@ -33,6 +43,8 @@ class AgentProcessor:
                 'schedule': self._process_schedule_generation,
                 'grant_scrape': self._process_grant_scraping,
                 'grant_match': self._process_grant_matching,
+                'grant_rescore': self._process_grant_rescoring,
+                'grant_rematch': self._process_grant_rematching,
                 'festival_scrape': self._process_festival_scraping,
                 'festival_match': self._process_festival_matching,
             }
@@ -114,6 +126,10 @@ class AgentProcessor:
                 )
                 created_scenes.append(scene.id)
             
+            # Every scene location gets a Location row to carry coordinates for move times
+            for location_name in sorted({scene_data['location'] for scene_data in fake_scenes}):
+                Location.objects.get_or_create(breakdown=breakdown, name=location_name)
+            
             # Update project status
             project.project_status.script_analyzed = True
             project.project_status.save()
@@ -136,79 +152,26 @@ class AgentProcessor:
     def _process_budget_generation(self, job) -> Dict[str, Any]:
         """
         Generate budget based on script breakdown.
-        For MVP: Creates realistic budget categories and items.
+        Quantities come from the breakdown and schedule, rates from the project's rate card.
         """
         try:
             project = job.project
             
-            # Create new budget version
-            existing_budgets = Budget.objects.filter(project=project).count()
-            budget = Budget.objects.create(
-                project=project,
-                version=existing_budgets + 1,
-                created_by=None  # System generated
-            )
-            
-            # Generate budget items based on project type and scope
-            budget_items_data = [
-                # Above the Line
-                ('above_line', 'Producer', 'Producer Fee', 1, 'project', 5000),
-                ('above_line', 'Director', 'Director Fee', 1, 'project', 8000),
-                ('above_line', 'Writer', 'Script Development', 1, 'project', 2500),
-                
-                # Below the Line
-                ('below_line', 'Cast', 'Lead Actor #1', 5, 'day', 500),
-                ('below_line', 'Cast', 'Lead Actor #2', 5, 'day', 400),
-                ('below_line', 'Cast', 'Supporting Cast', 3, 'day', 200),
-                ('below_line', 'Crew', 'Director of Photography', 5, 'day', 600),
-                ('below_line', 'Crew', 'Sound Recordist', 5, 'day', 300),
-                ('below_line', 'Crew', 'Gaffer', 5, 'day', 400),
-                ('below_line', 'Equipment', 'Camera Package', 5, 'day', 400),
-                ('below_line', 'Equipment', 'Lighting Package', 5, 'day', 300),
-                ('below_line', 'Equipment', 'Sound Package', 5, 'day', 150),
-                ('below_line', 'Locations', 'Location Fees', 3, 'day', 200),
-                ('below_line', 'Catering', 'Meals and Craft Services', 5, 'day', 100),
+            # Allocate, price and commit in one transaction: the project stays locked until the
+            # lines are written, and a pricing failure leaves no empty version behind
+            with transaction.atomic():
+                budget = create_budget_version(project)
                 
-                # Post Production
-                ('post_production', 'Editing', 'Editor Fee', 2, 'week', 1500),
-                ('post_production', 'Color', 'Color Correction', 1, 'project', 2000),
-                ('post_production', 'Sound', 'Sound Design & Mix', 1, 'project', 3000),
-                ('post_production', 'Music', 'Original Score', 1, 'project', 2500),
-            ]
+                # Derive line items from the breakdown and price them from the rate card;
+                # lines that did not change are shared with the previous version
+                engine = BudgetEngine(project)
+                items, rate_card = engine.build_items(budget)
+                line_changes = commit_lines(budget, items)
             
-            total_budget = 0
-            created_items = []
-            
-            for idx, (category, subcategory, description, quantity, unit, rate) in enumerate(budget_items_data):
-                item = BudgetItem.objects.create(
-                    budget=budget,
-                    category=category,
-                    subcategory=subcategory,
-                    description=description,
-                    quantity=quantity,
-                    unit=unit,
-                    rate=rate,
-                    order_index=idx
-                )
-                total_budget += item.total
-                created_items.append(item.id)
-            
-            # Add contingency
-            contingency_amount = total_budget * Decimal(str(budget.contingency_percent / 100))
-            contingency_item = BudgetItem.objects.create(
-                budget=budget,
-                category='other',
-                subcategory='Contingency',
-                description=f'Contingency ({budget.contingency_percent}%)',
-                quantity=1,
-                unit='project',
-                rate=contingency_amount,
-                order_index=len(budget_items_data)
-            )
-            
-            total_budget += contingency_amount
-            budget.total_budget = total_budget
-            budget.save()
+            # Totals are maintained by the budget rollups
+            budget.refresh_from_db()
+            contingency_amount = items[-1].total
+            total_budget = budget.total_budget
             
             # Update project status
             project.project_status.budget_generated = True
@@ -219,8 +182,10 @@ class AgentProcessor:
                 'data': {
                     'budget_id': str(budget.id),
                     'total_budget': float(total_budget),
-                    'items_created': len(created_items) + 1,  # +1 for contingency
-                    'contingency_amount': float(contingency_amount)
+                    'items_created': line_changes['added'] + line_changes['changed'],
+                    'items_shared': line_changes['unchanged'],
+                    'contingency_amount': float(contingency_amount),
+                    'rate_card': rate_card
                 }
             }
             
@@ -233,18 +198,12 @@ class AgentProcessor:
     def _process_schedule_generation(self, job) -> Dict[str, Any]:
         """
         Generate shooting schedule based on script breakdown.
-        For MVP: Groups scenes by location and creates logical shooting days.
+        Scenes are ordered by the schedule optimizer (day/night, company moves,
+        cast days and availability, exterior weather risk).
         """
         try:
             project = job.project
-            
-            # Create new schedule version
-            existing_schedules = Schedule.objects.filter(project=project).count()
-            schedule = Schedule.objects.create(
-                project=project,
-                version=existing_schedules + 1,
-                created_by=None  # System generated
-            )
+            params = job.input_params or {}
             
             # Get scenes from breakdown (if available)
             try:
@@ -254,64 +213,35 @@ class AgentProcessor:
                 # No breakdown available, create sample days
                 scenes = []
             
-            if scenes:
-                # Group scenes by location
-                location_groups = {}
-                for scene in scenes:
-                    location = scene.location
-                    if location not in location_groups:
-                        location_groups[location] = []
-                    location_groups[location].append(scene)
-                
-                # Create shoot days
-                day_number = 1
-                created_days = []
+            if scenes and params.get('mode') == 'incremental':
+                # Repair the latest schedule around changed scenes, keeping untouched days pinned
+                schedule, result = reschedule(
+                    project,
+                    max_day_hours=float(params.get('max_day_hours', 10))
+                )
+                created_days = list(schedule.shoot_days.values_list('id', flat=True))
+                day_number = schedule.total_days + 1
                 
-                for location, location_scenes in location_groups.items():
-                    # Calculate total hours for this location
-                    total_hours = sum(float(scene.est_shoot_hours) for scene in location_scenes)
-                    
-                    # Split into multiple days if needed (max 10 hours per day)
-                    current_hours = 0
-                    current_scenes = []
-                    
-                    for scene in location_scenes:
-                        scene_hours = float(scene.est_shoot_hours)
-                        
-                        if current_hours + scene_hours > 10 and current_scenes:
-                            # Create a day with current scenes
-                            shoot_day = ShootDay.objects.create(
-                                schedule=schedule,
-                                day_number=day_number,
-                                location=location,
-                                scenes=[scene.number for scene in current_scenes],
-                                call_time=timezone.now().time().replace(hour=8, minute=0),
-                                notes=f'Scenes {min(s.number for s in current_scenes)}-{max(s.number for s in current_scenes)}',
-                                order_index=day_number - 1
-                            )
-                            created_days.append(shoot_day.id)
-                            day_number += 1
-                            current_scenes = []
-                            current_hours = 0
-                        
-                        current_scenes.append(scene)
-                        current_hours += scene_hours
-                    
-                    # Create final day for remaining scenes
-                    if current_scenes:
-                        shoot_day = ShootDay.objects.create(
-                            schedule=schedule,
-                            day_number=day_number,
-                            location=location,
-                            scenes=[scene.number for scene in current_scenes],
-                            call_time=timezone.now().time().replace(hour=8, minute=0),
-                            notes=f'Scenes {min(s.number for s in current_scenes)}-{max(s.number for s in current_scenes)}',
-                            order_index=day_number - 1
-                        )
-                        created_days.append(shoot_day.id)
-                        day_number += 1
+            elif scenes:
+                schedule, result = generate_schedule(
+                    project,
+                    time_budget=float(params.get('time_budget', 10)),
+                    seeds=int(params.get('seeds', 4)),
+                    max_day_hours=float(params.get('max_day_hours', 10))
+                )
+                created_days = result['days']
+                day_number = schedule.total_days + 1
                 
             else:
+                # Create new schedule version
+                existing_schedules = Schedule.objects.filter(project=project).count()
+                schedule = Schedule.objects.create(
+                    project=project,
+                    version=existing_schedules + 1,
+                    created_by=None  # System generated
+                )
+                result = None
+                
                 # Create sample shoot days
                 sample_days = [
                     ('Coffee Shop', [1], 'Interior dialogue scenes'),
@@ -326,13 +256,17 @@ class AgentProcessor:
                         day_number=idx + 1,
                         location=location,
                         scenes=scene_numbers,
-                        call_time=timezone.now().time().replace(hour=8, minute=0),
+                        call_time=DEFAULT_CALL_TIME,
                         notes=notes,
                         order_index=idx
                     )
                     created_days.append(shoot_day.id)
                     day_number = idx + 2
             
+            # Date the optimized schedule; sample schedules stay undated
+            if scenes and params.get('start_date'):
+                assign_dates(schedule, datetime.date.fromisoformat(params['start_date']))
+            
             schedule.total_days = day_number - 1
             schedule.save()
             
@@ -345,7 +279,10 @@ class AgentProcessor:
                 'data': {
                     'schedule_id': str(schedule.id),
                     'total_days': schedule.total_days,
-                    'shoot_days_created': len(created_days)
+                    'shoot_days_created': len(created_days),
+                    'metrics': result.get('metrics') if result else None,
+                    'baseline_metrics': result.get('baseline') if result else None,
+                    'repair': result if params.get('mode') == 'incremental' else None
                 }
             }
             
@@ -355,12 +292,45 @@ class AgentProcessor:
                 'error': f'Schedule generation failed: {str(e)}'
             }
     
+    def _scrape_sources(self, kind):
+        """
+        Scrape the configured sources of one kind.
+        
+        Returns:
+            Dict with inserted and updated totals and the per-source report,
+            or None when no sources of that kind are configured
+        """
+        from core.scraping import runner
+        from core.scraping.sources import load_sources
+        
+        sources = load_sources(kind=kind)
+        if not sources:
+            return None
+        report = runner.scrape(sources=sources)
+        return {
+            'inserted': sum(source.get('inserted', 0) for source in report.values()),
+            'updated': sum(source.get('updated', 0) for source in report.values()),
+            'sources': report,
+        }
+    
     def _process_grant_scraping(self, job) -> Dict[str, Any]:
         """
-        Scrape grant opportunities from various sources.
-        For MVP: Creates sample grant data.
+        Scrape grant opportunities from the configured sources.
+        Without configured sources, loads sample grant data.
         """
         try:
+            scraped = self._scrape_sources('grant')
+            if scraped is not None:
+                return {
+                    'success': True,
+                    'data': {
+                        'grants_scraped': scraped['inserted'],
+                        'grants_updated': scraped['updated'],
+                        'sources': scraped['sources'],
+                        'total_grants': Grant.objects.count()
+                    }
+                }
+            
             # Sample grant data for demonstration
             sample_grants = [
                 {
@@ -398,20 +368,14 @@ class AgentProcessor:
                 }
             ]
             
-            created_grants = []
-            for grant_data in sample_grants:
-                grant, created = Grant.objects.get_or_create(
-                    title=grant_data['title'],
-                    organization=grant_data['organization'],
-                    defaults=grant_data
-                )
-                if created:
-                    created_grants.append(grant.id)
+            # Upserted in one pass; grants already loaded and unchanged are left alone
+            summary = ingest.ingest(sample_grants)
             
             return {
                 'success': True,
                 'data': {
-                    'grants_scraped': len(created_grants),
+                    'grants_scraped': summary['inserted'],
+                    'grants_updated': summary['updated'],
                     'total_grants': Grant.objects.count()
                 }
             }
@@ -431,7 +395,8 @@ class AgentProcessor:
             project = job.project
             
             # Get all grants
-            grants = Grant.objects.all()
+            grants = list(Grant.objects.all())
+            usd_rates = currency.rates_to('USD', {grant.currency for grant in grants})
             created_matches = []
             
             for grant in grants:
@@ -445,7 +410,9 @@ class AgentProcessor:
                     reasoning_parts.append(f"Project type ({project.get_type_display()}) matches grant requirements")
                 
                 # Match budget range (if available)
-                if project.budget_range in ['micro', 'low'] and grant.amount_max and grant.amount_max <= 100000:
+                usd_rate = usd_rates.get(grant.currency)
+                if (project.budget_range in ['micro', 'low'] and grant.amount_max and usd_rate
+                        and grant.amount_max * usd_rate <= 100000):
                     score += 30
                     reasoning_parts.append("Budget range aligns with grant maximum")
                 
@@ -488,12 +455,64 @@ class AgentProcessor:
                 'error': f'Grant matching failed: {str(e)}'
             }
     
+    def _process_grant_rescoring(self, job) -> Dict[str, Any]:
+        """
+        Rescore a project's grant matches after its grant preferences or
+        core data changed. input_params['previous'] holds the old values.
+        """
+        try:
+            summary = rescore_project(job.project, job.input_params.get('previous', {}))
+            return {
+                'success': True,
+                'data': summary
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Grant rescoring failed: {str(e)}'
+            }
+    
+    def _process_grant_rematching(self, job) -> Dict[str, Any]:
+        """
+        Publish the typeahead snapshot once for a batch of grant changes and
+        reverse-match added or changed grants against every grant-enabled
+        project. input_params['grant_ids'] lists saved grants and
+        input_params['deleted_ids'] deleted ones.
+        """
+        try:
+            saved = job.input_params.get('grant_ids', [])
+            typeahead.apply_changes([*saved, *job.input_params.get('deleted_ids', [])])
+            summary = rematch_grants(saved)
+            return {
+                'success': True,
+                'data': summary
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Grant rematching failed: {str(e)}'
+            }
+    
     def _process_festival_scraping(self, job) -> Dict[str, Any]:
         """
-        Scrape festival opportunities.
-        For MVP: Creates sample festival data.
+        Scrape festival opportunities from the configured sources.
+        Without configured sources, loads sample festival data.
         """
         try:
+            scraped = self._scrape_sources('festival')
+            if scraped is not None:
+                return {
+                    'success': True,
+                    'data': {
+                        'festivals_scraped': scraped['inserted'],
+                        'festivals_updated': scraped['updated'],
+                        'sources': scraped['sources'],
+                        'total_festivals': Festival.objects.count()
+                    }
+                }
+            
             # Sample festival data
             sample_festivals = [
                 {
@@ -536,20 +555,13 @@ class AgentProcessor:
                 }
             ]
             
-            created_festivals = []
-            for festival_data in sample_festivals:
-                festival, created = Festival.objects.get_or_create(
-                    name=festival_data['name'],
-                    location=festival_data['location'],
-                    defaults=festival_data
-                )
-                if created:
-                    created_festivals.append(festival.id)
+            summary = festival_ingest.ingest(sample_festivals)
             
             return {
                 'success': True,
                 'data': {
-                    'festivals_scraped': len(created_festivals),
+                    'festivals_scraped': summary['inserted'],
+                    'festivals_updated': summary['updated'],
                     'total_festivals': Festival.objects.count()
                 }
             }
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class BreakdownConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'breakdown'
\ No newline at end of file
+    name = 'breakdown'
+
+    def ready(self):
+        from breakdown import signals  # noqa: F401
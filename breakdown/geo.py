@@ -0,0 +1,144 @@
+"""
+Location coordinates and the cached distance/travel-time matrix.
+
+Coordinates come from Location.latitude/longitude when entered manually,
+otherwise from an offline gazetteer (settings.GAZETTEER_FILE) matched
+against the location's address, city or name. The per-breakdown matrix is
+computed once with vectorized haversine and reused until a Location changes.
+"""
+import csv
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from breakdown.models import LocationDistanceMatrix
+
+
+EARTH_RADIUS_KM = 6371.0
+ROAD_FACTOR = 1.3  # Straight-line to road distance
+AVERAGE_SPEED_KMH = 35.0  # Loaded trucks in town
+MOVE_OVERHEAD_MINUTES = 45.0  # Wrap, load, unload and set up at the next location
+
+_lock = threading.Lock()
+_gazetteer = None
+
+
+def load_gazetteer():
+    """Place name (lowercase) -> (lat, lon), cached per process"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _lock:
+            if _gazetteer is None:
+                places = {}
+                path = getattr(settings, 'GAZETTEER_FILE', None)
+                if path:
+                    try:
+                        with open(path, newline='', encoding='utf-8') as handle:
+                            for row in csv.DictReader(handle):
+                                places[row['name'].strip().lower()] = (float(row['latitude']), float(row['longitude']))
+                    except FileNotFoundError:
+                        pass
+                _gazetteer = places
+    return _gazetteer
+
+
+def clear_cache():
+    global _gazetteer
+    with _lock:
+        _gazetteer = None
+
+
+def resolve_coordinates(location):
+    """
+    (lat, lon, source) for a Location, or None.
+    Manual coordinates win; otherwise the address parts, city, neighborhood
+    and name are tried against the gazetteer, most specific first.
+    """
+    if location.latitude is not None and location.longitude is not None:
+        return float(location.latitude), float(location.longitude), 'manual'
+
+    gazetteer = load_gazetteer()
+    meta = location.meta or {}
+    candidates = []
+    address = str(meta.get('address', ''))
+    if address:
+        candidates.append(address)
+        candidates.extend(part for part in address.split(','))
+    candidates.extend(str(meta.get(key, '')) for key in ('neighborhood', 'city'))
+    candidates.append(location.name)
+
+    for candidate in candidates:
+        coordinates = gazetteer.get(candidate.strip().lower())
+        if coordinates:
+            return coordinates[0], coordinates[1], 'gazetteer'
+    return None
+
+
+def haversine_matrix(latitudes, longitudes):
+    """Pairwise great-circle distances in km (NaN propagates for unknown points)"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def travel_minutes(distances_km):
+    """Company move time: fixed overhead plus road travel; 0 on the diagonal"""
+    minutes = MOVE_OVERHEAD_MINUTES + distances_km * ROAD_FACTOR / AVERAGE_SPEED_KMH * 60
+    np.fill_diagonal(minutes, 0.0)
+    return minutes
+
+
+def build_distance_matrix(breakdown):
+    locations = list(breakdown.locations.order_by('name'))
+    names = [location.name for location in locations]
+    coordinates = [resolve_coordinates(location) for location in locations]
+
+    latitudes = [c[0] if c else np.nan for c in coordinates]
+    longitudes = [c[1] if c else np.nan for c in coordinates]
+    distances = haversine_matrix(latitudes, longitudes) if names else np.zeros((0, 0))
+    minutes = travel_minutes(distances) if names else np.zeros((0, 0))
+
+    matrix, _ = LocationDistanceMatrix.objects.update_or_create(
+        breakdown=breakdown,
+        defaults={
+            'names': names,
+            'coordinates': [list(c) if c else None for c in coordinates],
+            'distances_km': distances.astype(np.float32).tobytes(),
+            'travel_minutes': minutes.astype(np.float32).tobytes(),
+        }
+    )
+    return matrix
+
+
+def get_distance_matrix(breakdown):
+    """Cached matrix for a breakdown, rebuilt after a Location change invalidated it"""
+    return LocationDistanceMatrix.objects.filter(breakdown=breakdown).first() or build_distance_matrix(breakdown)
+
+
+def travel_hours(breakdown, names=None):
+    """
+    Company-move hours between locations as {origin: {destination: hours}},
+    for the schedule optimizer. Only pairs with coordinates on both ends are
+    included; callers fall back to their default move time for the rest.
+    """
+    matrix = get_distance_matrix(breakdown)
+    size = len(matrix.names)
+    minutes = np.frombuffer(bytes(matrix.travel_minutes), dtype=np.float32).reshape(size, size)
+    wanted = set(matrix.names if names is None else names)
+
+    hours = {}
+    for row, origin in enumerate(matrix.names):
+        if origin not in wanted:
+            continue
+        known = {
+            destination: round(float(minutes[row, col]) / 60.0, 3)
+            for col, destination in enumerate(matrix.names)
+            if destination in wanted and not np.isnan(minutes[row, col])
+        }
+        if known:
+            hours[origin] = known
+    return hours
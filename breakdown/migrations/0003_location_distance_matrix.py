@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('breakdown', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.CreateModel(
+            name='LocationDistanceMatrix',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('names', models.JSONField(default=list)),
+                ('coordinates', models.JSONField(default=list)),
+                ('distances_km', models.BinaryField()),
+                ('travel_minutes', models.BinaryField()),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('breakdown', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='distance_matrix', to='breakdown.scriptbreakdown')),
+            ],
+        ),
+    ]
@@ -80,9 +80,29 @@ class Location(models.Model):
     name = models.CharField(max_length=200)
     type = models.CharField(max_length=20, choices=LOCATION_TYPES, default='practical')
     meta = models.JSONField(default=dict, blank=True)  # Address, contact, requirements
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)  # Manual entry; gazetteer otherwise
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     
     class Meta:
         unique_together = ['breakdown', 'name']
     
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class LocationDistanceMatrix(models.Model):
+    """
+    Cached pairwise distances and travel times between a breakdown's locations.
+    Matrices are float32, row-major, in the order of ``names``; NaN where a
+    location has no coordinates. Dropped whenever a Location changes (see
+    breakdown.signals) and rebuilt on next use.
+    """
+    breakdown = models.OneToOneField(ScriptBreakdown, on_delete=models.CASCADE, related_name='distance_matrix')
+    names = models.JSONField(default=list)
+    coordinates = models.JSONField(default=list)  # [lat, lon, source] or None per location
+    distances_km = models.BinaryField()
+    travel_minutes = models.BinaryField()
+    built_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Distance matrix for {self.breakdown}"
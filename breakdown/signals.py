@@ -0,0 +1,12 @@
+"""
+Drop cached location geometry when locations change
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from breakdown.models import Location, LocationDistanceMatrix
+
+
+@receiver([post_save, post_delete], sender=Location)
+def invalidate_distance_matrix(sender, instance, **kwargs):
+    LocationDistanceMatrix.objects.filter(breakdown_id=instance.breakdown_id).delete()
@@ -0,0 +1,131 @@
+"""
+Budget version diff engine
+"""
+from decimal import Decimal
+
+from budgets.models import BudgetItem
+
+
+DIFF_FIELDS = ['category', 'subcategory', 'description', 'quantity', 'unit', 'rate', 'total', 'notes', 'uncertainty']
+LINE_FIELDS = ['id', 'line_key', 'order_index'] + DIFF_FIELDS
+
+
+def _line(row):
+    return {
+        'line_key': str(row['line_key']),
+        'category': row['category'],
+        'subcategory': row['subcategory'],
+        'description': row['description'],
+        'quantity': float(row['quantity']),
+        'unit': row['unit'],
+        'rate': float(row['rate']),
+        'total': float(row['total']),
+    }
+
+
+def _json_value(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def diff_budgets(old_budget, new_budget):
+    """
+    Compare two versions of a budget line by line.
+
+    Lines are matched on BudgetItem.line_key. Rows shared between the two
+    versions (copy-on-write) are recognised by id and skipped without a
+    field comparison.
+
+    Returns:
+        Dict with 'added', 'removed' and 'changed' lines, 'unchanged_count'
+        and per-category rollups of the deltas
+    """
+    old_rows = {
+        row['line_key']: row
+        for row in old_budget.line_items().order_by().values(*LINE_FIELDS)
+    }
+    new_rows = new_budget.line_items().order_by('category', 'order_index').values(*LINE_FIELDS)
+
+    labels = dict(BudgetItem.BUDGET_CATEGORIES)
+    categories = {}
+
+    def category_entry(category):
+        return categories.setdefault(category, {
+            'category': category,
+            'label': labels.get(category, category),
+            'total_from': Decimal('0.00'),
+            'total_to': Decimal('0.00'),
+            'added': 0,
+            'removed': 0,
+            'changed': 0,
+        })
+
+    added = []
+    changed = []
+    unchanged_count = 0
+
+    for row in new_rows:
+        category_entry(row['category'])['total_to'] += row['total']
+        old = old_rows.pop(row['line_key'], None)
+
+        if old is None:
+            category_entry(row['category'])['added'] += 1
+            added.append(_line(row))
+            continue
+
+        category_entry(old['category'])['total_from'] += old['total']
+        if old['id'] == row['id']:
+            unchanged_count += 1
+            continue
+
+        changes = {
+            field: [_json_value(old[field]), _json_value(row[field])]
+            for field in DIFF_FIELDS
+            if old[field] != row[field]
+        }
+        if not changes:
+            unchanged_count += 1
+            continue
+
+        category_entry(row['category'])['changed'] += 1
+        line = _line(row)
+        line['changes'] = changes
+        line['total_delta'] = float(row['total'] - old['total'])
+        changed.append(line)
+
+    # Whatever is left in the old version was removed
+    removed = []
+    for row in sorted(old_rows.values(), key=lambda r: (r['category'], r['order_index'])):
+        entry = category_entry(row['category'])
+        entry['total_from'] += row['total']
+        entry['removed'] += 1
+        removed.append(_line(row))
+
+    category_rollups = []
+    for entry in sorted(categories.values(), key=lambda e: e['category']):
+        delta = entry['total_to'] - entry['total_from']
+        category_rollups.append({
+            'category': entry['category'],
+            'label': entry['label'],
+            'total_from': float(entry['total_from']),
+            'total_to': float(entry['total_to']),
+            'delta': float(delta),
+            'added': entry['added'],
+            'removed': entry['removed'],
+            'changed': entry['changed'],
+        })
+
+    total_from = sum((e['total_from'] for e in categories.values()), Decimal('0.00'))
+    total_to = sum((e['total_to'] for e in categories.values()), Decimal('0.00'))
+
+    return {
+        'from_version': old_budget.version,
+        'to_version': new_budget.version,
+        'total_from': float(total_from),
+        'total_to': float(total_to),
+        'total_delta': float(total_to - total_from),
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'unchanged_count': unchanged_count,
+        'categories': category_rollups,
+    }
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from decimal import Decimal
+from budgets.models import RateCard, RateCardLine
+from budgets.services import DEFAULT_RATE_LINES, BUDGET_RANGE_MULTIPLIERS
+from core.utils.currency import BASE_CURRENCY, get_rate_table
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Publish a new version of the default rate card for every budget range'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--currency',
+            default='USD',
+            help='Currency to quote the rates in; USD defaults are converted (default: USD)',
+        )
+
+    def handle(self, *args, **options):
+        currency = options['currency'].upper()
+
+        # The default rates are USD figures; convert them once at today's rate
+        try:
+            fx_rate = get_rate_table().rate(BASE_CURRENCY, currency)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        with transaction.atomic():
+            for budget_range, label in Project.BUDGET_RANGES:
+                latest = RateCard.objects.filter(
+                    budget_range=budget_range,
+                    currency=currency
+                ).aggregate(Max('version'))['version__max'] or 0
+
+                # Only the newest version stays active
+                RateCard.objects.filter(budget_range=budget_range, currency=currency).update(is_active=False)
+                rate_card = RateCard.objects.create(
+                    name=f'Default {label}',
+                    budget_range=budget_range,
+                    currency=currency,
+                    version=latest + 1
+                )
+
+                scale = BUDGET_RANGE_MULTIPLIERS[budget_range]
+                RateCardLine.objects.bulk_create([
+                    RateCardLine(
+                        rate_card=rate_card,
+                        category=category,
+                        subcategory=subcategory,
+                        description=description,
+                        unit=unit,
+                        rate=(Decimal(rate) * scale * fx_rate).quantize(Decimal('0.01')),
+                        basis=basis,
+                        multiplier=Decimal(multiplier),
+                        cast_tier=cast_tier,
+                        order_index=idx
+                    )
+                    for idx, (category, subcategory, description, unit, rate, basis, multiplier, cast_tier)
+                    in enumerate(DEFAULT_RATE_LINES)
+                ])
+
+                self.stdout.write(
+                    self.style.SUCCESS(f'Created rate card: {rate_card}')
+                )
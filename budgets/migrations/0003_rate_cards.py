@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:50
+
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateCard',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('budget_range', models.CharField(choices=[('micro', 'Micro ($0-50K)'), ('low', 'Low Budget ($50K-250K)'), ('medium', 'Medium Budget ($250K-1M)'), ('high', 'High Budget ($1M-5M)'), ('major', 'Major Budget ($5M+)')], max_length=20)),
+                ('currency', models.CharField(default='USD', max_length=3)),
+                ('version', models.IntegerField(default=1)),
+                ('is_active', models.BooleanField(default=True)),
+                ('effective_from', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['budget_range', 'currency', '-version'],
+                'unique_together': {('budget_range', 'currency', 'version')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RateCardLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('above_line', 'Above the Line'), ('below_line', 'Below the Line'), ('post_production', 'Post Production'), ('other', 'Other')], max_length=50)),
+                ('subcategory', models.CharField(max_length=100)),
+                ('description', models.CharField(max_length=200)),
+                ('unit', models.CharField(default='day', max_length=50)),
+                ('rate', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('basis', models.CharField(choices=[('flat', 'Flat (per project)'), ('cast_days', 'Cast Days (per character)'), ('location_days', 'Shoot Days (per location)'), ('shoot_days', 'Shoot Days'), ('crew_days', 'Crew Days'), ('person_days', 'Person Days'), ('post_weeks', 'Post-Production Weeks')], default='flat', max_length=20)),
+                ('multiplier', models.DecimalField(decimal_places=2, default=Decimal('1.00'), max_digits=6)),
+                ('cast_tier', models.CharField(blank=True, choices=[('lead', 'Lead'), ('supporting', 'Supporting'), ('day_player', 'Day Player')], max_length=20)),
+                ('order_index', models.IntegerField(default=0)),
+                ('rate_card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='budgets.ratecard')),
+            ],
+            options={
+                'ordering': ['rate_card', 'order_index'],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:51
+
+import uuid
+from django.db import migrations, models
+
+
+LINE_KEY_NAMESPACE = uuid.UUID('5b0d7a4e-2f1c-4c8e-9a43-8d1e6f0b7c21')
+
+
+def assign_version_ranges(apps, schema_editor):
+    """Existing versions hold full copies, so each row is visible in its own version only"""
+    Budget = apps.get_model('budgets', 'Budget')
+    BudgetItem = apps.get_model('budgets', 'BudgetItem')
+
+    next_versions = {}
+    budgets = Budget.objects.order_by('project_id', 'version').values_list('id', 'project_id', 'version')
+    previous = None
+    for budget_id, project_id, version in budgets:
+        if previous and previous[1] == project_id:
+            next_versions[previous[0]] = version
+        previous = (budget_id, project_id, version)
+
+    for budget_id, project_id, version in budgets:
+        items = list(BudgetItem.objects.filter(budget_id=budget_id).order_by('order_index', 'created_at', 'id'))
+        seen = {}
+        for item in items:
+            name = f'{project_id}:{item.category}:{item.subcategory}:{item.description}'
+            # Repeated lines get an ordinal so every row keeps a key of its own
+            ordinal = seen[name] = seen.get(name, -1) + 1
+            if ordinal:
+                name = f'{name}:{ordinal}'
+            item.line_key = uuid.uuid5(LINE_KEY_NAMESPACE, name)
+            item.version_from = version
+            item.version_to = next_versions.get(budget_id)
+        BudgetItem.objects.bulk_update(items, ['line_key', 'version_from', 'version_to'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0003_rate_cards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budgetitem',
+            name='line_key',
+            field=models.UUIDField(db_index=True, default=uuid.uuid4),
+        ),
+        migrations.AddField(
+            model_name='budgetitem',
+            name='version_from',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='budgetitem',
+            name='version_to',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='budgetitem',
+            index=models.Index(fields=['budget', 'version_from', 'version_to'], name='budgets_bud_budget__4cd725_idx'),
+        ),
+        migrations.RunPython(assign_version_ranges, migrations.RunPython.noop),
+    ]
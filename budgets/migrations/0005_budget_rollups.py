@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:52
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def build_rollups(apps, schema_editor):
+    Budget = apps.get_model('budgets', 'Budget')
+    BudgetItem = apps.get_model('budgets', 'BudgetItem')
+    BudgetRollup = apps.get_model('budgets', 'BudgetRollup')
+
+    for budget in Budget.objects.all():
+        rows = BudgetItem.objects.filter(
+            Q(version_to__isnull=True) | Q(version_to__gt=budget.version),
+            budget__project_id=budget.project_id,
+            version_from__lte=budget.version
+        ).order_by().values('category', 'subcategory').annotate(total=Sum('total'), item_count=Count('id'))
+
+        rollups = {}
+        for row in rows:
+            category_row = rollups.setdefault(
+                (row['category'], ''),
+                BudgetRollup(budget=budget, category=row['category'], subcategory='', total=Decimal('0.00'), item_count=0)
+            )
+            category_row.total += row['total']
+            category_row.item_count += row['item_count']
+            rollups[(row['category'], row['subcategory'])] = BudgetRollup(
+                budget=budget,
+                category=row['category'],
+                subcategory=row['subcategory'],
+                total=row['total'],
+                item_count=row['item_count']
+            )
+        BudgetRollup.objects.bulk_create(rollups.values())
+        budget.total_budget = sum((r.total for key, r in rollups.items() if not key[1]), Decimal('0.00'))
+        budget.save(update_fields=['total_budget'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0004_copy_on_write_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('above_line', 'Above the Line'), ('below_line', 'Below the Line'), ('post_production', 'Post Production'), ('other', 'Other')], max_length=50)),
+                ('subcategory', models.CharField(blank=True, max_length=100)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('item_count', models.IntegerField(default=0)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='budgets.budget')),
+            ],
+            options={
+                'ordering': ['category', 'subcategory'],
+                'unique_together': {('budget', 'category', 'subcategory')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
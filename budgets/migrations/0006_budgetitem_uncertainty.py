@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0005_budget_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budgetitem',
+            name='uncertainty',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
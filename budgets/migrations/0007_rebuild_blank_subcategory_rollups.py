@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def rebuild_rollups(apps, schema_editor):
+    """
+    Rebuild rollups of budgets whose items include a blank subcategory.
+    Those items were counted twice in the category total row.
+    """
+    Budget = apps.get_model('budgets', 'Budget')
+    BudgetItem = apps.get_model('budgets', 'BudgetItem')
+    BudgetRollup = apps.get_model('budgets', 'BudgetRollup')
+
+    project_ids = set(BudgetItem.objects.filter(subcategory='').values_list('budget__project_id', flat=True))
+    for budget in Budget.objects.filter(project_id__in=project_ids):
+        rows = BudgetItem.objects.filter(
+            Q(version_to__isnull=True) | Q(version_to__gt=budget.version),
+            budget__project_id=budget.project_id,
+            version_from__lte=budget.version
+        ).order_by().values('category', 'subcategory').annotate(total=Sum('total'), item_count=Count('id'))
+
+        rollups = {}
+        for row in rows:
+            category_row = rollups.setdefault(
+                (row['category'], ''),
+                BudgetRollup(budget=budget, category=row['category'], subcategory='', total=Decimal('0.00'), item_count=0)
+            )
+            category_row.total += row['total']
+            category_row.item_count += row['item_count']
+            if row['subcategory']:
+                rollups[(row['category'], row['subcategory'])] = BudgetRollup(
+                    budget=budget,
+                    category=row['category'],
+                    subcategory=row['subcategory'],
+                    total=row['total'],
+                    item_count=row['item_count']
+                )
+        BudgetRollup.objects.filter(budget=budget).delete()
+        BudgetRollup.objects.bulk_create(rollups.values())
+        budget.total_budget = sum((r.total for key, r in rollups.items() if not key[1]), Decimal('0.00'))
+        budget.save(update_fields=['total_budget'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0006_budgetitem_uncertainty'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_project_ids(apps, schema_editor):
+    """Fill BudgetItem.project from the budget that introduced each row"""
+    Budget = apps.get_model('budgets', 'Budget')
+    BudgetItem = apps.get_model('budgets', 'BudgetItem')
+    BudgetItem.objects.update(
+        project_id=Subquery(Budget.objects.filter(pk=OuterRef('budget_id')).values('project_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_additional_locations_project_company_info_and_more'),
+        ('budgets', '0007_rebuild_blank_subcategory_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budgetitem',
+            name='project',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='budget_items', to='projects.project'),
+        ),
+        migrations.RunPython(copy_project_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='budgetitem',
+            name='project',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='budget_items', to='projects.project'),
+        ),
+        migrations.RemoveIndex(
+            model_name='budgetitem',
+            name='budgets_bud_budget__4cd725_idx',
+        ),
+        migrations.AddIndex(
+            model_name='budgetitem',
+            index=models.Index(fields=['project', 'version_from', 'version_to'], name='budgets_bud_project_29b293_idx'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 import uuid
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from projects.models import Project
 
@@ -27,6 +27,22 @@ class Budget(models.Model):
     
     def __str__(self):
         return f"Budget v{self.version} for {self.project.name}"
+    
+    def line_items(self):
+        """Items visible in this version, including rows shared with earlier versions"""
+        return BudgetItem.objects.filter(
+            project_id=self.project_id,
+            version_from__lte=self.version
+        ).filter(
+            models.Q(version_to__isnull=True) | models.Q(version_to__gt=self.version)
+        )
+    
+    def delete(self, *args, **kwargs):
+        # Items are shared with later versions, so only the newest version can be removed
+        if Budget.objects.filter(project_id=self.project_id, version__gt=self.version).exists():
+            raise ValueError("Only the latest budget version can be deleted")
+        BudgetItem.objects.filter(version_to=self.version, project_id=self.project_id).update(version_to=None)
+        return super().delete(*args, **kwargs)
 
 
 class BudgetItem(models.Model):
@@ -38,7 +54,11 @@ class BudgetItem(models.Model):
     ]
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='items')
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='items')  # Version that introduced the row
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='budget_items', editable=False)  # budget.project, for version lookups without a join
+    line_key = models.UUIDField(default=uuid.uuid4, db_index=True)  # Stable line identity across versions
+    version_from = models.IntegerField(default=1)  # First version the row is visible in
+    version_to = models.IntegerField(null=True, blank=True)  # First version it is no longer visible in
     category = models.CharField(max_length=50, choices=BUDGET_CATEGORIES)
     subcategory = models.CharField(max_length=100)
     description = models.CharField(max_length=200)
@@ -47,16 +67,115 @@ class BudgetItem(models.Model):
     rate = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
     notes = models.TextField(blank=True)
+    uncertainty = models.JSONField(default=dict, blank=True)  # {'quantity': [low, high], 'rate': [low, high]} multipliers
     order_index = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['category', 'order_index']
+        indexes = [
+            models.Index(fields=['project', 'version_from', 'version_to']),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the row contributed to its rollups so saves can apply deltas
+        instance._rollup_state = instance._rollup_key()
+        return instance
+    
+    def _rollup_key(self):
+        return (self.category, self.subcategory, self.total, self.version_from, self.version_to)
     
     def save(self, *args, **kwargs):
+        from budgets import rollups
+        
         # Calculate total automatically
         self.total = self.quantity * self.rate
-        super().save(*args, **kwargs)
+        if self.project_id is None:
+            self.project_id = self.budget.project_id
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            rollups.apply_item_change(self, getattr(self, '_rollup_state', None), self._rollup_key())
+        self._rollup_state = self._rollup_key()
+    
+    def delete(self, *args, **kwargs):
+        from budgets import rollups
+        
+        with transaction.atomic():
+            rollups.apply_item_change(self, getattr(self, '_rollup_state', None), None)
+            return super().delete(*args, **kwargs)
     
     def __str__(self):
-        return f"{self.category}: {self.description}"
\ No newline at end of file
+        return f"{self.category}: {self.description}"
+
+class RateCard(models.Model):
+    """Versioned pricing table used by the budget engine"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=200)
+    budget_range = models.CharField(max_length=20, choices=Project.BUDGET_RANGES)
+    currency = models.CharField(max_length=3, default='USD')
+    version = models.IntegerField(default=1)
+    is_active = models.BooleanField(default=True)
+    effective_from = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['budget_range', 'currency', '-version']
+        unique_together = ['budget_range', 'currency', 'version']
+
+    def __str__(self):
+        return f"{self.name} v{self.version} ({self.budget_range}, {self.currency})"
+
+
+class RateCardLine(models.Model):
+    QUANTITY_BASES = [
+        ('flat', 'Flat (per project)'),
+        ('cast_days', 'Cast Days (per character)'),
+        ('location_days', 'Shoot Days (per location)'),
+        ('shoot_days', 'Shoot Days'),
+        ('crew_days', 'Crew Days'),
+        ('person_days', 'Person Days'),
+        ('post_weeks', 'Post-Production Weeks'),
+    ]
+
+    CAST_TIERS = [
+        ('lead', 'Lead'),
+        ('supporting', 'Supporting'),
+        ('day_player', 'Day Player'),
+    ]
+
+    rate_card = models.ForeignKey(RateCard, on_delete=models.CASCADE, related_name='lines')
+    category = models.CharField(max_length=50, choices=BudgetItem.BUDGET_CATEGORIES)
+    subcategory = models.CharField(max_length=100)
+    description = models.CharField(max_length=200)
+    unit = models.CharField(max_length=50, default='day')
+    rate = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    basis = models.CharField(max_length=20, choices=QUANTITY_BASES, default='flat')
+    multiplier = models.DecimalField(max_digits=6, decimal_places=2, default=Decimal('1.00'))  # e.g. prep days on crew
+    cast_tier = models.CharField(max_length=20, choices=CAST_TIERS, blank=True)  # Only for cast_days lines
+    order_index = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['rate_card', 'order_index']
+
+    def __str__(self):
+        return f"{self.rate_card}: {self.description}"
+
+
+class BudgetRollup(models.Model):
+    """Materialized per-category and per-subcategory totals for a budget version"""
+
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='rollups')
+    category = models.CharField(max_length=50, choices=BudgetItem.BUDGET_CATEGORIES)
+    subcategory = models.CharField(max_length=100, blank=True)  # Blank only for the category total row
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    item_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['category', 'subcategory']
+        unique_together = ['budget', 'category', 'subcategory']
+
+    def __str__(self):
+        return f"{self.budget} {self.category}/{self.subcategory or '*'}: {self.total}"
@@ -0,0 +1,187 @@
+"""
+Materialized budget rollups.
+
+Each budget version keeps one BudgetRollup row per category (blank
+subcategory) and per category/subcategory pair. Items without a subcategory
+only count towards their category row, so the blank subcategory is never
+both a category total and a subcategory. Rows are adjusted by delta
+whenever items are inserted, updated or removed, so reading totals costs
+O(categories) instead of a scan over every item.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum, Count
+
+from budgets.models import Budget, BudgetRollup
+
+
+def _empty_deltas():
+    return defaultdict(lambda: [Decimal('0.00'), 0])
+
+
+def rollup_keys(category, subcategory):
+    """Rollup rows an item counts towards: its category total and, if set, its subcategory"""
+    if subcategory:
+        return ((category, ''), (category, subcategory))
+    return ((category, ''),)
+
+
+def collect_deltas(items, sign=1, deltas=None):
+    """Accumulate (total, count) deltas per rollup key for a batch of items"""
+    deltas = deltas if deltas is not None else _empty_deltas()
+    for item in items:
+        for key in rollup_keys(item.category, item.subcategory):
+            deltas[key][0] += sign * item.total
+            deltas[key][1] += sign
+    return deltas
+
+
+@transaction.atomic
+def apply_deltas(project_id, version_from, version_to, deltas):
+    """
+    Apply rollup deltas to every version of a project in [version_from, version_to).
+
+    Args:
+        project_id: Project the versions belong to
+        version_from: First affected version
+        version_to: First unaffected version, or None for all later versions
+        deltas: Mapping of (category, subcategory) -> [total_delta, count_delta]
+    """
+    deltas = {key: value for key, value in deltas.items() if value[0] or value[1]}
+    if not deltas:
+        return
+
+    budgets = Budget.objects.filter(project_id=project_id, version__gte=version_from)
+    if version_to is not None:
+        budgets = budgets.filter(version__lt=version_to)
+    budget_ids = list(budgets.values_list('id', flat=True))
+    if not budget_ids:
+        return
+
+    BudgetRollup.objects.bulk_create(
+        [
+            BudgetRollup(budget_id=budget_id, category=category, subcategory=subcategory)
+            for budget_id in budget_ids
+            for category, subcategory in deltas
+        ],
+        ignore_conflicts=True
+    )
+    for (category, subcategory), (total_delta, count_delta) in deltas.items():
+        BudgetRollup.objects.filter(
+            budget_id__in=budget_ids,
+            category=category,
+            subcategory=subcategory
+        ).update(total=F('total') + total_delta, item_count=F('item_count') + count_delta)
+
+    budget_delta = sum(
+        (total for (category, subcategory), (total, count) in deltas.items() if not subcategory),
+        Decimal('0.00')
+    )
+    if budget_delta:
+        Budget.objects.filter(id__in=budget_ids).update(total_budget=F('total_budget') + budget_delta)
+
+
+def apply_item_change(item, old_state, new_state):
+    """
+    Adjust rollups for a single item save or delete.
+    States are (category, subcategory, total, version_from, version_to) tuples, or None.
+    """
+    if old_state == new_state:
+        return
+    project_id = Budget.objects.filter(id=item.budget_id).values_list('project_id', flat=True).first()
+
+    for state, sign in ((old_state, -1), (new_state, 1)):
+        if state is None:
+            continue
+        category, subcategory, total, version_from, version_to = state
+        deltas = _empty_deltas()
+        for key in rollup_keys(category, subcategory):
+            deltas[key][0] += sign * total
+            deltas[key][1] += sign
+        apply_deltas(project_id, version_from, version_to, deltas)
+
+
+@transaction.atomic
+def seed_from_previous(budget, previous):
+    """Start a new version's rollups as a copy of the version it was derived from"""
+    BudgetRollup.objects.filter(budget=budget).delete()
+    if previous is None:
+        budget.total_budget = Decimal('0.00')
+        Budget.objects.filter(id=budget.id).update(total_budget=budget.total_budget)
+        return
+    BudgetRollup.objects.bulk_create([
+        BudgetRollup(
+            budget=budget,
+            category=rollup.category,
+            subcategory=rollup.subcategory,
+            total=rollup.total,
+            item_count=rollup.item_count
+        )
+        for rollup in previous.rollups.all()
+    ])
+    Budget.objects.filter(id=budget.id).update(total_budget=previous.total_budget)
+
+
+@transaction.atomic
+def rebuild(budget):
+    """Recompute a version's rollups from its items with one grouped query"""
+    BudgetRollup.objects.filter(budget=budget).delete()
+    rows = budget.line_items().order_by().values('category', 'subcategory').annotate(
+        total=Sum('total'),
+        item_count=Count('id')
+    )
+
+    rollups = {}
+    for row in rows:
+        category_row = rollups.setdefault(
+            (row['category'], ''),
+            BudgetRollup(budget=budget, category=row['category'], subcategory='')
+        )
+        category_row.total += row['total']
+        category_row.item_count += row['item_count']
+        if not row['subcategory']:
+            continue
+        rollups[(row['category'], row['subcategory'])] = BudgetRollup(
+            budget=budget,
+            category=row['category'],
+            subcategory=row['subcategory'],
+            total=row['total'],
+            item_count=row['item_count']
+        )
+    BudgetRollup.objects.bulk_create(rollups.values())
+
+    total = sum((r.total for key, r in rollups.items() if not key[1]), Decimal('0.00'))
+    Budget.objects.filter(id=budget.id).update(total_budget=total)
+    budget.total_budget = total
+    return total
+
+
+def summary(budget):
+    """
+    Category and subcategory totals for the budget tab, read from rollups.
+
+    Returns:
+        List of dicts: {'category', 'label', 'total', 'item_count', 'subcategories': [...]}
+    """
+    labels = dict(BudgetRollup._meta.get_field('category').choices)
+    categories = {}
+    for rollup in budget.rollups.filter(item_count__gt=0):
+        entry = categories.setdefault(rollup.category, {
+            'category': rollup.category,
+            'label': labels.get(rollup.category, rollup.category),
+            'total': Decimal('0.00'),
+            'item_count': 0,
+            'subcategories': [],
+        })
+        if rollup.subcategory:
+            entry['subcategories'].append({
+                'subcategory': rollup.subcategory,
+                'total': rollup.total,
+                'item_count': rollup.item_count,
+            })
+        else:
+            entry['total'] = rollup.total
+            entry['item_count'] = rollup.item_count
+    return list(categories.values())
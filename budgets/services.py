@@ -0,0 +1,285 @@
+"""
+Rate-card driven budget engine
+"""
+import math
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+
+from core.utils import currency
+from budgets.models import RateCard, BudgetItem
+from budgets.versioning import line_key_for
+from schedules.models import Schedule
+
+
+MAX_DAY_HOURS = 10
+POST_WEEKS_PER_SHOOT_DAY = 0.5
+LEAD_CAST_COUNT = 2
+SUPPORTING_CAST_COUNT = 5
+
+# Built-in card used when no RateCard exists for the project's range and currency.
+# (category, subcategory, description, unit, rate, basis, multiplier, cast_tier)
+DEFAULT_RATE_LINES = [
+    # Above the Line
+    ('above_line', 'Producer', 'Producer Fee', 'project', 5000, 'flat', 1, ''),
+    ('above_line', 'Director', 'Director Fee', 'project', 8000, 'flat', 1, ''),
+    ('above_line', 'Writer', 'Script Development', 'project', 2500, 'flat', 1, ''),
+
+    # Below the Line
+    ('below_line', 'Cast', 'Lead', 'day', 500, 'cast_days', 1, 'lead'),
+    ('below_line', 'Cast', 'Supporting', 'day', 300, 'cast_days', 1, 'supporting'),
+    ('below_line', 'Cast', 'Day Player', 'day', 200, 'cast_days', 1, 'day_player'),
+    ('below_line', 'Crew', 'Director of Photography', 'day', 600, 'crew_days', Decimal('1.2'), ''),
+    ('below_line', 'Crew', 'Sound Recordist', 'day', 300, 'crew_days', 1, ''),
+    ('below_line', 'Crew', 'Gaffer', 'day', 400, 'crew_days', Decimal('1.2'), ''),
+    ('below_line', 'Equipment', 'Camera Package', 'day', 400, 'shoot_days', 1, ''),
+    ('below_line', 'Equipment', 'Lighting Package', 'day', 300, 'shoot_days', 1, ''),
+    ('below_line', 'Equipment', 'Sound Package', 'day', 150, 'shoot_days', 1, ''),
+    ('below_line', 'Locations', 'Location Fee', 'day', 200, 'location_days', 1, ''),
+    ('below_line', 'Catering', 'Meals and Craft Services', 'person-day', 20, 'person_days', 1, ''),
+
+    # Post Production
+    ('post_production', 'Editing', 'Editor Fee', 'week', 1500, 'post_weeks', 1, ''),
+    ('post_production', 'Color', 'Color Correction', 'project', 2000, 'flat', 1, ''),
+    ('post_production', 'Sound', 'Sound Design & Mix', 'project', 3000, 'flat', 1, ''),
+    ('post_production', 'Music', 'Original Score', 'project', 2500, 'flat', 1, ''),
+]
+
+# Scales the built-in card's rates to the project's budget range
+BUDGET_RANGE_MULTIPLIERS = {
+    'micro': Decimal('1.0'),
+    'low': Decimal('2.5'),
+    'medium': Decimal('6.0'),
+    'high': Decimal('15.0'),
+    'major': Decimal('40.0'),
+}
+
+
+class BudgetEngine:
+    """Derives budget lines from the breakdown and prices them from a rate card"""
+
+    def __init__(self, project):
+        self.project = project
+
+    def build_lines(self):
+        """
+        Build priced budget lines for the project.
+
+        Returns:
+            tuple: (lines: list of dicts with BudgetItem field values, rate_card_label: str)
+        """
+        card_lines, card_label = self._load_rate_card()
+        days = self._day_plan()
+        quantities = self._derive_quantities(days, card_lines)
+
+        rows = []
+        for line in card_lines:
+            for description, quantity in self._expand_line(line, quantities):
+                if quantity:
+                    rows.append((line, description, quantity))
+
+        # Price every line in one vectorized pass, in integer cents so totals stay exact
+        quantity_hundredths = np.array(
+            [int((Decimal(str(q)) * 100).to_integral_value()) for _, _, q in rows], dtype=np.int64
+        )
+        rate_cents = np.array(
+            [int((Decimal(str(line['rate'])) * 100).to_integral_value()) for line, _, _ in rows], dtype=np.int64
+        )
+        total_cents = (quantity_hundredths * rate_cents + 50) // 100
+
+        lines = []
+        for idx, (line, description, _) in enumerate(rows):
+            lines.append({
+                'category': line['category'],
+                'subcategory': line['subcategory'],
+                'description': description,
+                'quantity': Decimal(int(quantity_hundredths[idx])).scaleb(-2),
+                'unit': line['unit'],
+                'rate': Decimal(int(rate_cents[idx])).scaleb(-2),
+                'total': Decimal(int(total_cents[idx])).scaleb(-2),
+                'order_index': idx,
+            })
+
+        return lines, card_label
+
+    def build_items(self, budget):
+        """Build unsaved BudgetItems (including contingency) for a budget"""
+        lines, card_label = self.build_lines()
+        items = [
+            BudgetItem(
+                budget=budget,
+                line_key=line_key_for(self.project.id, line['category'], line['subcategory'], line['description']),
+                **line
+            )
+            for line in lines
+        ]
+
+        subtotal = sum((item.total for item in items), Decimal('0.00'))
+        contingency_amount = (subtotal * Decimal(budget.contingency_percent) / 100).quantize(Decimal('0.01'))
+        items.append(BudgetItem(
+            budget=budget,
+            line_key=line_key_for(self.project.id, 'other', 'Contingency', 'Contingency'),
+            category='other',
+            subcategory='Contingency',
+            description=f'Contingency ({budget.contingency_percent}%)',
+            quantity=Decimal('1.00'),
+            unit='project',
+            rate=contingency_amount,
+            total=contingency_amount,
+            order_index=len(lines)
+        ))
+        return items, card_label
+
+    def _load_rate_card(self):
+        """Latest active rate card for the project's budget range and currency"""
+        rate_card = RateCard.objects.filter(
+            budget_range=self.project.budget_range,
+            currency=self.project.currency,
+            is_active=True
+        ).order_by('-version').first()
+
+        if rate_card:
+            lines = list(rate_card.lines.values(
+                'category', 'subcategory', 'description', 'unit',
+                'rate', 'basis', 'multiplier', 'cast_tier'
+            ))
+            return lines, str(rate_card)
+
+        # The built-in card is priced in USD; convert it for projects budgeting in other currencies
+        scale = BUDGET_RANGE_MULTIPLIERS.get(self.project.budget_range, Decimal('1.0'))
+        card_label = f'default ({self.project.budget_range})'
+        usd_rate = currency.rates_to(self.project.currency, ['USD']).get('USD')
+        if usd_rate is None:
+            # Pricing in USD under another currency's label would misstate the whole budget
+            raise ValueError(
+                f"No exchange rate for currency '{self.project.currency}': "
+                f"publish a rate card in {self.project.currency} or add the rate to the rate table"
+            )
+        if usd_rate != 1:
+            scale *= usd_rate
+            card_label = f'default ({self.project.budget_range}, converted to {self.project.currency})'
+        lines = []
+        for category, subcategory, description, unit, rate, basis, multiplier, cast_tier in DEFAULT_RATE_LINES:
+            lines.append({
+                'category': category,
+                'subcategory': subcategory,
+                'description': description,
+                'unit': unit,
+                'rate': (Decimal(rate) * scale).quantize(Decimal('0.01')),
+                'basis': basis,
+                'multiplier': Decimal(multiplier),
+                'cast_tier': cast_tier,
+            })
+        return lines, card_label
+
+    def _day_plan(self):
+        """
+        Shoot days as (location, set of characters) pairs.
+        Uses the latest schedule when there is one, otherwise estimates days
+        by packing each location's scenes into days of MAX_DAY_HOURS.
+        """
+        try:
+            scenes = list(self.project.breakdown.scenes.values(
+                'number', 'location', 'characters', 'est_shoot_hours'
+            ))
+        except Exception:
+            scenes = []
+        scenes_by_number = {scene['number']: scene for scene in scenes}
+
+        schedule = Schedule.objects.filter(project=self.project).order_by('-version').first()
+        if schedule:
+            days = []
+            for location, scene_numbers in schedule.shoot_days.values_list('location', 'scenes'):
+                characters = set()
+                for number in scene_numbers:
+                    scene = scenes_by_number.get(number)
+                    if scene:
+                        characters.update(scene['characters'])
+                days.append((location, characters))
+            if days:
+                return days
+
+        location_groups = defaultdict(list)
+        for scene in sorted(scenes, key=lambda s: s['number']):
+            location_groups[scene['location']].append(scene)
+
+        days = []
+        for location, location_scenes in location_groups.items():
+            current_hours = 0
+            current_characters = set()
+            for scene in location_scenes:
+                scene_hours = float(scene['est_shoot_hours'])
+                if current_hours + scene_hours > MAX_DAY_HOURS and current_hours:
+                    days.append((location, current_characters))
+                    current_hours = 0
+                    current_characters = set()
+                current_hours += scene_hours
+                current_characters.update(scene['characters'])
+            if current_hours:
+                days.append((location, current_characters))
+        return days
+
+    def _derive_quantities(self, days, card_lines):
+        """Collapse the day plan into the quantity drivers used by rate card lines"""
+        cast_days = defaultdict(int)
+        location_days = defaultdict(int)
+        for location, characters in days:
+            location_days[location] += 1
+            for name in characters:
+                cast_days[name] += 1
+
+        shoot_days = len(days)
+        crew_size = sum(1 for line in card_lines if line['basis'] == 'crew_days')
+        person_days = sum(cast_days.values()) + crew_size * shoot_days
+
+        return {
+            'shoot_days': shoot_days,
+            'crew_days': shoot_days,
+            'cast_days': dict(cast_days),
+            'cast_tiers': self._cast_tiers(cast_days),
+            'location_days': dict(location_days),
+            'person_days': person_days,
+            'post_weeks': max(1, math.ceil(shoot_days * POST_WEEKS_PER_SHOOT_DAY)) if shoot_days else 1,
+        }
+
+    def _cast_tiers(self, cast_days):
+        """Rank characters by days worked; Character.meta['tier'] overrides the ranking"""
+        overrides = {}
+        try:
+            for name, meta in self.project.breakdown.characters.values_list('name', 'meta'):
+                if meta.get('tier'):
+                    overrides[name] = meta['tier']
+        except Exception:
+            pass
+
+        tiers = {}
+        ranked = sorted(cast_days, key=lambda name: (-cast_days[name], name))
+        for idx, name in enumerate(ranked):
+            if name in overrides:
+                tiers[name] = overrides[name]
+            elif idx < LEAD_CAST_COUNT:
+                tiers[name] = 'lead'
+            elif idx < LEAD_CAST_COUNT + SUPPORTING_CAST_COUNT:
+                tiers[name] = 'supporting'
+            else:
+                tiers[name] = 'day_player'
+        return tiers
+
+    def _expand_line(self, line, quantities):
+        """Yield (description, quantity) pairs a rate card line produces"""
+        basis = line['basis']
+        multiplier = Decimal(line['multiplier'])
+
+        if basis == 'cast_days':
+            tiers = quantities['cast_tiers']
+            for name in sorted(quantities['cast_days']):
+                if tiers[name] == line['cast_tier']:
+                    yield f"{name} ({line['description']})", quantities['cast_days'][name] * multiplier
+        elif basis == 'location_days':
+            for location, days in sorted(quantities['location_days'].items()):
+                yield f"{line['description']} - {location}", days * multiplier
+        elif basis == 'flat':
+            yield line['description'], multiplier
+        else:
+            yield line['description'], quantities[basis] * multiplier
@@ -0,0 +1,209 @@
+"""
+Monte Carlo contingency and risk simulation for budgets
+"""
+from decimal import Decimal
+
+import numpy as np
+
+from budgets.models import BudgetItem
+
+
+DEFAULT_TRIALS = 100000
+TRIAL_CHUNK = 10000
+PERCENTILES = (50, 80, 95)
+
+# Spread of the shoot length (as multipliers on day/week quantities) by scene complexity
+COMPLEXITY_SCHEDULE_RANGES = {
+    'simple': (0.95, 1.10),
+    'medium': (0.95, 1.20),
+    'complex': (0.90, 1.35),
+    'very_complex': (0.90, 1.50),
+}
+
+# Rate spread by budget category
+CATEGORY_RATE_RANGES = {
+    'above_line': (1.00, 1.05),
+    'below_line': (0.95, 1.15),
+    'post_production': (0.95, 1.25),
+    'other': (1.00, 1.00),
+}
+
+# Units whose quantities scale with the length of the shoot
+SCHEDULE_UNITS = {'day', 'week', 'person-day'}
+
+
+def _schedule_range(project):
+    """Hours-weighted blend of the complexity ranges of the project's scenes"""
+    try:
+        scenes = list(project.breakdown.scenes.values_list('complexity', 'est_shoot_hours'))
+    except Exception:
+        scenes = []
+    if not scenes:
+        return COMPLEXITY_SCHEDULE_RANGES['medium']
+
+    weights = np.array([float(hours) or 1.0 for _, hours in scenes])
+    ranges = np.array([COMPLEXITY_SCHEDULE_RANGES.get(c, COMPLEXITY_SCHEDULE_RANGES['medium']) for c, _ in scenes])
+    low, high = (ranges * weights[:, None]).sum(axis=0) / weights.sum()
+    return float(low), float(high)
+
+
+def _multiplier_range(value, default):
+    """
+    Validate a BudgetItem.uncertainty entry as a (low, high) pair of
+    multipliers. Raises ValueError for anything that is not two numbers
+    with 0 <= low <= high.
+    """
+    if value is None:
+        return default
+    try:
+        low, high = (float(bound) for bound in value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid uncertainty range {value!r}: expected [low, high]")
+    if not 0 <= low <= high:
+        raise ValueError(f"Invalid uncertainty range {value!r}: expected 0 <= low <= high")
+    return low, high
+
+
+def _triangular(u, low, mode, high):
+    """Inverse CDF of the triangular distribution, broadcast over arrays"""
+    width = high - low
+    safe_width = np.where(width > 0, width, 1.0)
+    split = (mode - low) / safe_width
+    lower = low + np.sqrt(u * safe_width * (mode - low))
+    upper = high - np.sqrt((1 - u) * safe_width * (high - mode))
+    return np.where(width > 0, np.where(u < split, lower, upper), mode)
+
+
+def simulate_budget(budget, trials=DEFAULT_TRIALS, seed=None):
+    """
+    Run a Monte Carlo simulation over a budget version's line items.
+
+    Rates and quantities get triangular distributions centred on the budgeted
+    values. Rates move together within a department (category/subcategory),
+    and schedule-driven quantities share one shoot-length factor per trial
+    derived from Scene.complexity, so lines are summed into a few correlated
+    groups before sampling. Lines with explicit BudgetItem.uncertainty ranges
+    are sampled individually, peaking at the budgeted value or at the nearest
+    bound when the range excludes it. The existing contingency line is left
+    out, since it is what we are sizing.
+
+    Raises:
+        ValueError: when a line item has a malformed uncertainty range
+
+    Returns:
+        Dict with base, P50/P80/P95 totals and per-category recommended contingency
+    """
+    items = list(
+        budget.line_items().exclude(category='other', subcategory='Contingency').values(
+            'category', 'subcategory', 'quantity', 'unit', 'rate', 'uncertainty'
+        )
+    )
+    categories = [code for code, label in BudgetItem.BUDGET_CATEGORIES]
+    labels = dict(BudgetItem.BUDGET_CATEGORIES)
+    rng = np.random.default_rng(seed)
+
+    groups = {}  # (category, subcategory) -> [shared_base, fixed_base]
+    individual = []  # (category, base, rate_range, quantity_range or None when shared)
+    category_base = np.zeros(len(categories))
+
+    for item in items:
+        base = float(item['quantity'] * item['rate'])
+        category_base[categories.index(item['category'])] += base
+        uncertainty = item['uncertainty'] or {}
+        shared = item['unit'] in SCHEDULE_UNITS
+
+        if uncertainty:
+            rate_range = _multiplier_range(
+                uncertainty.get('rate'), CATEGORY_RATE_RANGES.get(item['category'], (1.0, 1.0))
+            )
+            quantity_range = _multiplier_range(uncertainty.get('quantity'), None if shared else (1.0, 1.0))
+            individual.append((item['category'], base, rate_range, quantity_range))
+        else:
+            sums = groups.setdefault((item['category'], item['subcategory']), [0.0, 0.0])
+            sums[0 if shared else 1] += base
+
+    group_keys = list(groups)
+    group_shared = np.array([groups[key][0] for key in group_keys])
+    group_fixed = np.array([groups[key][1] for key in group_keys])
+    group_low, group_high = np.array(
+        [CATEGORY_RATE_RANGES.get(category, (1.0, 1.0)) for category, _ in group_keys]
+    ).reshape(-1, 2).T
+    group_membership = np.zeros((len(group_keys), len(categories)))
+    for idx, (category, _) in enumerate(group_keys):
+        group_membership[idx, categories.index(category)] = 1.0
+
+    item_base = np.array([base for _, base, _, _ in individual])
+    item_rate_low, item_rate_high = np.array([r for _, _, r, _ in individual]).reshape(-1, 2).T
+    item_shared = np.array([q is None for _, _, _, q in individual], dtype=bool)
+    item_quantity_low, item_quantity_high = np.array(
+        [q or (1.0, 1.0) for _, _, _, q in individual]
+    ).reshape(-1, 2).T
+    # Ranges that exclude the budgeted value peak at their nearest bound
+    item_rate_mode = np.clip(1.0, item_rate_low, item_rate_high)
+    item_quantity_mode = np.clip(1.0, item_quantity_low, item_quantity_high)
+    item_membership = np.zeros((len(individual), len(categories)))
+    for idx, (category, _, _, _) in enumerate(individual):
+        item_membership[idx, categories.index(category)] = 1.0
+
+    schedule_low, schedule_high = _schedule_range(budget.project)
+    category_totals = np.empty((trials, len(categories)))
+
+    for start in range(0, trials, TRIAL_CHUNK):
+        size = min(TRIAL_CHUNK, trials - start)
+        schedule_factor = _triangular(rng.random((size, 1)), schedule_low, 1.0, schedule_high)
+
+        rate_factor = _triangular(rng.random((size, len(group_keys))), group_low, 1.0, group_high)
+        chunk = (rate_factor * (schedule_factor * group_shared + group_fixed)) @ group_membership
+
+        if individual:
+            rate_factor = _triangular(rng.random((size, len(individual))), item_rate_low, item_rate_mode, item_rate_high)
+            quantity_factor = _triangular(
+                rng.random((size, len(individual))), item_quantity_low, item_quantity_mode, item_quantity_high
+            )
+            quantity_factor = np.where(item_shared, schedule_factor, quantity_factor)
+            chunk += (item_base * rate_factor * quantity_factor) @ item_membership
+
+        category_totals[start:start + size] = chunk
+
+    totals = category_totals.sum(axis=1)
+    total_percentiles = np.percentile(totals, PERCENTILES)
+    category_percentiles = np.percentile(category_totals, PERCENTILES, axis=0)
+    base_total = float(category_base.sum())
+
+    current_contingency = budget.line_items().filter(
+        category='other', subcategory='Contingency'
+    ).values_list('total', flat=True).first() or Decimal('0.00')
+
+    category_results = []
+    for idx, code in enumerate(categories):
+        base = float(category_base[idx])
+        if not base:
+            continue
+        recommended = max(0.0, float(category_percentiles[1, idx]) - base)
+        category_results.append({
+            'category': code,
+            'label': labels[code],
+            'base': round(base, 2),
+            'p50': round(float(category_percentiles[0, idx]), 2),
+            'p80': round(float(category_percentiles[1, idx]), 2),
+            'p95': round(float(category_percentiles[2, idx]), 2),
+            'recommended_contingency': round(recommended, 2),
+            'recommended_contingency_percent': round(recommended / base * 100, 1),
+        })
+
+    recommended_total = max(0.0, float(total_percentiles[1]) - base_total)
+    return {
+        'budget_id': str(budget.id),
+        'version': budget.version,
+        'trials': trials,
+        'base_total': round(base_total, 2),
+        'p50': round(float(total_percentiles[0]), 2),
+        'p80': round(float(total_percentiles[1]), 2),
+        'p95': round(float(total_percentiles[2]), 2),
+        'recommended_contingency': round(recommended_total, 2),
+        'recommended_contingency_percent': round(recommended_total / base_total * 100, 1) if base_total else 0.0,
+        'current_contingency': float(current_contingency),
+        'current_contingency_percent': budget.contingency_percent,
+        'schedule_range': [round(schedule_low, 3), round(schedule_high, 3)],
+        'categories': category_results,
+    }
@@ -0,0 +1,172 @@
+import importlib
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import Company
+from agents.models import AgentJob
+from agents.processors import AgentProcessor
+from budgets import rollups
+from budgets.models import Budget, BudgetItem
+from budgets.services import BudgetEngine
+from budgets.simulation import simulate_budget
+from budgets.transfer import BudgetImporter
+from budgets.versioning import add_item, commit_lines, create_budget_version, edit_item, line_key_for
+from projects.models import Project
+
+
+class BudgetTestCase(TestCase):
+
+    def setUp(self):
+        company = Company.objects.create(name='Studio')
+        self.project = Project.objects.create(company=company, name='Feature')
+        self.budget = create_budget_version(self.project)
+
+
+class RollupTests(BudgetTestCase):
+
+    def test_blank_subcategory_counts_once(self):
+        add_item(self.budget, category='other', subcategory='', description='Insurance',
+                 quantity=Decimal('1'), rate=Decimal('1000.00'))
+        add_item(self.budget, category='other', subcategory='Office', description='Rent',
+                 quantity=Decimal('2'), rate=Decimal('500.00'))
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.total_budget, Decimal('2000.00'))
+
+        rows = {(r.subcategory, r.total, r.item_count) for r in self.budget.rollups.all()}
+        self.assertEqual(rows, {('', Decimal('2000.00'), 2), ('Office', Decimal('1000.00'), 1)})
+
+        rollups.rebuild(self.budget)
+        self.assertEqual(self.budget.total_budget, Decimal('2000.00'))
+        self.assertEqual({(r.subcategory, r.total, r.item_count) for r in self.budget.rollups.all()}, rows)
+
+    def test_blank_subcategory_edit_and_delete(self):
+        item = add_item(self.budget, category='other', subcategory='', description='Insurance',
+                        quantity=Decimal('1'), rate=Decimal('1000.00'))
+        item = edit_item(self.budget, item, rate=Decimal('1500.00'))
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.total_budget, Decimal('1500.00'))
+
+        item.delete()
+        self.budget.refresh_from_db()
+        self.assertEqual(self.budget.total_budget, Decimal('0.00'))
+        self.assertEqual([(r.subcategory, r.item_count) for r in self.budget.rollups.all()], [('', 0)])
+
+    def test_budget_tab_renders_summary(self):
+        Project.objects.filter(id=self.project.id).update(currency='EUR')
+        add_item(self.budget, category='other', subcategory='Office', description='Rent',
+                 quantity=Decimal('2'), rate=Decimal('500.00'))
+        self.client.force_login(User.objects.create_user('producer', password='x'))
+        response = self.client.get(reverse('projects:budget', kwargs={'project_id': self.project.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Office')
+        self.assertContains(response, '1000.00 EUR')
+        self.assertNotContains(response, '$1000.00')
+
+
+class SimulationTests(BudgetTestCase):
+
+    def test_range_excluding_budgeted_value(self):
+        add_item(self.budget, category='below_line', subcategory='Camera', description='Camera Package',
+                 quantity=Decimal('10'), unit='day', rate=Decimal('100.00'),
+                 uncertainty={'rate': [1.5, 1.6], 'quantity': [1.0, 1.0]})
+        result = simulate_budget(self.budget, trials=2000, seed=1)
+        self.assertEqual(result['base_total'], 1000.0)
+        self.assertTrue(1500.0 <= result['p50'] <= result['p95'] <= 1600.0)
+
+    def test_malformed_range_is_rejected(self):
+        add_item(self.budget, category='below_line', subcategory='Camera', description='Camera Package',
+                 quantity=Decimal('10'), unit='day', rate=Decimal('100.00'),
+                 uncertainty={'rate': [1.2, 0.9]})
+        with self.assertRaises(ValueError):
+            simulate_budget(self.budget, trials=100, seed=1)
+
+
+class GenerationTests(BudgetTestCase):
+
+    def test_failed_pricing_leaves_no_version(self):
+        job = AgentJob.objects.create(project=self.project, agent_type='budget')
+        with mock.patch('agents.processors.BudgetEngine.build_items', side_effect=ValueError('no rate card')):
+            result = AgentProcessor().process_job(job)
+        self.assertFalse(result['success'])
+        self.assertEqual(list(Budget.objects.filter(project=self.project).values_list('version', flat=True)), [1])
+
+    def test_unknown_currency_is_not_priced_in_usd(self):
+        Project.objects.filter(id=self.project.id).update(currency='XYZ')
+        self.project.refresh_from_db()
+        with self.assertRaisesMessage(ValueError, "No exchange rate for currency 'XYZ'"):
+            BudgetEngine(self.project).build_lines()
+
+
+class ImportTests(BudgetTestCase):
+
+    def _import(self, text):
+        return BudgetImporter(self.project).import_file(io.BytesIO(text.encode()), 'csv')
+
+    def test_blank_subcategory_totals(self):
+        result = self._import(
+            "category,description,quantity,rate\n"
+            "other,Insurance,1,1000\n"
+            "other,Legal,2,500\n"
+        )
+        budget = Budget.objects.get(id=result['budget_id'])
+        self.assertEqual(result['rows_imported'], 2)
+        self.assertEqual(budget.total_budget, Decimal('2000.00'))
+        self.assertEqual(set(budget.line_items().values_list('subcategory', flat=True)), {'General'})
+
+    def test_overflowing_total_is_a_row_error(self):
+        result = self._import(
+            "category,subcategory,description,quantity,rate\n"
+            "other,Office,Rent,999999,99999999\n"
+            "other,Office,Phone,1,100\n"
+        )
+        self.assertEqual(result['rows_imported'], 1)
+        self.assertEqual([error['row'] for error in result['errors']], [2])
+
+    def test_non_finite_numbers_are_row_errors(self):
+        result = self._import(
+            "category,subcategory,description,quantity,rate,total\n"
+            "other,Office,Rent,inf,100,\n"
+            "other,Office,Phone,1,NaN,\n"
+            "other,Office,Power,,,1e400\n"
+            "other,Office,Water,1,100,\n"
+        )
+        self.assertEqual(result['rows_imported'], 1)
+        self.assertEqual([error['row'] for error in result['errors']], [2, 3, 4])
+
+
+class LegacyLineTests(BudgetTestCase):
+
+    def _legacy_lines(self):
+        # Pre-versioning rows: full copies per version, keys not yet assigned
+        for index in range(2):
+            BudgetItem.objects.create(budget=self.budget, category='below_line', subcategory='Grip',
+                                      description='Grip', rate=Decimal('300.00'), order_index=index)
+
+    def test_backfill_keys_repeated_lines_apart(self):
+        self._legacy_lines()
+        backfill = importlib.import_module('budgets.migrations.0004_copy_on_write_versions')
+        backfill.assign_version_ranges(apps, None)
+        keys = list(BudgetItem.objects.values_list('line_key', flat=True))
+        self.assertEqual(len(set(keys)), 2)
+
+    def test_commit_closes_rows_sharing_a_key(self):
+        self._legacy_lines()
+        key = line_key_for(self.project.id, 'below_line', 'Grip', 'Grip')
+        BudgetItem.objects.update(line_key=key)
+        rollups.rebuild(self.budget)
+
+        budget = create_budget_version(self.project)
+        line = BudgetItem(line_key=key, category='below_line', subcategory='Grip', description='Grip',
+                          rate=Decimal('300.00'), total=Decimal('300.00'), order_index=0)
+        commit_lines(budget, [line])
+
+        self.assertEqual(budget.line_items().count(), 1)
+        budget.refresh_from_db()
+        self.assertEqual(budget.total_budget, Decimal('300.00'))
+        self.assertEqual(BudgetItem.objects.filter(version_to=budget.version).count(), 1)
@@ -0,0 +1,385 @@
+"""
+Streaming budget import and export (CSV/XLSX).
+
+Exports are generators meant for StreamingHttpResponse: rows are pulled from
+the database with .iterator() and written out as they are produced, so the
+file is never held in memory. XLSX output is written through zipfile onto a
+non-seekable buffer that is drained after every batch of rows.
+
+Imports read rows lazily from the uploaded file, validate them one by one
+and bulk_create them in chunks into a new budget version.
+"""
+import codecs
+import csv
+import re
+import uuid
+import zipfile
+from decimal import Decimal, InvalidOperation
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import escape
+
+from django.db import transaction
+
+from budgets import rollups
+from budgets.models import BudgetItem
+from budgets.versioning import create_budget_version, line_key_for
+
+
+EXPORT_COLUMNS = ['category', 'subcategory', 'description', 'quantity', 'unit', 'rate', 'total', 'notes', 'line_key']
+IMPORT_CHUNK_SIZE = 1000
+EXPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 500
+DEFAULT_SUBCATEGORY = 'General'  # BudgetItem.subcategory is required; blank rows land here
+MAX_ITEM_TOTAL = Decimal('10000000000')  # BudgetItem.total is max_digits=12, decimal_places=2
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class _Echo:
+    """File-like object that hands back whatever is written to it"""
+
+    def write(self, value):
+        return value
+
+
+class _StreamBuffer:
+    """Write-only, non-seekable sink for zipfile that can be drained between rows"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _export_rows(budget):
+    rows = budget.line_items().order_by('category', 'order_index').values_list(
+        'category', 'subcategory', 'description', 'quantity', 'unit', 'rate', 'total', 'notes', 'line_key'
+    )
+    for row in rows.iterator(chunk_size=2000):
+        yield [str(value) for value in row]
+
+
+def export_csv(budget):
+    """Yield a budget version as CSV, one encoded row at a time"""
+    writer = csv.writer(_Echo())
+    yield codecs.BOM_UTF8 + writer.writerow(EXPORT_COLUMNS).encode('utf-8')
+    for row in _export_rows(budget):
+        yield writer.writerow(row).encode('utf-8')
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Budget" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="1"><xf/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+# Columns written as numbers rather than text
+_NUMERIC_COLUMNS = {'quantity', 'rate', 'total'}
+
+
+def _xlsx_row(values):
+    cells = []
+    for column, value in zip(EXPORT_COLUMNS, values):
+        if column in _NUMERIC_COLUMNS:
+            cells.append(f'<c><v>{escape(value)}</v></c>')
+        else:
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{escape(value)}</t></is></c>')
+    return ('<row>' + ''.join(cells) + '</row>').encode('utf-8')
+
+
+def export_xlsx(budget):
+    """Yield a budget version as an XLSX workbook without buffering the whole file"""
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            header = ''.join(f'<c t="inlineStr"><is><t>{column}</t></is></c>' for column in EXPORT_COLUMNS)
+            sheet.write(f'<row>{header}</row>'.encode('utf-8'))
+
+            for count, row in enumerate(_export_rows(budget), start=1):
+                sheet.write(_xlsx_row(row))
+                if count % EXPORT_BATCH_SIZE == 0:
+                    data = buffer.drain()
+                    if data:
+                        yield data
+
+            sheet.write(b'</sheetData></worksheet>')
+        yield buffer.drain()
+    yield buffer.drain()
+
+
+def _iter_csv_rows(fileobj):
+    reader = csv.reader(codecs.iterdecode(fileobj, 'utf-8-sig'))
+    yield from reader
+
+
+_SPREADSHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_CELL_COLUMN = re.compile(r'[A-Z]+')
+
+
+def _column_index(reference):
+    index = 0
+    for char in _CELL_COLUMN.match(reference).group():
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+def _iter_xlsx_rows(fileobj):
+    """Stream rows from the first worksheet of an XLSX file"""
+    with zipfile.ZipFile(fileobj) as archive:
+        names = archive.namelist()
+        shared_strings = []
+        if 'xl/sharedStrings.xml' in names:
+            with archive.open('xl/sharedStrings.xml') as strings:
+                for event, element in iterparse(strings):
+                    if element.tag == f'{_SPREADSHEET_NS}si':
+                        shared_strings.append(''.join(t.text or '' for t in element.iter(f'{_SPREADSHEET_NS}t')))
+                        element.clear()
+
+        sheets = sorted(name for name in names if re.match(r'xl/worksheets/sheet\d+\.xml$', name))
+        if not sheets:
+            raise ValueError("Workbook has no worksheets")
+
+        with archive.open(sheets[0]) as sheet:
+            for event, element in iterparse(sheet):
+                if element.tag != f'{_SPREADSHEET_NS}row':
+                    continue
+                values = []
+                for cell in element.iter(f'{_SPREADSHEET_NS}c'):
+                    reference = cell.get('r')
+                    if reference:
+                        values.extend([''] * (_column_index(reference) - len(values)))
+                    cell_type = cell.get('t')
+                    if cell_type == 'inlineStr':
+                        value = ''.join(t.text or '' for t in cell.iter(f'{_SPREADSHEET_NS}t'))
+                    else:
+                        raw = cell.find(f'{_SPREADSHEET_NS}v')
+                        value = raw.text if raw is not None and raw.text is not None else ''
+                        if cell_type == 's' and value:
+                            value = shared_strings[int(value)]
+                    values.append(value)
+                element.clear()
+                yield values
+
+
+def _parse_decimal(value, field):
+    try:
+        number = Decimal(str(value).replace(',', '').replace('$', '').strip() or '0')
+    except InvalidOperation:
+        raise ValueError(f"{field} '{value}' is not a number")
+    # inf, NaN and huge exponents parse, but would raise InvalidOperation on quantize
+    if not number.is_finite() or abs(number) >= MAX_ITEM_TOTAL:
+        raise ValueError(f"{field} '{value}' is out of range")
+    return number
+
+
+class BudgetImporter:
+    """Validate rows from a CSV/XLSX upload and load them as a new budget version"""
+
+    def __init__(self, project, created_by=None):
+        self.project = project
+        self.created_by = created_by
+        self.categories = {}
+        for code, label in BudgetItem.BUDGET_CATEGORIES:
+            self.categories[code] = code
+            self.categories[label.lower()] = code
+
+    def import_file(self, fileobj, file_format):
+        """
+        Import an uploaded file.
+
+        Args:
+            fileobj: Binary file-like object (seekable for XLSX)
+            file_format: 'csv' or 'xlsx'
+
+        Returns:
+            Dict with 'budget_id', 'version', 'rows_imported' and per-row 'errors'
+        """
+        if file_format == 'csv':
+            rows = _iter_csv_rows(fileobj)
+        elif file_format == 'xlsx':
+            rows = _iter_xlsx_rows(fileobj)
+        else:
+            raise ValueError(f"Unsupported format: {file_format}")
+
+        header = [column.strip().lower() for column in next(rows, [])]
+        missing = {'category', 'description'} - set(header)
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(sorted(missing))}")
+
+        with transaction.atomic():
+            budget = create_budget_version(self.project, created_by=self.created_by)
+
+            # An import replaces the whole version: hide every line carried from earlier versions
+            BudgetItem.objects.filter(
+                project=self.project,
+                version_to__isnull=True
+            ).exclude(budget=budget).update(version_to=budget.version)
+            rollups.seed_from_previous(budget, None)
+
+            imported, errors, error_count = self._load_rows(budget, header, rows)
+            if not imported:
+                raise ValueError("No valid rows found" + (f": {errors[0]['error']}" if errors else ""))
+
+            budget.refresh_from_db()
+
+        return {
+            'budget_id': str(budget.id),
+            'version': budget.version,
+            'rows_imported': imported,
+            'error_count': error_count,
+            'errors': errors,
+            'total_budget': float(budget.total_budget),
+        }
+
+    def _load_rows(self, budget, header, rows):
+        imported = 0
+        error_count = 0
+        errors = []
+        seen_keys = set()
+        chunk = []
+        deltas = rollups.collect_deltas([])
+
+        for row_number, values in enumerate(rows, start=2):
+            if not any(str(value).strip() for value in values):
+                continue
+            record = dict(zip(header, values))
+            try:
+                item = self._build_item(budget, record, len(seen_keys))
+            except ValueError as e:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'row': row_number, 'error': str(e)})
+                continue
+
+            if item.line_key in seen_keys:
+                item.line_key = uuid.uuid4()
+            seen_keys.add(item.line_key)
+            chunk.append(item)
+
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                imported += self._flush(chunk, deltas)
+                chunk = []
+
+        if chunk:
+            imported += self._flush(chunk, deltas)
+
+        # Fold the whole import into the version's rollups in one pass
+        rollups.apply_deltas(budget.project_id, budget.version, None, deltas)
+        return imported, errors, error_count
+
+    def _build_item(self, budget, record, order_index):
+        category = self.categories.get(str(record.get('category', '')).strip().lower())
+        if not category:
+            raise ValueError(f"Unknown category '{record.get('category', '')}'")
+        description = str(record.get('description', '')).strip()
+        if not description:
+            raise ValueError("Description is required")
+        subcategory = str(record.get('subcategory', '')).strip()[:100] or DEFAULT_SUBCATEGORY
+
+        total = _parse_decimal(record.get('total', ''), 'total') if record.get('total') else None
+        if record.get('quantity') or record.get('rate'):
+            quantity = _parse_decimal(record.get('quantity') or '1', 'quantity')
+            rate = _parse_decimal(record.get('rate') or '0', 'rate')
+        elif total is not None:
+            quantity, rate = Decimal('1'), total
+        else:
+            raise ValueError("Provide quantity and rate, or a total")
+
+        quantity = quantity.quantize(Decimal('0.01'))
+        rate = rate.quantize(Decimal('0.01'))
+        if abs(quantity) >= Decimal('1000000') or abs(rate) >= Decimal('100000000'):
+            raise ValueError("Quantity or rate is out of range")
+        total = (quantity * rate).quantize(Decimal('0.01'))
+        if abs(total) >= MAX_ITEM_TOTAL:
+            raise ValueError("Total (quantity x rate) is out of range")
+
+        try:
+            line_key = uuid.UUID(str(record.get('line_key', '')).strip())
+        except ValueError:
+            line_key = line_key_for(self.project.id, category, subcategory, description)
+
+        return BudgetItem(
+            budget=budget,
+            project_id=budget.project_id,
+            line_key=line_key,
+            version_from=budget.version,
+            category=category,
+            subcategory=subcategory,
+            description=description[:200],
+            quantity=quantity,
+            unit=str(record.get('unit', '')).strip()[:50] or 'item',
+            rate=rate,
+            total=total,
+            notes=str(record.get('notes', '')).strip(),
+            order_index=order_index
+        )
+
+    def _flush(self, chunk, deltas):
+        """Insert a chunk and accumulate its rollup deltas"""
+        BudgetItem.objects.bulk_create(chunk)
+        rollups.collect_deltas(chunk, deltas=deltas)
+        return len(chunk)
@@ -0,0 +1,16 @@
+from django.urls import path
+from . import views
+
+app_name = 'budgets'
+
+urlpatterns = [
+    # Version comparison
+    path('<uuid:project_id>/diff/<int:from_version>/<int:to_version>/', views.BudgetDiffView.as_view(), name='diff'),
+    
+    # Risk analysis
+    path('<uuid:project_id>/simulate/<int:version>/', views.BudgetSimulationView.as_view(), name='simulate'),
+    
+    # Import and export
+    path('<uuid:project_id>/export/<int:version>/', views.BudgetExportView.as_view(), name='export'),
+    path('<uuid:project_id>/import/', views.BudgetImportView.as_view(), name='import'),
+]
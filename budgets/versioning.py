@@ -0,0 +1,183 @@
+"""
+Copy-on-write budget versions.
+
+A BudgetItem row is visible in every version from ``version_from`` up to (but
+not including) ``version_to``. New versions share the rows of the previous
+version and only write rows for lines that were added, changed or removed,
+so storage grows with edits rather than with the number of versions.
+"""
+import uuid
+
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+
+from budgets import rollups
+from budgets.models import Budget, BudgetItem
+from projects.models import Project
+
+
+LINE_KEY_NAMESPACE = uuid.UUID('5b0d7a4e-2f1c-4c8e-9a43-8d1e6f0b7c21')
+
+# Fields that make up a line's content; a change to any of them creates a new row
+CONTENT_FIELDS = [
+    'category', 'subcategory', 'description', 'quantity',
+    'unit', 'rate', 'total', 'notes', 'uncertainty', 'order_index',
+]
+
+
+def line_key_for(project_id, category, subcategory, description):
+    """Deterministic identity for generated lines, so reruns line up with earlier versions"""
+    return uuid.uuid5(LINE_KEY_NAMESPACE, f'{project_id}:{category}:{subcategory}:{description}')
+
+
+def create_budget_version(project, created_by=None, **fields):
+    """
+    Allocate the next version number for a project and create its Budget.
+    The project row is locked for the allocation so concurrent jobs queue up
+    instead of racing on the same number. Call it inside the caller's
+    transaction.atomic() together with commit_lines(), so the lock is held
+    until the lines are written and a failure leaves no empty version behind.
+    """
+    for attempt in range(3):
+        try:
+            with transaction.atomic():
+                Project.objects.select_for_update().filter(pk=project.pk).first()
+                latest = Budget.objects.filter(project=project).aggregate(Max('version'))['version__max'] or 0
+                return Budget.objects.create(
+                    project=project,
+                    version=latest + 1,
+                    created_by=created_by,
+                    **fields
+                )
+        except IntegrityError:
+            # Backends without row locks can still collide on unique_together; retry
+            if attempt == 2:
+                raise
+
+
+def previous_version(budget):
+    return Budget.objects.filter(
+        project_id=budget.project_id,
+        version__lt=budget.version
+    ).order_by('-version').first()
+
+
+def _same_content(item, other):
+    return all(getattr(item, field) == getattr(other, field) for field in CONTENT_FIELDS)
+
+
+def _ensure_latest(budget):
+    if Budget.objects.filter(project_id=budget.project_id, version__gt=budget.version).exists():
+        raise ValueError("Only the latest budget version can be edited")
+    if budget.status == 'locked':
+        raise ValueError("Locked budgets cannot be edited")
+
+
+@transaction.atomic
+def commit_lines(budget, items):
+    """
+    Make ``items`` the full content of ``budget``, sharing unchanged rows with
+    the previous version.
+
+    Args:
+        budget: Newly created (latest) Budget version
+        items: Unsaved BudgetItems with line_key and totals set
+
+    Returns:
+        Dict with 'added', 'changed', 'removed' and 'unchanged' line counts
+    """
+    previous = previous_version(budget)
+    current = {}
+    closed = []
+    if previous:
+        for item in previous.line_items():
+            # A key can only carry one line forward; extra rows sharing it are closed
+            if item.line_key in current:
+                closed.append(item)
+            else:
+                current[item.line_key] = item
+    duplicates = len(closed)
+
+    to_create = []
+    unchanged = 0
+    changed = 0
+    for item in items:
+        existing = current.pop(item.line_key, None)
+        if existing is not None and _same_content(item, existing):
+            unchanged += 1
+            continue
+        if existing is not None:
+            closed.append(existing)
+            changed += 1
+        item.budget = budget
+        item.project_id = budget.project_id
+        item.version_from = budget.version
+        item.version_to = None
+        to_create.append(item)
+
+    # Anything left over was dropped from this version
+    closed.extend(current.values())
+
+    if closed:
+        BudgetItem.objects.filter(id__in=[item.id for item in closed]).update(version_to=budget.version)
+    BudgetItem.objects.bulk_create(to_create, batch_size=500)
+
+    # Bulk writes skip BudgetItem.save(), so carry the rollups over and apply the deltas here
+    rollups.seed_from_previous(budget, previous)
+    deltas = rollups.collect_deltas(closed, sign=-1)
+    rollups.collect_deltas(to_create, sign=1, deltas=deltas)
+    rollups.apply_deltas(budget.project_id, budget.version, None, deltas)
+
+    return {
+        'added': len(to_create) - changed,
+        'changed': changed,
+        'removed': len(current) + duplicates,
+        'unchanged': unchanged,
+    }
+
+
+@transaction.atomic
+def add_item(budget, **fields):
+    """Add a new line to the latest version"""
+    _ensure_latest(budget)
+    item = BudgetItem(budget=budget, version_from=budget.version, **fields)
+    item.save()
+    return item
+
+
+@transaction.atomic
+def edit_item(budget, item, **changes):
+    """
+    Edit a line in the latest version. Rows introduced by this version are
+    updated in place; rows shared with earlier versions are copied first.
+    """
+    _ensure_latest(budget)
+    if item.version_from == budget.version:
+        for field, value in changes.items():
+            setattr(item, field, value)
+        item.save()
+        return item
+
+    _close_shared(budget, item)
+    values = {field: getattr(item, field) for field in CONTENT_FIELDS}
+    values.update(changes)
+    values.pop('total', None)  # Recalculated by BudgetItem.save()
+    copy = BudgetItem(budget=budget, line_key=item.line_key, version_from=budget.version, **values)
+    copy.save()
+    return copy
+
+
+@transaction.atomic
+def remove_item(budget, item):
+    """Remove a line from the latest version, keeping it visible in earlier ones"""
+    _ensure_latest(budget)
+    if item.version_from == budget.version:
+        item.delete()
+    else:
+        _close_shared(budget, item)
+
+
+def _close_shared(budget, item):
+    """Hide a row shared with earlier versions from this version onwards"""
+    BudgetItem.objects.filter(id=item.id).update(version_to=budget.version)
+    rollups.apply_deltas(budget.project_id, budget.version, None, rollups.collect_deltas([item], sign=-1))
@@ -0,0 +1,99 @@
+import csv
+import zipfile
+
+from django.shortcuts import get_object_or_404
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+
+from .models import Budget
+from .diff import diff_budgets
+from .simulation import simulate_budget, DEFAULT_TRIALS
+from .transfer import BudgetImporter, export_csv, export_xlsx, XLSX_CONTENT_TYPE
+from projects.models import Project
+
+
+class BudgetDiffView(LoginRequiredMixin, View):
+    """Compare two versions of a project's budget"""
+    
+    def get(self, request, project_id, from_version, to_version):
+        project = get_object_or_404(Project, id=project_id, company__members__user=request.user)
+        old_budget = get_object_or_404(Budget, project=project, version=from_version)
+        new_budget = get_object_or_404(Budget, project=project, version=to_version)
+        
+        return JsonResponse({
+            'status': 'success',
+            'diff': diff_budgets(old_budget, new_budget)
+        })
+
+
+
+class BudgetSimulationView(LoginRequiredMixin, View):
+    """Monte Carlo risk simulation for a budget version"""
+    
+    MAX_TRIALS = 200000
+    
+    def get(self, request, project_id, version):
+        project = get_object_or_404(Project, id=project_id, company__members__user=request.user)
+        budget = get_object_or_404(Budget, project=project, version=version)
+        
+        try:
+            trials = min(int(request.GET.get('trials', DEFAULT_TRIALS)), self.MAX_TRIALS)
+            seed = int(request.GET['seed']) if request.GET.get('seed') else None
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'trials and seed must be integers'}, status=400)
+        if trials < 1:
+            return JsonResponse({'status': 'error', 'message': 'trials must be positive'}, status=400)
+        
+        try:
+            simulation = simulate_budget(budget, trials=trials, seed=seed)
+        except ValueError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+        
+        return JsonResponse({
+            'status': 'success',
+            'simulation': simulation
+        })
+
+
+
+class BudgetExportView(LoginRequiredMixin, View):
+    """Stream a budget version as CSV or XLSX"""
+    
+    def get(self, request, project_id, version):
+        project = get_object_or_404(Project, id=project_id, company__members__user=request.user)
+        budget = get_object_or_404(Budget, project=project, version=version)
+        
+        file_format = request.GET.get('format', 'csv')
+        if file_format == 'xlsx':
+            response = StreamingHttpResponse(export_xlsx(budget), content_type=XLSX_CONTENT_TYPE)
+        elif file_format == 'csv':
+            response = StreamingHttpResponse(export_csv(budget), content_type='text/csv; charset=utf-8')
+        else:
+            return JsonResponse({'status': 'error', 'message': f'Unsupported format: {file_format}'}, status=400)
+        
+        filename = f'budget-v{budget.version}.{file_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class BudgetImportView(LoginRequiredMixin, View):
+    """Load a CSV or XLSX file as a new budget version"""
+    
+    def post(self, request, project_id):
+        project = get_object_or_404(Project, id=project_id, company__members__user=request.user)
+        upload = request.FILES.get('file')
+        if not upload:
+            return JsonResponse({'status': 'error', 'message': 'Please choose a file to import'}, status=400)
+        
+        file_format = upload.name.rsplit('.', 1)[-1].lower() if '.' in upload.name else ''
+        try:
+            result = BudgetImporter(project, created_by=request.user).import_file(upload, file_format)
+        except (ValueError, KeyError, IndexError, zipfile.BadZipFile, csv.Error) as e:
+            return JsonResponse({'status': 'error', 'message': f'Import failed: {str(e)}'}, status=400)
+        
+        return JsonResponse({
+            'status': 'success',
+            'message': f"Imported {result['rows_imported']} lines as budget v{result['version']}",
+            **result
+        })
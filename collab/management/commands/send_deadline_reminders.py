@@ -0,0 +1,23 @@
+"""
+Django management command to send grant and festival deadline reminders.
+Usage: python manage.py send_deadline_reminders (run daily, e.g. from cron)
+"""
+from django.core.management.base import BaseCommand
+
+from collab.reminders import dispatch_reminders
+
+
+class Command(BaseCommand):
+    help = 'Notify company members about upcoming grant and festival deadlines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grant-days', type=int, help='Reminder window for grants (default: GRANT_REMINDER_DAYS)')
+        parser.add_argument('--festival-days', type=int,
+                            help='Reminder window for festivals (default: FESTIVAL_REMINDER_DAYS)')
+
+    def handle(self, *args, **options):
+        summary = dispatch_reminders(grant_days=options['grant_days'], festival_days=options['festival_days'])
+        self.stdout.write(self.style.SUCCESS(
+            'Reminded {grant_matches} grant and {festival_matches} festival matches '
+            'in {notifications} notifications'.format(**summary)
+        ))
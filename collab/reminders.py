@@ -0,0 +1,132 @@
+"""
+Deadline reminders for grant and festival matches.
+
+Matches still owed a reminder are found by a range scan over the deadline
+index, joined to a partial index of unreminded matches, and streamed in
+chunks. Reminders are grouped per user and project: a company member gets
+one notification per project listing its upcoming deadlines. Notifications
+are bulk-created and the matches flagged in chunked UPDATEs, so a run costs
+a handful of queries per few thousand matches rather than one per row.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Profile
+from collab.models import Notification
+from festivals.models import FestivalMatch
+from grants.models import GrantMatch
+
+
+CHUNK_SIZE = 5000
+MAX_LISTED = 5
+
+# Matches past these stages no longer need a nudge
+GRANT_REMINDER_STATUSES = ['suggested', 'interested']
+FESTIVAL_REMINDER_STATUSES = ['considering']
+
+
+def _grant_rows(today, until):
+    """(match id, company id, project id, project name, item title, deadline) of due grant matches"""
+    rows = GrantMatch.objects.filter(
+        deadline_reminder_sent=False,
+        status__in=GRANT_REMINDER_STATUSES,
+        grant__deadline__gte=today,
+        grant__deadline__lte=until,
+    ).order_by().values_list(
+        'id', 'project__company_id', 'project_id', 'project__name', 'grant__title', 'grant__deadline'
+    )
+    yield from rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _festival_rows(today, until):
+    """Same shape as _grant_rows; a festival's deadline is its next one still open"""
+    window = Q()
+    for field in ('deadline_early', 'deadline_regular', 'deadline_late'):
+        window |= Q(**{f'festival__{field}__gte': today, f'festival__{field}__lte': until})
+    rows = FestivalMatch.objects.filter(
+        window,
+        deadline_reminder_sent=False,
+        status__in=FESTIVAL_REMINDER_STATUSES,
+    ).order_by().values_list(
+        'id', 'project__company_id', 'project_id', 'project__name', 'festival__name',
+        'festival__deadline_early', 'festival__deadline_regular', 'festival__deadline_late'
+    )
+    for match_id, company_id, project_id, project_name, name, *deadlines in rows.iterator(chunk_size=CHUNK_SIZE):
+        deadline = min(deadline for deadline in deadlines if deadline and deadline >= today)
+        yield match_id, company_id, project_id, project_name, name, deadline
+
+
+def _message(items):
+    items.sort()
+    lines = [f"• {title} ({deadline.strftime('%b %d')})" for deadline, title in items[:MAX_LISTED]]
+    if len(items) > MAX_LISTED:
+        lines.append(f"…and {len(items) - MAX_LISTED} more")
+    return '\n'.join(lines)
+
+
+def _dispatch(kind, rows, model, link_name):
+    """Notify company members about ``rows`` and flag the matches; returns (matches, notifications)"""
+    projects = {}  # project id -> (company id, project name, [(deadline, title)])
+    match_ids = []
+    for match_id, company_id, project_id, project_name, title, deadline in rows:
+        projects.setdefault(project_id, (company_id, project_name, []))[2].append((deadline, title))
+        match_ids.append(match_id)
+    if not match_ids:
+        return 0, 0
+
+    members = {}
+    for company_id, user_id in Profile.objects.filter(
+        company_id__in={company_id for company_id, _, _ in projects.values()}
+    ).values_list('company_id', 'user_id'):
+        members.setdefault(company_id, []).append(user_id)
+
+    notifications = []
+    for project_id, (company_id, project_name, items) in projects.items():
+        noun = f"{kind} deadline" if len(items) == 1 else f"{kind} deadlines"
+        title = f"{len(items)} {noun} coming up for {project_name}"[:200]
+        message = _message(items)
+        link = reverse(link_name, args=[project_id])
+        notifications.extend(
+            Notification(user_id=user_id, type=f'{kind}_deadline', title=title, message=message, link=link)
+            for user_id in members.get(company_id, [])
+        )
+    Notification.objects.bulk_create(notifications, batch_size=1000)
+
+    # Same value for every row: a chunked UPDATE ... WHERE id IN (...) instead of per-row CASE statements
+    for start in range(0, len(match_ids), CHUNK_SIZE):
+        model.objects.filter(id__in=match_ids[start:start + CHUNK_SIZE]).update(deadline_reminder_sent=True)
+    return len(match_ids), len(notifications)
+
+
+def dispatch_reminders(today=None, grant_days=None, festival_days=None):
+    """
+    Send reminders for matches whose deadline falls within the next
+    ``grant_days`` / ``festival_days`` days (settings.GRANT_REMINDER_DAYS and
+    settings.FESTIVAL_REMINDER_DAYS by default). Each match is reminded once.
+
+    Returns:
+        Dict with counts of grant and festival matches reminded and notifications created
+    """
+    today = today or timezone.now().date()
+    grant_days = settings.GRANT_REMINDER_DAYS if grant_days is None else grant_days
+    festival_days = settings.FESTIVAL_REMINDER_DAYS if festival_days is None else festival_days
+
+    with transaction.atomic():
+        grant_matches, grant_notifications = _dispatch(
+            'grant', _grant_rows(today, today + datetime.timedelta(days=grant_days)),
+            GrantMatch, 'projects:grants'
+        )
+        festival_matches, festival_notifications = _dispatch(
+            'festival', _festival_rows(today, today + datetime.timedelta(days=festival_days)),
+            FestivalMatch, 'projects:festivals'
+        )
+    return {
+        'grant_matches': grant_matches,
+        'festival_matches': festival_matches,
+        'notifications': grant_notifications + festival_notifications,
+    }
@@ -0,0 +1,39 @@
+"""
+Django management command to scrape grant and festival sources.
+Usage: python manage.py scrape_sources [--kind grant] [--source NAME ...]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.scraping import runner
+from core.scraping.sources import load_sources
+
+
+class Command(BaseCommand):
+    help = 'Scrape configured grant and festival sources and ingest their listings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=['grant', 'festival'], help='Only scrape sources of this kind')
+        parser.add_argument('--source', action='append', dest='names', help='Only scrape this source (repeatable)')
+        parser.add_argument('--max-age', type=int, default=0,
+                            help='Reuse cached responses younger than this many seconds without revalidating')
+
+    def handle(self, *args, **options):
+        try:
+            sources = load_sources(kind=options['kind'], names=options['names'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise CommandError(f'Invalid scraper source configuration: {e}')
+        if not sources:
+            self.stdout.write(self.style.WARNING('No sources configured'))
+            return
+
+        summary = runner.scrape(sources=sources, max_age=options['max_age'])
+        for name, report in summary.items():
+            if 'error' in report:
+                self.stdout.write(self.style.ERROR(f"{name}: {report['error']}"))
+            else:
+                self.stdout.write(
+                    f"{name}: {report['pages']} pages ({report['unchanged_pages']} unchanged), "
+                    f"{report['inserted']} inserted, {report['updated']} updated, {report['unchanged']} unchanged"
+                )
+        failed = sum('error' in report for report in summary.values())
+        self.stdout.write(self.style.SUCCESS(f'Scraped {len(summary) - failed} of {len(summary)} sources'))
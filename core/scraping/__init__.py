@@ -0,0 +1,8 @@
+"""
+Scraping of grant and festival sources.
+
+fetcher: async HTTP with per-host pooling, limits and an on-disk cache.
+sources: source adapters that turn responses into records.
+runner: fetches every configured source concurrently and hands the records
+to the ingestion code.
+"""
@@ -0,0 +1,239 @@
+"""
+Async HTTP fetching for scrapers.
+
+Each host gets its own pooled httpx client, a concurrency cap and a minimum
+spacing between requests, so one slow or strict site never holds up the
+others. Responses are kept in an on-disk cache (settings.SCRAPER_CACHE_DIR).
+Later fetches send If-None-Match / If-Modified-Since, and a 304 is answered
+from the cached body. Transient failures (timeouts, 429 and 5xx) are retried
+with backoff, honouring Retry-After.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import httpx
+from django.conf import settings
+
+
+USER_AGENT = 'FilmApp-Scraper/1.0'
+TIMEOUT = 30.0
+PER_HOST_CONCURRENCY = 4
+PER_HOST_RATE = 2.0  # requests per second
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """A URL could not be fetched after retries"""
+
+
+class FetchResult:
+    """A response body and the headers that matter to callers"""
+
+    def __init__(self, url, status, body, headers, from_cache=False, not_modified=False):
+        self.url = url
+        self.status = status
+        self.body = body
+        self.headers = headers
+        self.from_cache = from_cache        # Served without contacting the host (fresh cache entry)
+        self.not_modified = not_modified    # Unchanged since the previous fetch
+
+    @property
+    def unchanged(self):
+        return self.from_cache or self.not_modified
+
+    def text(self):
+        return self.body.decode(self._charset(), errors='replace')
+
+    def json(self):
+        return json.loads(self.text())
+
+    def _charset(self):
+        content_type = self.headers.get('content-type', '')
+        for part in content_type.split(';')[1:]:
+            key, _, value = part.strip().partition('=')
+            if key.lower() == 'charset' and value:
+                return value.strip('"')
+        return 'utf-8'
+
+
+class ResponseCache:
+    """Response bodies and validators on disk, one pair of files per URL"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or settings.SCRAPER_CACHE_DIR
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        folder = os.path.join(self.directory, key[:2])
+        return os.path.join(folder, f'{key}.json'), os.path.join(folder, f'{key}.body')
+
+    def get(self, url):
+        """(metadata, body) for ``url``, or None"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path) as handle:
+                meta = json.load(handle)
+            with open(body_path, 'rb') as handle:
+                return meta, handle.read()
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url, status, headers, body):
+        meta_path, body_path = self._paths(url)
+        meta = {
+            'url': url,
+            'status': status,
+            'fetched_at': time.time(),
+            'headers': {
+                name: headers[name] for name in ('etag', 'last-modified', 'content-type') if name in headers
+            },
+        }
+        # Body first, then metadata: a reader never sees validators for a body that is not there
+        _write_atomic(body_path, body, 'wb')
+        _write_atomic(meta_path, json.dumps(meta), 'w')
+
+    def touch(self, url):
+        """Mark a cached entry as revalidated now"""
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path) as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            return
+        meta['fetched_at'] = time.time()
+        _write_atomic(meta_path, json.dumps(meta), 'w')
+
+
+def _write_atomic(path, data, mode):
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    with os.fdopen(handle, mode) as output:
+        output.write(data)
+    os.replace(temporary, path)
+
+
+class _Host:
+    """Client, concurrency slot and request spacing for one host"""
+
+    def __init__(self, concurrency, rate):
+        self.client = httpx.AsyncClient(
+            timeout=TIMEOUT,
+            follow_redirects=True,
+            headers={'User-Agent': USER_AGENT},
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self.slots = asyncio.Semaphore(concurrency)
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait_turn(self):
+        async with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class Fetcher:
+    """
+    Async fetcher shared by every source in a scrape run.
+
+    Use as ``async with Fetcher() as fetcher``. ``host_limits`` maps a host
+    to ``(concurrency, requests per second)`` for sites that need gentler
+    (or allow faster) crawling than the defaults.
+    """
+
+    def __init__(self, cache=None, concurrency=PER_HOST_CONCURRENCY, rate=PER_HOST_RATE,
+                 host_limits=None, max_age=0):
+        self.cache = cache if cache is not None else ResponseCache()
+        self.concurrency = concurrency
+        self.rate = rate
+        self.host_limits = host_limits or {}
+        self.max_age = max_age  # Seconds a cached response is used without revalidating
+        self._hosts = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await asyncio.gather(*(host.client.aclose() for host in self._hosts.values()))
+        self._hosts = {}
+
+    def _host(self, url):
+        name = urlsplit(url).netloc.lower()
+        if name not in self._hosts:
+            concurrency, rate = self.host_limits.get(name, (self.concurrency, self.rate))
+            self._hosts[name] = _Host(concurrency, rate)
+        return self._hosts[name]
+
+    async def fetch(self, url, max_age=None):
+        """FetchResult for ``url``; raises FetchError when it cannot be retrieved"""
+        max_age = self.max_age if max_age is None else max_age
+        cached = self.cache.get(url)
+        if cached and max_age and time.time() - cached[0]['fetched_at'] < max_age:
+            meta, body = cached
+            return FetchResult(url, meta['status'], body, meta['headers'], from_cache=True)
+
+        headers = {}
+        if cached:
+            validators = cached[0]['headers']
+            if 'etag' in validators:
+                headers['If-None-Match'] = validators['etag']
+            if 'last-modified' in validators:
+                headers['If-Modified-Since'] = validators['last-modified']
+
+        response = await self._request(url, headers)
+        if response.status_code == 304 and cached:
+            meta, body = cached
+            await asyncio.to_thread(self.cache.touch, url)
+            return FetchResult(url, meta['status'], body, meta['headers'], not_modified=True)
+        if response.status_code >= 400:
+            raise FetchError(f'{url}: HTTP {response.status_code}')
+
+        body = response.content
+        response_headers = {name.lower(): value for name, value in response.headers.items()}
+        await asyncio.to_thread(self.cache.put, url, response.status_code, response_headers, body)
+        # Servers without validators: an identical body still counts as unchanged
+        not_modified = bool(cached) and cached[1] == body
+        return FetchResult(url, response.status_code, body, response_headers, not_modified=not_modified)
+
+    async def _request(self, url, headers):
+        host = self._host(url)
+        for attempt in range(MAX_RETRIES + 1):
+            async with host.slots:
+                await host.wait_turn()
+                try:
+                    response = await host.client.get(url, headers=headers)
+                except httpx.TransportError as e:
+                    if attempt == MAX_RETRIES:
+                        raise FetchError(f'{url}: {e}') from e
+                    response = None
+            if response is not None and (response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES):
+                return response
+            await asyncio.sleep(_retry_delay(response, attempt))
+        raise FetchError(f'{url}: retries exhausted')
+
+
+def _retry_delay(response, attempt):
+    backoff = min(2 ** attempt, 30)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    if not retry_after:
+        return backoff
+    try:
+        return min(float(retry_after), 120)
+    except ValueError:
+        pass
+    try:
+        return min(max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0), 120)
+    except (TypeError, ValueError):
+        return backoff
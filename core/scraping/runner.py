@@ -0,0 +1,114 @@
+"""
+Scrape runs.
+
+Every source is crawled concurrently on one event loop and one Fetcher, so
+total time is bounded by the slowest host's rate limit rather than the sum
+of all sources. Pages are parsed in worker threads while other requests
+are in flight. Records are ingested after the loop finishes, one source at
+a time, through the grant and festival bulk ingestion code, each in its
+own savepoint. A failing source is reported and does not stop the others.
+"""
+import asyncio
+
+from django.db import transaction
+
+from core.scraping.fetcher import Fetcher, FetchError
+from core.scraping.sources import load_sources
+
+
+MAX_CONCURRENT_SOURCES = 50
+
+
+class SourceResult:
+    """What one source yielded in a run"""
+
+    def __init__(self, source):
+        self.source = source
+        self.records = []
+        self.pages = 0
+        self.unchanged_pages = 0
+        self.error = None
+
+
+async def _crawl(fetcher, source, result):
+    seen = set()
+    pending = list(source.urls)
+    while pending and result.pages < source.max_pages:
+        urls = [url for url in dict.fromkeys(pending) if url not in seen][:source.max_pages - result.pages]
+        seen.update(urls)
+        pending = []
+        fetched = await asyncio.gather(*(fetcher.fetch(url) for url in urls))
+        for page in fetched:
+            # Unchanged pages are still parsed: ingestion skips their records cheaply by hash,
+            # and a run that failed after fetching cannot leave them permanently unloaded
+            records, next_urls = await asyncio.to_thread(source.parse, page)
+            result.records.extend(records)
+            result.pages += 1
+            result.unchanged_pages += page.unchanged
+            pending.extend(next_urls)
+
+
+async def _crawl_all(sources, fetcher_options):
+    slots = asyncio.Semaphore(MAX_CONCURRENT_SOURCES)
+    results = [SourceResult(source) for source in sources]
+
+    async def crawl(fetcher, result):
+        async with slots:
+            try:
+                await _crawl(fetcher, result.source, result)
+            except FetchError as e:
+                result.error = str(e)
+            except Exception as e:
+                # Adapter bug or malformed feed: report it and let the other sources finish
+                result.error = f'Parse failed: {e}'
+
+    async with Fetcher(**fetcher_options) as fetcher:
+        await asyncio.gather(*(crawl(fetcher, result) for result in results))
+    return results
+
+
+def crawl(sources, **fetcher_options):
+    """Fetch and parse ``sources``; returns a SourceResult per source"""
+    return asyncio.run(_crawl_all(sources, fetcher_options))
+
+
+def _ingest(result):
+    if result.source.kind == 'grant':
+        from grants.ingest import ingest
+        return ingest(result.records, source=result.source.name)
+    from festivals.ingest import ingest
+    return ingest(result.records)
+
+
+def scrape(kind=None, names=None, sources=None, **fetcher_options):
+    """
+    Crawl configured sources and ingest their records.
+
+    Returns:
+        Dict of source name -> {'pages', 'unchanged_pages', 'records', and
+        the ingestion counts, or 'error'}
+    """
+    if sources is None:
+        sources = load_sources(kind=kind, names=names)
+    summary = {}
+    results = crawl(sources, **fetcher_options)
+    # One transaction, so typeahead, facets and matches are refreshed once for the whole run
+    with transaction.atomic():
+        for result in results:
+            summary[result.source.name] = _report(result)
+    return summary
+
+
+def _report(result):
+    report = {'pages': result.pages, 'unchanged_pages': result.unchanged_pages, 'records': len(result.records)}
+    if result.error:
+        # Keep what the source's other pages produced out of the catalog; the next run retries it whole
+        report['error'] = result.error
+    else:
+        try:
+            with transaction.atomic():
+                report.update(_ingest(result))
+        except Exception as e:
+            # Only this source's savepoint is rolled back; the others still commit
+            report['error'] = f'Ingest failed: {e}'
+    return report
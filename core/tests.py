@@ -0,0 +1,143 @@
+import datetime
+import json
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+
+from core.scraping import runner
+from core.scraping.sources import build_source
+from festivals.models import Festival
+from grants.models import Grant
+
+
+DEADLINE = (datetime.date.today() + datetime.timedelta(days=60)).isoformat()
+
+PAGES = {
+    '/grants.json': {
+        'grants': [
+            {'id': 'g1', 'title': 'Documentary Fund', 'organization': 'Film Trust',
+             'url': 'https://example.org/g1', 'deadline': DEADLINE, 'amount_max': '25000'},
+        ],
+        'next': '/grants-2.json',
+    },
+    '/grants-2.json': {
+        'grants': [
+            {'id': 'g2', 'title': 'Short Film Award', 'organization': 'Film Trust',
+             'url': 'https://example.org/g2', 'deadline': DEADLINE},
+        ],
+    },
+    '/festivals.csv': (
+        'name,location,website_url,tier\n'
+        'Harbour Film Festival,Lisbon,https://example.org/harbour,regional\n'
+    ),
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves PAGES with an ETag, answering matching conditional GETs with 304"""
+
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append((self.path, self.headers.get('If-None-Match')))
+        page = PAGES.get(self.path)
+        if page is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = page if isinstance(page, str) else json.dumps(page)
+        etag = f'"{abs(hash(body))}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv' if self.path.endswith('.csv') else 'application/json')
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+class ScrapeTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        FixtureHandler.requests = []
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        settings_override = override_settings(SCRAPER_CACHE_DIR=cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _sources(self, *extra):
+        return [
+            build_source({'name': 'trust', 'kind': 'grant', 'adapter': 'json',
+                          'url': f'{self.base_url}/grants.json', 'records': 'grants', 'next': 'next'}),
+            build_source({'name': 'festivals', 'kind': 'festival', 'adapter': 'csv',
+                          'url': f'{self.base_url}/festivals.csv'}),
+            *extra,
+        ]
+
+    def _scrape(self, sources):
+        return runner.scrape(sources=sources, rate=0)
+
+    def test_ingests_grants_and_festivals(self):
+        summary = self._scrape(self._sources())
+
+        self.assertEqual(summary['trust']['pages'], 2)
+        self.assertEqual(summary['trust']['records'], 2)
+        self.assertEqual(summary['trust']['inserted'], 2)
+        self.assertEqual(summary['festivals']['inserted'], 1)
+        self.assertEqual(Grant.objects.filter(source='trust').count(), 2)
+        self.assertTrue(Festival.objects.filter(name='Harbour Film Festival', location='Lisbon').exists())
+
+    def test_unchanged_pages_are_revalidated(self):
+        self._scrape(self._sources())
+        FixtureHandler.requests = []
+
+        summary = self._scrape(self._sources())
+
+        self.assertTrue(all(etag for _, etag in FixtureHandler.requests))
+        self.assertEqual(summary['trust']['unchanged_pages'], 2)
+        self.assertEqual(summary['festivals']['unchanged_pages'], 1)
+        self.assertEqual((summary['trust']['inserted'], summary['trust']['unchanged']), (0, 2))
+        self.assertEqual(summary['festivals']['unchanged'], 1)
+
+    def test_failing_source_does_not_stop_the_others(self):
+        broken = build_source({'name': 'broken', 'kind': 'grant', 'adapter': 'json',
+                               'url': f'{self.base_url}/missing.json'})
+
+        summary = self._scrape(self._sources(broken))
+
+        self.assertIn('HTTP 404', summary['broken']['error'])
+        self.assertEqual(summary['trust']['inserted'], 2)
+        self.assertEqual(summary['festivals']['inserted'], 1)
+
+    def test_failing_ingest_only_rolls_back_its_source(self):
+        with mock.patch('festivals.ingest.ingest', side_effect=IntegrityError('duplicate')):
+            summary = self._scrape(self._sources())
+
+        self.assertIn('duplicate', summary['festivals']['error'])
+        self.assertEqual(summary['trust']['inserted'], 2)
+        self.assertEqual(Grant.objects.filter(source='trust').count(), 2)
+        self.assertFalse(Festival.objects.exists())
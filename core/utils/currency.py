@@ -0,0 +1,133 @@
+"""
+Offline currency conversion.
+
+Rates come from a local CSV table (settings.EXCHANGE_RATES_FILE) with one row
+per currency and effective date, expressed as units of the currency per USD.
+The table is loaded once per process and cached; conversions pick the latest
+rate effective on the requested date, so historical amounts convert at the
+rate of their day.
+"""
+import csv
+import threading
+from bisect import bisect_right
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db.models import Q
+
+
+BASE_CURRENCY = 'USD'
+CENT = Decimal('0.01')
+
+_lock = threading.Lock()
+_table = None
+
+
+class RateTable:
+    """Date-effective exchange rates, all quoted against BASE_CURRENCY"""
+
+    def __init__(self, rows):
+        series = {}
+        for effective_date, currency, per_usd in rows:
+            series.setdefault(currency.upper(), []).append((effective_date, Decimal(per_usd)))
+        self._dates = {}
+        self._rates = {}
+        for currency, points in series.items():
+            points.sort()
+            self._dates[currency] = [point[0] for point in points]
+            self._rates[currency] = [point[1] for point in points]
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline='', encoding='utf-8') as handle:
+            rows = [
+                (datetime.strptime(row['effective_date'], '%Y-%m-%d').date(), row['currency'].strip(), row['per_usd'])
+                for row in csv.DictReader(handle)
+                if row.get('currency')
+            ]
+        return cls(rows)
+
+    @property
+    def currencies(self):
+        return set(self._rates)
+
+    def per_usd(self, currency, on=None):
+        """Units of ``currency`` per USD effective on ``on`` (defaults to today)"""
+        currency = (currency or BASE_CURRENCY).upper()
+        if currency not in self._rates:
+            raise ValueError(f"No exchange rate for currency '{currency}'")
+        index = bisect_right(self._dates[currency], on or date.today()) - 1
+        # Dates before the first entry use the earliest known rate
+        return self._rates[currency][max(index, 0)]
+
+    def rate(self, from_currency, to_currency, on=None):
+        """Multiplier converting an amount in ``from_currency`` to ``to_currency``"""
+        if (from_currency or BASE_CURRENCY).upper() == (to_currency or BASE_CURRENCY).upper():
+            return Decimal('1')
+        return self.per_usd(to_currency, on) / self.per_usd(from_currency, on)
+
+    def rates_to(self, to_currency, currencies, on=None):
+        """
+        Conversion multipliers from each of ``currencies`` into ``to_currency``.
+        Currencies missing from the table are left out of the result.
+        """
+        rates = {}
+        for currency in set(currencies):
+            try:
+                rates[currency] = self.rate(currency, to_currency, on)
+            except ValueError:
+                continue
+        return rates
+
+
+def get_rate_table() -> RateTable:
+    """Process-wide rate table, loaded from disk on first use"""
+    global _table
+    if _table is None:
+        with _lock:
+            if _table is None:
+                _table = RateTable.from_csv(settings.EXCHANGE_RATES_FILE)
+    return _table
+
+
+def clear_cache():
+    """Drop the cached table so the next lookup reloads the rate file"""
+    global _table
+    with _lock:
+        _table = None
+
+
+def convert(amount, from_currency, to_currency, on: Optional[date] = None) -> Optional[Decimal]:
+    """Convert a single amount, rounded to cents"""
+    if amount is None:
+        return None
+    rate = get_rate_table().rate(from_currency, to_currency, on)
+    return (Decimal(amount) * rate).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def rates_to(to_currency, currencies: Iterable[str], on: Optional[date] = None) -> Dict[str, Decimal]:
+    """Bulk lookup of multipliers into ``to_currency``; see RateTable.rates_to"""
+    return get_rate_table().rates_to(to_currency, currencies, on)
+
+
+def amount_filter(field, lookup, amount, currency, currency_field='currency', on=None):
+    """
+    Q object comparing a money column stored in mixed currencies against an
+    amount expressed in ``currency``. The amount is converted once per
+    currency in the rate table; rows in currencies the table does not know
+    are kept, since they cannot be ruled out. Raises ValueError when
+    ``currency`` itself is not in the table.
+
+    Example:
+        amount_filter('amount_max', 'gte', Decimal('10000'), 'GBP')
+    """
+    table = get_rate_table()
+    table.per_usd(currency, on)
+    known = table.currencies
+    condition = ~Q(**{f'{currency_field}__in': known})
+    for code in known:
+        converted = (Decimal(amount) * table.rate(currency, code, on)).quantize(CENT, rounding=ROUND_HALF_UP)
+        condition |= Q(**{currency_field: code, f'{field}__{lookup}': converted})
+    return condition
@@ -0,0 +1,112 @@
+"""
+Bulk ingestion of scraped festival records.
+
+Festivals are identified by (name, location), as the sample loaders did.
+Records are normalized with the grant ingestion helpers and compared with
+the stored rows. Only new festivals are inserted and only changed ones
+updated, so untouched rows keep their updated_at.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from festivals.models import Festival
+from grants.ingest import (
+    InvalidRecord, clean_text, parse_amount, parse_choice, parse_date, parse_json,
+)
+
+
+BATCH_SIZE = 500
+
+DATE_FIELDS = ['deadline_early', 'deadline_regular', 'deadline_late']
+FEE_FIELDS = ['fee_early', 'fee_regular', 'fee_late']
+FEE_LIMIT = parse_amount('999999.99')  # fee fields are max_digits=8, decimal_places=2
+FIELDS = [
+    'website_url', 'submission_url', 'dates', *DATE_FIELDS, *FEE_FIELDS,
+    'currency', 'tier', 'genres', 'eligibility_criteria', 'awards', 'prestige_score',
+]
+
+
+def normalize(record):
+    """Festival field values for a scraped record; raises InvalidRecord"""
+    record = {key.strip().lower(): value for key, value in record.items() if key}
+    values = {
+        'name': clean_text(record.get('name'), 200),
+        'location': clean_text(record.get('location'), 200),
+        'website_url': clean_text(record.get('website_url')),
+        'submission_url': clean_text(record.get('submission_url')),
+    }
+    if not (values['name'] and values['location'] and values['website_url']):
+        raise InvalidRecord('Missing name, location or website_url')
+    if len(values['website_url']) > 200 or len(values['submission_url']) > 200:
+        raise InvalidRecord('Overlong url')
+
+    for field in DATE_FIELDS:
+        values[field] = parse_date(record[field]) if record.get(field) not in (None, '') else None
+    for field in FEE_FIELDS:
+        values[field] = parse_amount(record.get(field), limit=FEE_LIMIT)
+    currency = clean_text(record.get('currency')).upper()
+    values['currency'] = currency if len(currency) == 3 and currency.isalpha() else 'USD'
+    values['tier'] = parse_choice(record.get('tier'), Festival.TIER_CHOICES, 'regional')
+    values['dates'] = parse_json(record.get('dates'), dict)
+    values['eligibility_criteria'] = parse_json(record.get('eligibility_criteria'), dict)
+    values['genres'] = parse_json(record.get('genres'), list)
+    values['awards'] = parse_json(record.get('awards'), list)
+    try:
+        values['prestige_score'] = min(max(int(record.get('prestige_score') or 50), 0), 100)
+    except (TypeError, ValueError):
+        values['prestige_score'] = 50
+    return values
+
+
+def _write_batch(records, summary):
+    batch = {}
+    for record in records:
+        try:
+            values = normalize(record)
+        except InvalidRecord:
+            summary['invalid'] += 1
+            continue
+        batch[(values['name'], values['location'])] = values
+
+    stored = {
+        (festival.name, festival.location): festival
+        for festival in Festival.objects.filter(name__in={name for name, _ in batch})
+    }
+    created, changed = [], []
+    now = timezone.now()
+    for key, values in batch.items():
+        festival = stored.get(key)
+        if festival is None:
+            created.append(Festival(**values))
+        elif any(getattr(festival, field) != values[field] for field in FIELDS):
+            for field in FIELDS:
+                setattr(festival, field, values[field])
+            festival.updated_at = now  # bulk_update does not apply auto_now
+            changed.append(festival)
+        else:
+            summary['unchanged'] += 1
+
+    Festival.objects.bulk_create(created)
+    Festival.objects.bulk_update(changed, [*FIELDS, 'updated_at'])
+    summary['inserted'] += len(created)
+    summary['updated'] += len(changed)
+
+
+def ingest(records, batch_size=BATCH_SIZE):
+    """
+    Upsert scraped festival records.
+
+    Returns:
+        Dict with counts of inserted, updated, unchanged and invalid records
+    """
+    summary = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'invalid': 0}
+    with transaction.atomic():
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                _write_batch(batch, summary)
+                batch = []
+        if batch:
+            _write_batch(batch, summary)
+    return summary
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('festivals', '0002_initial'),
+        ('projects', '0002_project_additional_locations_project_company_info_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='festivalmatch',
+            name='deadline_reminder_sent',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='festival',
+            index=models.Index(fields=['deadline_early'], name='festivals_deadline_early_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='festival',
+            index=models.Index(fields=['deadline_regular'], name='festivals_deadline_reg_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='festival',
+            index=models.Index(fields=['deadline_late'], name='festivals_deadline_late_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='festivalmatch',
+            index=models.Index(condition=models.Q(('deadline_reminder_sent', False)), fields=['festival'], name='festivals_match_reminder_idx'),
+        ),
+    ]
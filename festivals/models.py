@@ -36,6 +36,12 @@ class Festival(models.Model):
     
     class Meta:
         ordering = ['-prestige_score', 'deadline_regular']
+        indexes = [
+            # Deadline reminders range-scan each deadline column
+            models.Index(fields=['deadline_early'], name='festivals_deadline_early_idx'),
+            models.Index(fields=['deadline_regular'], name='festivals_deadline_reg_idx'),
+            models.Index(fields=['deadline_late'], name='festivals_deadline_late_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.location})"
@@ -55,11 +61,18 @@ class FestivalMatch(models.Model):
     strategy_notes = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=MATCH_STATUS_CHOICES, default='considering')
     submitted_at = models.DateField(null=True, blank=True)
+    deadline_reminder_sent = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         unique_together = ['project', 'festival']
         ordering = ['-match_score', 'festival__deadline_regular']
+        indexes = [
+            models.Index(
+                fields=['festival'], condition=models.Q(deadline_reminder_sent=False),
+                name='festivals_match_reminder_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.project.name} -> {self.festival.name} ({self.match_score}%)"
\ No newline at end of file
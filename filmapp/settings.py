@@ -91,6 +91,24 @@ else:
         }
     }
 
+# Cache shared by every worker, so invalidations (e.g. grant facet counts) reach all of them:
+# Redis when REDIS_URL is set (needs the redis package), otherwise files shared by the workers on a host
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', str(BASE_DIR / 'var' / 'cache')),
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -135,5 +153,25 @@ SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY')
 SUPABASE_SERVICE_ROLE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 SUPABASE_STORAGE_BUCKET = os.getenv('SUPABASE_STORAGE_BUCKET', 'scripts')
 
+# Currency conversion (offline rate table: effective_date,currency,per_usd)
+EXCHANGE_RATES_FILE = os.getenv('EXCHANGE_RATES_FILE', str(BASE_DIR / 'core' / 'data' / 'exchange_rates.csv'))
+
+# Shoot calendar (local holidays skipped when assigning dates: date,name)
+HOLIDAYS_FILE = os.getenv('HOLIDAYS_FILE', str(BASE_DIR / 'core' / 'data' / 'holidays.csv'))
+
+# Offline gazetteer for location coordinates (name,latitude,longitude)
+GAZETTEER_FILE = os.getenv('GAZETTEER_FILE', str(BASE_DIR / 'core' / 'data' / 'gazetteer.csv'))
+
+# Grant search typeahead snapshots, shared by all workers on a host
+GRANT_TYPEAHEAD_DIR = os.getenv('GRANT_TYPEAHEAD_DIR', str(BASE_DIR / 'var' / 'typeahead'))
+
+# Grant and festival scraper sources (JSON list, see core.scraping.sources) and response cache
+SCRAPER_SOURCES_FILE = os.getenv('SCRAPER_SOURCES_FILE', str(BASE_DIR / 'core' / 'data' / 'scraper_sources.json'))
+SCRAPER_CACHE_DIR = os.getenv('SCRAPER_CACHE_DIR', str(BASE_DIR / 'var' / 'scraper-cache'))
+
+# Deadline reminders: days ahead of a grant or festival deadline that matches are reminded
+GRANT_REMINDER_DAYS = int(os.getenv('GRANT_REMINDER_DAYS', '14'))
+FESTIVAL_REMINDER_DAYS = int(os.getenv('FESTIVAL_REMINDER_DAYS', '21'))
+
 # CSRF trusted origins for HTMX
 CSRF_TRUSTED_ORIGINS = ['http://localhost:8000', 'http://127.0.0.1:8000']
\ No newline at end of file
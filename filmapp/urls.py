@@ -18,5 +18,7 @@ urlpatterns = [
     # Main app URLs
     path('projects/', include('projects.urls')),
     path('grants/', include('grants.urls')),
+    path('budgets/', include('budgets.urls')),
+    path('schedules/', include('schedules.urls')),
     path('agents/', include('agents.urls')),
 ]
\ No newline at end of file
@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _ensure_search_index(sender, using, **kwargs):
+    # SQLite drops triggers when a later migration rebuilds the grants table
+    from django.db import connections
+    from grants.search import install
+    install(connections[using])
 
 
 class GrantsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'grants'
\ No newline at end of file
+    name = 'grants'
+
+    def ready(self):
+        from grants import signals  # noqa: F401
+        post_migrate.connect(_ensure_search_index, sender=self)
@@ -0,0 +1,178 @@
+"""
+Inverted index over grant attributes.
+
+Each grant is indexed as GrantAttribute postings: its project types, grant
+type, funding type, tags, and location state/country. Values are normalized
+the same way the matcher compares them. Postings are updated incrementally
+when a grant is saved (see grants.signals). Bulk writes that skip signals
+call index_grants() themselves.
+
+Discovery uses the postings to prune grants that cannot reach the match
+threshold. Most scoring rules map to a posting (project type, stage and
+priority via grant type, location). Only a few depend on grant text or
+amounts. When the project can earn too few points from those rules, a
+grant must collect the rest from its postings, so one grouped query over
+the index gives the candidate set.
+"""
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Sum, Value, When
+
+from grants import scoring
+from grants.models import Grant, GrantAttribute
+
+
+# Stands in for values the index cannot represent exactly; always a candidate
+ANY_VALUE = '*'
+MAX_VALUE_LENGTH = 200
+INDEX_BATCH_SIZE = 2000
+
+
+def _value(value):
+    value = str(value)
+    return value if len(value) <= MAX_VALUE_LENGTH else ANY_VALUE
+
+
+def grant_attributes(grant):
+    """Set of (kind, value) postings for a grant"""
+    attributes = {
+        ('grant_type', _value(grant.grant_type)),
+        ('funding_type', _value(grant.funding_type)),
+    }
+
+    project_types = grant.project_types
+    if isinstance(project_types, list):
+        for project_type in project_types:
+            if isinstance(project_type, str):
+                attributes.add(('project_type', _value(project_type)))
+    elif project_types:
+        # Matched by substring or key; keep the grant in every candidate set
+        attributes.add(('project_type', ANY_VALUE))
+
+    for tag in grant.tags if isinstance(grant.tags, list) else []:
+        if tag:
+            attributes.add(('tag', _value(tag).lower()))
+
+    location = grant.location_restrictions if isinstance(grant.location_restrictions, dict) else {}
+    if location.get('state'):
+        attributes.add(('state', _value(location['state']).lower()))
+    if location.get('country'):
+        attributes.add(('country', _value(location['country']).lower()))
+    return attributes
+
+
+@transaction.atomic
+def index_grant(grant):
+    """Bring one grant's postings up to date, touching only what changed"""
+    current = set(GrantAttribute.objects.filter(grant=grant).values_list('kind', 'value'))
+    wanted = grant_attributes(grant)
+    stale = current - wanted
+    if stale:
+        condition = Q()
+        for kind, value in stale:
+            condition |= Q(kind=kind, value=value)
+        GrantAttribute.objects.filter(condition, grant=grant).delete()
+    GrantAttribute.objects.bulk_create(
+        [GrantAttribute(grant=grant, kind=kind, value=value) for kind, value in wanted - current]
+    )
+
+
+@transaction.atomic
+def index_grants(grants):
+    """Re-index a batch of grants (for bulk writes that skip signals)"""
+    grants = list(grants)
+    GrantAttribute.objects.filter(grant__in=grants).delete()
+    GrantAttribute.objects.bulk_create(
+        [
+            GrantAttribute(grant=grant, kind=kind, value=value)
+            for grant in grants
+            for kind, value in grant_attributes(grant)
+        ],
+        batch_size=INDEX_BATCH_SIZE
+    )
+
+
+def rebuild_index():
+    """Re-index every grant; returns the number of grants indexed"""
+    fields = ['id', 'grant_type', 'funding_type', 'project_types', 'tags', 'location_restrictions']
+    count = 0
+    batch = []
+    for grant in Grant.objects.only(*fields).order_by().iterator(chunk_size=INDEX_BATCH_SIZE):
+        batch.append(grant)
+        if len(batch) >= INDEX_BATCH_SIZE:
+            index_grants(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        index_grants(batch)
+        count += len(batch)
+    return count
+
+
+def postings(kind, values):
+    """Grant ids with any of ``values`` for ``kind``, as a subquery"""
+    return GrantAttribute.objects.filter(kind=kind, value__in=list(values)).values('grant_id')
+
+
+def candidate_postings(project, preferences, threshold=scoring.MATCH_THRESHOLD):
+    """
+    Subquery of grant ids that can still reach ``threshold`` for this project,
+    or None when every grant can (no pruning possible).
+
+    The bound is an upper bound, so pruning never drops a grant the full
+    scorer would match.
+    """
+    points = dict(scoring.POINTS)
+    needed = threshold - scoring.BASE_SCORE
+    if preferences and preferences.preferred_regions:
+        needed -= scoring.REGION_POINTS
+
+    # Points a grant may earn from rules the index does not cover
+    if getattr(project, 'genres', []):
+        needed -= points[scoring.GENRE]
+    if getattr(project, 'estimated_budget', None):
+        needed -= points[scoring.BUDGET]
+    if any(theme in getattr(project, 'themes', []) for theme in scoring.SOCIAL_THEMES):
+        needed -= points[scoring.THEME]
+    if getattr(project, 'diversity_flags', []):
+        needed -= points[scoring.DIVERSITY]
+    if needed <= 0:
+        return None
+
+    # Points each posting can contribute
+    terms = [(Q(kind='project_type', value__in=[project.type, ANY_VALUE]), points[scoring.PROJECT_TYPE])]
+
+    project_stage = getattr(project, 'project_stage', project.status)
+    stage_type = scoring.STAGE_GRANT_TYPES.get(project_stage, (None, None))[0]
+    priorities = preferences.funding_priorities if preferences and preferences.funding_priorities else []
+    for grant_type in {stage_type, *priorities} - {None}:
+        grant_type_points = (points[scoring.STAGE] if grant_type == stage_type else 0) + \
+            (points[scoring.PRIORITY] if grant_type in priorities else 0)
+        terms.append((Q(kind='grant_type', value=grant_type), grant_type_points))
+
+    project_location = getattr(project, 'production_location', {})
+    if project_location:
+        if project_location.get('state'):
+            terms.append((
+                Q(kind='state', value__in=[str(project_location['state']).lower(), ANY_VALUE]),
+                points[scoring.LOCATION]
+            ))
+        if (project_location.get('country') or '').lower() in scoring.US_COUNTRY_NAMES:
+            terms.append((Q(kind='country', value='united states'), points[scoring.COUNTRY]))
+
+    if sum(term_points for _, term_points in terms) < needed:
+        return GrantAttribute.objects.none().values('grant_id')
+
+    condition = Q()
+    for term, _ in terms:
+        condition |= term
+    return (
+        GrantAttribute.objects.filter(condition)
+        .values('grant_id')
+        .annotate(points=Sum(Case(
+            *[When(term, then=Value(term_points)) for term, term_points in terms],
+            default=Value(0),
+            output_field=IntegerField()
+        )))
+        .filter(points__gte=needed)
+        .values('grant_id')
+    )
@@ -0,0 +1,298 @@
+"""
+Bulk ingestion of grant catalog feeds.
+
+Records are streamed from JSON, JSONL or CSV (or passed in as dicts),
+normalized into Grant field values, and identified by (source, external_id).
+Feeds that carry no id get one derived from organization and title, the key
+the old get_or_create loaders used. Each record is hashed over its
+normalized fields. A batch needs one query to load the stored hashes, and
+only new or changed rows are written, in one bulk upsert. Unchanged rows
+are never touched, so their updated_at stays put. Records whose deadline
+has already passed are counted as expired and skipped.
+
+Bulk writes skip model signals, so the batch is re-indexed here and queued
+for the typeahead, facet and rematch updates that grant saves trigger.
+"""
+import csv
+import datetime
+import hashlib
+import json
+import os
+import re
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from grants import index, signals
+from grants.models import Grant
+
+
+BATCH_SIZE = 1000
+
+# Fields a feed may set, with the value used when a record leaves them out
+FIELD_DEFAULTS = {
+    'title': '',
+    'organization': '',
+    'url': '',
+    'deadline': None,
+    'amount_min': None,
+    'amount_max': None,
+    'currency': 'USD',
+    'grant_type': 'general',
+    'funding_type': 'grant',
+    'eligibility_criteria': dict,
+    'application_requirements': dict,
+    'location_restrictions': dict,
+    'project_types': list,
+    'description': '',
+    'selection_criteria': list,
+    'application_process': '',
+    'contact_info': dict,
+    'annual_cycle': False,
+    'tags': list,
+    'success_rate': None,
+}
+DICT_FIELDS = ['eligibility_criteria', 'application_requirements', 'location_restrictions', 'contact_info']
+LIST_FIELDS = ['project_types', 'selection_criteria', 'tags']
+TEXT_FIELDS = ['description', 'application_process']
+
+DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%d %B %Y', '%B %d, %Y', '%b %d, %Y']
+MAX_AMOUNT = Decimal('9999999999.99')  # amount fields are max_digits=12, decimal_places=2
+CENTS = Decimal('0.01')
+
+_SPACE = re.compile(r'\s+')
+_LIST_SEPARATOR = re.compile(r'[;,|]')
+_NON_NUMERIC = re.compile(r'[^\d.\-]')
+
+
+class InvalidRecord(ValueError):
+    """A feed record that cannot become a grant"""
+
+
+def read_records(path, format=None):
+    """
+    Yield records (dicts) from a JSON, JSONL or CSV file.
+
+    The format defaults to the file extension. JSONL and CSV are streamed
+    line by line; a JSON document (a list, or an object with a ``grants``
+    list) is parsed whole, so prefer JSONL for large feeds.
+    """
+    format = (format or os.path.splitext(path)[1].lstrip('.')).lower()
+    with open(path, newline='', encoding='utf-8') as handle:
+        if format == 'csv':
+            yield from csv.DictReader(handle)
+        elif format in ('jsonl', 'ndjson'):
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        elif format == 'json':
+            document = json.load(handle)
+            yield from document.get('grants', []) if isinstance(document, dict) else document
+        else:
+            raise ValueError(f'Unsupported feed format: {format}')
+
+
+def clean_text(value, max_length=None):
+    text = _SPACE.sub(' ', str(value)).strip() if value is not None else ''
+    return text[:max_length] if max_length else text
+
+
+def parse_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    text = clean_text(value)
+    try:
+        return datetime.date.fromisoformat(text[:10])
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    raise InvalidRecord(f'Unrecognized date: {value!r}')
+
+
+def parse_amount(value, limit=MAX_AMOUNT):
+    if value is None or value == '':
+        return None
+    if not isinstance(value, (int, Decimal)):
+        value = _NON_NUMERIC.sub('', str(value))
+    try:
+        amount = Decimal(value).quantize(CENTS)
+    except (InvalidOperation, ValueError):
+        return None
+    return amount if 0 <= amount <= limit else None
+
+
+def parse_choice(value, choices, default):
+    text = clean_text(value).lower().replace('-', '_').replace(' ', '_')
+    for key, label in choices:
+        if text in (key, label.lower().replace(' ', '_')):
+            return key
+    return default
+
+
+def parse_json(value, kind):
+    if isinstance(value, str):
+        text = value.strip()
+        if text[:1] in ('{', '['):
+            try:
+                value = json.loads(text)
+            except ValueError:
+                pass
+        elif kind is list:
+            value = [part.strip() for part in _LIST_SEPARATOR.split(text) if part.strip()]
+    if value in (None, ''):
+        return kind()
+    return value if isinstance(value, kind) else kind()
+
+
+def parse_boolean(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y')
+    return bool(value)
+
+
+def normalize(record):
+    """
+    Grant field values for a feed record, plus ``external_id``.
+
+    Raises InvalidRecord when a required field (title, organization, url,
+    deadline) is missing or unusable.
+    """
+    record = {key.strip().lower(): value for key, value in record.items() if key}
+    values = {}
+    for field, default in FIELD_DEFAULTS.items():
+        value = record.get(field)
+        values[field] = value if value not in (None, '') else (default() if callable(default) else default)
+
+    for field in ('title', 'organization'):
+        values[field] = clean_text(values[field], 200)
+        if not values[field]:
+            raise InvalidRecord(f'Missing {field}')
+    values['url'] = clean_text(values['url'])
+    if not values['url'] or len(values['url']) > 200:
+        raise InvalidRecord('Missing or overlong url')
+    if values['deadline'] is None:
+        raise InvalidRecord('Missing deadline')
+    values['deadline'] = parse_date(values['deadline'])
+
+    values['amount_min'] = parse_amount(values['amount_min'])
+    values['amount_max'] = parse_amount(values['amount_max'])
+    if values['amount_min'] is not None and values['amount_max'] is not None \
+            and values['amount_min'] > values['amount_max']:
+        values['amount_min'], values['amount_max'] = values['amount_max'], values['amount_min']
+    currency = clean_text(values['currency']).upper()
+    values['currency'] = currency if re.fullmatch(r'[A-Z]{3}', currency) else 'USD'
+    values['success_rate'] = parse_amount(values['success_rate'], limit=Decimal(100))
+
+    values['grant_type'] = parse_choice(values['grant_type'], Grant.GRANT_TYPES, 'general')
+    values['funding_type'] = parse_choice(values['funding_type'], Grant.FUNDING_TYPES, 'grant')
+    for field in DICT_FIELDS:
+        values[field] = parse_json(values[field], dict)
+    for field in LIST_FIELDS:
+        values[field] = parse_json(values[field], list)
+    for field in TEXT_FIELDS:
+        values[field] = str(values[field]).strip()
+    values['annual_cycle'] = parse_boolean(values['annual_cycle'])
+
+    external_id = clean_text(record.get('external_id') or record.get('id'), 255)
+    values['external_id'] = external_id or Grant.natural_key_for(values['title'], values['organization'])
+    return values
+
+
+def content_hash(values):
+    """Digest of the ingested fields; equal for records that would store the same grant"""
+    payload = {field: values[field] for field in FIELD_DEFAULTS}
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def grant_values(grant):
+    """The ingested fields of a stored grant, normalized as a feed record would be"""
+    record = {field: getattr(grant, field) for field in FIELD_DEFAULTS}
+    record['external_id'] = grant.external_id
+    return normalize(record)
+
+
+def _write_batch(records, source, today, summary):
+    """Upsert one batch; returns the grants written"""
+    batch = {}
+    for record in records:
+        try:
+            values = normalize(record)
+        except InvalidRecord:
+            summary['invalid'] += 1
+            continue
+        if values['deadline'] < today:
+            summary['expired'] += 1
+            continue
+        batch[values.pop('external_id')] = values  # Last occurrence in the feed wins
+
+    stored = {
+        external_id: (grant_id, digest)
+        for external_id, grant_id, digest in Grant.objects.filter(
+            source=source, external_id__in=list(batch)
+        ).values_list('external_id', 'id', 'content_hash')
+    }
+
+    grants, existing_ids = [], {}
+    for external_id, values in batch.items():
+        digest = content_hash(values)
+        grant_id, stored_digest = stored.get(external_id, (None, None))
+        if stored_digest == digest:
+            summary['unchanged'] += 1
+            continue
+        summary['updated' if grant_id else 'inserted'] += 1
+        grant = Grant(id=uuid.uuid4(), source=source, external_id=external_id, content_hash=digest, **values)
+        grants.append(grant)
+        if grant_id:
+            existing_ids[external_id] = grant_id
+
+    if grants:
+        # Conflicting rows keep their id and scraped_at; updated_at is refreshed
+        Grant.objects.bulk_create(
+            grants,
+            update_conflicts=True,
+            unique_fields=['source', 'external_id'],
+            update_fields=[*FIELD_DEFAULTS, 'content_hash', 'updated_at'],
+        )
+        for grant in grants:
+            grant.id = existing_ids.get(grant.external_id, grant.id)
+    return grants
+
+
+def ingest(records, source='manual', batch_size=BATCH_SIZE):
+    """
+    Upsert an iterable of feed records into the grant catalog.
+
+    Returns:
+        Dict with counts of inserted, updated, unchanged, expired and invalid records
+    """
+    summary = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'expired': 0, 'invalid': 0}
+    today = datetime.date.today()
+    with transaction.atomic():
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                _index_batch(_write_batch(batch, source, today, summary))
+                batch = []
+        if batch:
+            _index_batch(_write_batch(batch, source, today, summary))
+    return summary
+
+
+def _index_batch(grants):
+    if grants:
+        index.index_grants(grants)
+        signals.queue_changes(saved=[grant.id for grant in grants])
+
+
+def ingest_file(path, source, format=None, batch_size=BATCH_SIZE):
+    """Ingest a JSON, JSONL or CSV feed file"""
+    return ingest(read_records(path, format), source=source, batch_size=batch_size)
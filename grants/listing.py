@@ -0,0 +1,166 @@
+"""
+Keyset pagination and cached facet counts for the grant list.
+
+Browsing is paginated on (deadline, id): each page seeks past the last row of
+the previous one through the (deadline, id) index, so page 500 costs the
+same as page 1. Search results are ranked by relevance instead; ranking has
+to sort every match anyway, so those pages use plain offsets.
+
+Facet counts (total, closing soon, per grant type and funding type) come from
+one grouped query over active grants. They are cached per day and dropped
+on any grant write by replacing a version token in the shared cache
+(settings.CACHES), so every worker sees the change. The token is a fresh
+random value written with a plain set, which needs no atomic increment
+and can never return to a version an earlier facet key used.
+
+Bookmark state for a page is looked up in one query over the listed ids.
+"""
+import datetime
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from grants.models import Grant, GrantBookmark
+
+
+PAGE_SIZE = 20
+CLOSING_SOON_DAYS = 30
+FACETS_TIMEOUT = 60 * 60
+FACETS_VERSION_KEY = 'grants:facets:version'
+
+
+class KeysetPage:
+    """One page of results plus the query strings for its neighbours"""
+
+    def __init__(self, object_list, has_next, has_previous, next_params=None, previous_params=None, start=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_params = next_params
+        self.previous_params = previous_params
+        self.start = start  # 1-based position of the first row, when known
+
+    @property
+    def end(self):
+        return self.start + len(self.object_list) - 1 if self.start else None
+
+
+def _cursor(grant):
+    return f"{grant.deadline.isoformat()}_{grant.id.hex}"
+
+
+def _parse_cursor(value):
+    try:
+        deadline, grant_id = value.split('_', 1)
+        return datetime.date.fromisoformat(deadline), grant_id
+    except (AttributeError, ValueError):
+        return None
+
+
+def _params(query_dict, **cursor):
+    params = query_dict.copy()
+    for key in ('after', 'before', 'offset', 'page'):
+        params.pop(key, None)
+    for key, value in cursor.items():
+        params[key] = value
+    return params.urlencode()
+
+
+def paginate(queryset, query_dict, ranked=False, size=PAGE_SIZE):
+    """
+    Page of ``queryset`` for the request parameters ``query_dict``.
+
+    Browsing uses ``after``/``before`` cursors on (deadline, id); ranked
+    search results use ``offset``.
+    """
+    if ranked:
+        try:
+            offset = max(int(query_dict.get('offset', 0)), 0)
+        except ValueError:
+            offset = 0
+        rows = list(queryset[offset:offset + size + 1])
+        has_next = len(rows) > size
+        return KeysetPage(
+            rows[:size],
+            has_next=has_next,
+            has_previous=offset > 0,
+            next_params=_params(query_dict, offset=offset + size) if has_next else None,
+            previous_params=_params(query_dict, offset=max(offset - size, 0)) if offset else None,
+            start=offset + 1,
+        )
+
+    after = _parse_cursor(query_dict.get('after'))
+    before = _parse_cursor(query_dict.get('before')) if after is None else None
+    if before:
+        deadline, grant_id = before
+        rows = list(
+            queryset.filter(Q(deadline__lt=deadline) | Q(deadline=deadline, id__lt=grant_id))
+            .order_by('-deadline', '-id')[:size + 1]
+        )
+        has_previous = len(rows) > size
+        rows = rows[:size][::-1]
+        has_next = True
+    else:
+        if after:
+            deadline, grant_id = after
+            queryset = queryset.filter(Q(deadline__gt=deadline) | Q(deadline=deadline, id__gt=grant_id))
+        rows = list(queryset.order_by('deadline', 'id')[:size + 1])
+        has_next = len(rows) > size
+        rows = rows[:size]
+        has_previous = after is not None
+
+    return KeysetPage(
+        rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_params=_params(query_dict, after=_cursor(rows[-1])) if rows else None,
+        previous_params=_params(query_dict, before=_cursor(rows[0])) if rows else None,
+        start=1 if not (after or before) else None,
+    )
+
+
+def mark_bookmarked(grants, user):
+    """Set ``is_bookmarked`` on each of ``grants`` for ``user``"""
+    bookmarked = set(
+        GrantBookmark.objects.filter(user=user, grant_id__in=[grant.id for grant in grants])
+        .values_list('grant_id', flat=True)
+    ) if grants else set()
+    for grant in grants:
+        grant.is_bookmarked = grant.id in bookmarked
+    return grants
+
+
+def _facets_key(today):
+    return f"grants:facets:{cache.get(FACETS_VERSION_KEY, 0)}:{today.isoformat()}"
+
+
+def facet_counts():
+    """
+    Counts over active grants: ``total``, ``closing_soon``, and dicts
+    ``grant_type`` and ``funding_type`` of value -> count
+    """
+    today = timezone.now().date()
+    key = _facets_key(today)
+    facets = cache.get(key)
+    if facets is None:
+        soon = today + datetime.timedelta(days=CLOSING_SOON_DAYS)
+        rows = (
+            Grant.objects.filter(deadline__gte=today)
+            .order_by()
+            .values('grant_type', 'funding_type')
+            .annotate(total=Count('id'), closing=Count('id', filter=Q(deadline__lte=soon)))
+        )
+        facets = {'total': 0, 'closing_soon': 0, 'grant_type': {}, 'funding_type': {}}
+        for row in rows:
+            facets['total'] += row['total']
+            facets['closing_soon'] += row['closing']
+            for field in ('grant_type', 'funding_type'):
+                facets[field][row[field]] = facets[field].get(row[field], 0) + row['total']
+        cache.set(key, facets, FACETS_TIMEOUT)
+    return facets
+
+
+def invalidate_facets():
+    cache.set(FACETS_VERSION_KEY, uuid.uuid4().hex, None)
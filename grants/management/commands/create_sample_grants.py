@@ -2,16 +2,13 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
-from grants.models import Grant
+from grants import ingest
 
 
 class Command(BaseCommand):
     help = 'Create sample grant data for testing'
 
     def handle(self, *args, **options):
-        # Clear existing grants
-        Grant.objects.all().delete()
-        
         grants_data = [
             {
                 'title': 'Independent Film Development Grant',
@@ -139,14 +136,12 @@ class Command(BaseCommand):
             }
         ]
         
-        created_grants = []
-        for grant_data in grants_data:
-            grant = Grant.objects.create(**grant_data)
-            created_grants.append(grant)
-            self.stdout.write(
-                self.style.SUCCESS(f'Created grant: {grant.title}')
-            )
+        # Upserted on (source, title/organization key), so reruns keep existing grants and their matches
+        summary = ingest.ingest(grants_data)
         
         self.stdout.write(
-            self.style.SUCCESS(f'Successfully created {len(created_grants)} sample grants')
-        )
\ No newline at end of file
+            self.style.SUCCESS(
+                f"Sample grants: {summary['inserted']} created, {summary['updated']} updated, "
+                f"{summary['unchanged']} unchanged"
+            )
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from grants.ingest import BATCH_SIZE, ingest_file
+
+
+class Command(BaseCommand):
+    help = 'Load a grant feed (JSON, JSONL or CSV), upserting new and changed grants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Feed file')
+        parser.add_argument('--source', required=True, help='Feed name; external ids are unique per source')
+        parser.add_argument('--format', choices=['json', 'jsonl', 'csv'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            summary = ingest_file(
+                options['path'], options['source'], format=options['format'], batch_size=options['batch_size']
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not ingest {options["path"]}: {e}')
+        self.stdout.write(self.style.SUCCESS(
+            'Inserted {inserted}, updated {updated}, unchanged {unchanged}, '
+            'expired {expired}, invalid {invalid}'.format(**summary)
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from grants.index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the grant attribute index used to prune grant discovery'
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} grants'))
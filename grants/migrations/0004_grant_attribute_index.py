@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of grants.index.grant_attributes as of this migration, so later
+# changes to the index cannot change what it writes
+ANY_VALUE = '*'
+MAX_VALUE_LENGTH = 200
+
+
+def _value(value):
+    value = str(value)
+    return value if len(value) <= MAX_VALUE_LENGTH else ANY_VALUE
+
+
+def grant_attributes(grant):
+    attributes = {
+        ('grant_type', _value(grant.grant_type)),
+        ('funding_type', _value(grant.funding_type)),
+    }
+
+    project_types = grant.project_types
+    if isinstance(project_types, list):
+        for project_type in project_types:
+            if isinstance(project_type, str):
+                attributes.add(('project_type', _value(project_type)))
+    elif project_types:
+        attributes.add(('project_type', ANY_VALUE))
+
+    for tag in grant.tags if isinstance(grant.tags, list) else []:
+        if tag:
+            attributes.add(('tag', _value(tag).lower()))
+
+    location = grant.location_restrictions if isinstance(grant.location_restrictions, dict) else {}
+    if location.get('state'):
+        attributes.add(('state', _value(location['state']).lower()))
+    if location.get('country'):
+        attributes.add(('country', _value(location['country']).lower()))
+    return attributes
+
+
+def build_index(apps, schema_editor):
+    Grant = apps.get_model('grants', 'Grant')
+    GrantAttribute = apps.get_model('grants', 'GrantAttribute')
+    postings = [
+        GrantAttribute(grant_id=grant.id, kind=kind, value=value)
+        for grant in Grant.objects.all().iterator()
+        for kind, value in grant_attributes(grant)
+    ]
+    GrantAttribute.objects.bulk_create(postings, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grants', '0003_grant_annual_cycle_grant_application_process_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GrantAttribute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project_type', 'Project Type'), ('grant_type', 'Grant Type'), ('funding_type', 'Funding Type'), ('tag', 'Tag'), ('state', 'State'), ('country', 'Country')], max_length=20)),
+                ('value', models.CharField(max_length=200)),
+                ('grant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attributes', to='grants.grant')),
+            ],
+            options={
+                'unique_together': {('kind', 'value', 'grant')},
+            },
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:21
+
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from grants.search import install
+    install(schema_editor.connection)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from grants.search import uninstall
+    uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grants', '0004_grant_attribute_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
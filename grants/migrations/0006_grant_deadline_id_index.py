@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grants', '0005_grant_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='grant',
+            index=models.Index(fields=['deadline', 'id'], name='grants_deadline_id_idx'),
+        ),
+    ]
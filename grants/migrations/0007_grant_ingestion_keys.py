@@ -0,0 +1,146 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:28
+
+import datetime
+import hashlib
+import json
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+
+
+# Frozen copies of Grant.natural_key_for and the grants.ingest hashing as of
+# this migration, so later changes to those cannot change what it writes
+HASHED_FIELDS = {
+    'title': '',
+    'organization': '',
+    'url': '',
+    'deadline': None,
+    'amount_min': None,
+    'amount_max': None,
+    'currency': 'USD',
+    'grant_type': 'general',
+    'funding_type': 'grant',
+    'eligibility_criteria': dict,
+    'application_requirements': dict,
+    'location_restrictions': dict,
+    'project_types': list,
+    'description': '',
+    'selection_criteria': list,
+    'application_process': '',
+    'contact_info': dict,
+    'annual_cycle': False,
+    'tags': list,
+    'success_rate': None,
+}
+DICT_FIELDS = ['eligibility_criteria', 'application_requirements', 'location_restrictions', 'contact_info']
+LIST_FIELDS = ['project_types', 'selection_criteria', 'tags']
+TEXT_FIELDS = ['description', 'application_process']
+MAX_AMOUNT = Decimal('9999999999.99')
+CENTS = Decimal('0.01')
+_SPACE = re.compile(r'\s+')
+
+
+def natural_key(title, organization):
+    key = f"{' '.join(organization.split()).lower()}\n{' '.join(title.split()).lower()}"
+    return 'auto-' + hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _text(value, max_length=None):
+    text = _SPACE.sub(' ', str(value)).strip() if value is not None else ''
+    return text[:max_length] if max_length else text
+
+
+def _amount(value, limit=MAX_AMOUNT):
+    if value is None or value == '':
+        return None
+    try:
+        amount = Decimal(value).quantize(CENTS)
+    except (InvalidOperation, ValueError):
+        return None
+    return amount if 0 <= amount <= limit else None
+
+
+def _choice(value, choices, default):
+    text = _text(value).lower().replace('-', '_').replace(' ', '_')
+    for key, label in choices:
+        if text in (key, label.lower().replace(' ', '_')):
+            return key
+    return default
+
+
+def stored_hash(grant, choices):
+    """Content hash of a stored grant, or '' when ingestion would reject it"""
+    values = {}
+    for field, default in HASHED_FIELDS.items():
+        value = getattr(grant, field)
+        values[field] = value if value not in (None, '') else (default() if callable(default) else default)
+
+    for field in ('title', 'organization'):
+        values[field] = _text(values[field], 200)
+    values['url'] = _text(values['url'])
+    if not (values['title'] and values['organization'] and values['url']) or len(values['url']) > 200:
+        return ''
+    if not isinstance(values['deadline'], datetime.date):
+        return ''
+
+    values['amount_min'] = _amount(values['amount_min'])
+    values['amount_max'] = _amount(values['amount_max'])
+    if values['amount_min'] is not None and values['amount_max'] is not None \
+            and values['amount_min'] > values['amount_max']:
+        values['amount_min'], values['amount_max'] = values['amount_max'], values['amount_min']
+    currency = _text(values['currency']).upper()
+    values['currency'] = currency if re.fullmatch(r'[A-Z]{3}', currency) else 'USD'
+    values['success_rate'] = _amount(values['success_rate'], limit=Decimal(100))
+
+    values['grant_type'] = _choice(values['grant_type'], choices['grant_type'], 'general')
+    values['funding_type'] = _choice(values['funding_type'], choices['funding_type'], 'grant')
+    for field in DICT_FIELDS:
+        values[field] = values[field] if isinstance(values[field], dict) else {}
+    for field in LIST_FIELDS:
+        values[field] = values[field] if isinstance(values[field], list) else []
+    for field in TEXT_FIELDS:
+        values[field] = str(values[field]).strip()
+    values['annual_cycle'] = bool(values['annual_cycle'])
+
+    encoded = json.dumps(values, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def backfill_keys(apps, schema_editor):
+    Grant = apps.get_model('grants', 'Grant')
+    choices = {field: Grant._meta.get_field(field).choices for field in ('grant_type', 'funding_type')}
+    seen = set()
+    grants = []
+    for grant in Grant.objects.order_by('scraped_at').iterator():
+        # Same key the ingestion pipeline derives, so reloading an old feed finds these rows
+        external_id = natural_key(grant.title, grant.organization)
+        if (grant.source, external_id) in seen:
+            external_id = f"{external_id}-{grant.id.hex[:8]}"
+        seen.add((grant.source, external_id))
+        grant.external_id = external_id
+        grant.content_hash = stored_hash(grant, choices)
+        grants.append(grant)
+    # bulk_update leaves updated_at alone
+    Grant.objects.bulk_update(grants, ['external_id', 'content_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grants', '0006_grant_deadline_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='grant',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='grant',
+            name='external_id',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(backfill_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Separate from the backfill so PostgreSQL does not alter the table with pending trigger events
+    dependencies = [
+        ('grants', '0007_grant_ingestion_keys'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='grant',
+            constraint=models.UniqueConstraint(fields=('source', 'external_id'), name='grants_source_external_id_uniq'),
+        ),
+    ]
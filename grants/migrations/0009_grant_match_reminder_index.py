@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grants', '0008_grant_source_external_id_uniq'),
+        ('projects', '0002_project_additional_locations_project_company_info_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='grantmatch',
+            index=models.Index(condition=models.Q(('deadline_reminder_sent', False)), fields=['grant'], name='grants_match_reminder_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grants', '0009_grant_match_reminder_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GrantBookmark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('grant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookmarks', to='grants.grant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grant_bookmarks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'grant')},
+            },
+        ),
+    ]
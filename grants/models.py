@@ -1,5 +1,7 @@
+import hashlib
 import uuid
 from decimal import Decimal
+from django.contrib.auth.models import User
 from django.db import models
 from projects.models import Project
 
@@ -50,13 +52,62 @@ class Grant(models.Model):
     scraped_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     source = models.CharField(max_length=100, default='manual')
+
+    # Natural key within a source, and a digest of the ingested fields (see grants.ingest)
+    external_id = models.CharField(max_length=255, blank=True, default='')
+    content_hash = models.CharField(max_length=64, blank=True, default='')
     
     class Meta:
         ordering = ['deadline']
+        indexes = [
+            # Keyset pagination of the grant list seeks on (deadline, id)
+            models.Index(fields=['deadline', 'id'], name='grants_deadline_id_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'external_id'], name='grants_source_external_id_uniq'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.organization}"
 
+    @staticmethod
+    def natural_key_for(title, organization):
+        """External id for grants whose source does not provide one"""
+        key = f"{' '.join(organization.split()).lower()}\n{' '.join(title.split()).lower()}"
+        return 'auto-' + hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def save(self, *args, **kwargs):
+        if not self.external_id:
+            self.external_id = self.natural_key_for(self.title, self.organization)
+        super().save(*args, **kwargs)
+
+
+class GrantAttribute(models.Model):
+    """
+    Inverted index posting: one (kind, value) attribute of a grant.
+    Maintained by grants.index on grant save; discovery intersects postings
+    to prune grants before scoring.
+    """
+
+    KINDS = [
+        ('project_type', 'Project Type'),
+        ('grant_type', 'Grant Type'),
+        ('funding_type', 'Funding Type'),
+        ('tag', 'Tag'),
+        ('state', 'State'),
+        ('country', 'Country'),
+    ]
+
+    grant = models.ForeignKey(Grant, on_delete=models.CASCADE, related_name='attributes')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    value = models.CharField(max_length=200)
+
+    class Meta:
+        unique_together = ['kind', 'value', 'grant']
+
+    def __str__(self):
+        return f"{self.kind}={self.value}"
+
 
 class GrantPreferences(models.Model):
     """Grant-specific preferences and filters for a project"""
@@ -150,19 +201,30 @@ class GrantMatch(models.Model):
     class Meta:
         unique_together = ['project', 'grant']
         ordering = ['-match_score', 'grant__deadline']
+        indexes = [
+            # Matches still owed a deadline reminder, joined from the grant deadline range
+            models.Index(
+                fields=['grant'], condition=models.Q(deadline_reminder_sent=False),
+                name='grants_match_reminder_idx'
+            ),
+        ]
+    
+    @staticmethod
+    def quality_for_score(score):
+        """Match quality band for a 0-100 score"""
+        if score >= 90:
+            return 'perfect'
+        elif score >= 80:
+            return 'excellent'
+        elif score >= 70:
+            return 'good'
+        elif score >= 60:
+            return 'fair'
+        return 'poor'
     
     def save(self, *args, **kwargs):
-        # Auto-set match quality based on score
-        if self.match_score >= 90:
-            self.match_quality = 'perfect'
-        elif self.match_score >= 80:
-            self.match_quality = 'excellent'
-        elif self.match_score >= 70:
-            self.match_quality = 'good'
-        elif self.match_score >= 60:
-            self.match_quality = 'fair'
-        else:
-            self.match_quality = 'poor'
+        # Auto-set match quality based on score (bulk_create callers set it themselves)
+        self.match_quality = self.quality_for_score(self.match_score)
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -212,4 +274,19 @@ class GrantApplication(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return f"Application: {self.grant_match.project.name} -> {self.grant_match.grant.title}"
\ No newline at end of file
+        return f"Application: {self.grant_match.project.name} -> {self.grant_match.grant.title}"
+
+
+class GrantBookmark(models.Model):
+    """A grant a user saved for later review"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='grant_bookmarks')
+    grant = models.ForeignKey(Grant, on_delete=models.CASCADE, related_name='bookmarks')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Also serves the per-page lookup of which listed grants a user bookmarked
+        unique_together = ['user', 'grant']
+
+    def __str__(self):
+        return f"{self.user} bookmarked {self.grant.title}"
@@ -0,0 +1,759 @@
+"""
+Vectorized grant scoring.
+
+Every grant in the catalog is precompiled once into a feature row held in
+NumPy arrays: grant-type code, amount bounds in integer cents with a
+currency code, description keyword flags, location codes, and codes into
+small tables of distinct project-type lists and genre texts. Scoring a
+project then evaluates each rule of ``GrantMatcher._calculate_match_score``
+over the whole catalog at once. Each grant's outcome is a reason bitmask.
+Reasoning strings are memoized per bitmask, and the details dict is only
+built for grants that clear the match threshold. Scores, reasoning and
+details are identical to the scalar scorer.
+
+The catalog is cached per process and rebuilt when the grant count or the
+latest ``updated_at`` changes. Each project's score vector over it is kept
+in a small LRU keyed by a fingerprint of everything the scorer reads from
+the project, its preferences and exchange rates. Every cached score carries
+the ``updated_at`` of the grant it was computed from, so a repeat discovery
+only rescores grants that are new or changed since, and a rebuilt catalog
+keeps the scores of the grants it still holds.
+"""
+import datetime
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+
+import numpy as np
+from django.db.models import Count, Max
+
+from core.utils import currency
+from grants.models import Grant
+
+
+MATCH_THRESHOLD = 50  # Lowest score saved as a GrantMatch
+BASE_SCORE = 20
+MAX_SCORE = 100
+REGION_POINTS = 5
+CATALOG_CHUNK_SIZE = 2000
+SCORE_CACHE_SIZE = 64  # Project fingerprints whose score vectors are kept per process
+
+# Keyword lists from GrantMatcher._calculate_match_score
+GENRE_KEYWORDS = ['genre', 'type', 'category']
+SOCIAL_THEMES = ['social_justice', 'environmental', 'diversity', 'community', 'education']
+SOCIAL_KEYWORDS = ['social', 'community', 'diversity', 'impact']
+DIVERSITY_KEYWORDS = ['diversity', 'inclusion', 'underrepresented', 'emerging', 'female', 'poc']
+US_COUNTRY_NAMES = ['usa', 'united states', 'us']
+
+# Project stage -> the grant type that earns the stage bonus, with its reason
+STAGE_GRANT_TYPES = {
+    'development': ('development', "Grant type aligns with project development stage"),
+    'pre_production': ('production', "Grant type aligns with project production stage"),
+    'production': ('production', "Grant type aligns with project production stage"),
+    'post_production': ('post_production', "Grant type aligns with project post-production stage"),
+}
+
+# Reason bits, in the order the scalar scorer appends reasons
+PROJECT_TYPE = 1 << 0
+GENRE = 1 << 1
+BUDGET = 1 << 2
+PARTIAL_BUDGET = 1 << 3
+THEME = 1 << 4
+DIVERSITY = 1 << 5
+LOCATION = 1 << 6
+COUNTRY = 1 << 7
+STAGE = 1 << 8
+PRIORITY = 1 << 9
+
+POINTS = [
+    (PROJECT_TYPE, 15),
+    (GENRE, 10),
+    (BUDGET, 15),
+    (PARTIAL_BUDGET, 10),
+    (THEME, 10),
+    (DIVERSITY, 10),
+    (LOCATION, 15),
+    (COUNTRY, 8),
+    (STAGE, 12),
+    (PRIORITY, 8),
+]
+
+DETAIL_KEYS = {
+    PROJECT_TYPE: 'project_type_match',
+    GENRE: 'genre_match',
+    BUDGET: 'budget_match',
+    PARTIAL_BUDGET: 'partial_budget_match',
+    THEME: 'theme_match',
+    DIVERSITY: 'diversity_match',
+    LOCATION: 'location_match',
+    COUNTRY: 'country_match',
+    STAGE: 'stage_match',
+    PRIORITY: 'priority_match',
+}
+
+# Bounds for the threshold search, in cents (amounts have 12 digits, 2 decimals)
+_CENTS_LIMIT = 10 ** 12
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_UNSCORED = -1
+
+_lock = threading.Lock()
+_catalog = None
+_score_vectors = OrderedDict()  # fingerprint -> ScoreVector, least recently used first
+
+
+def _intern(table, index, value):
+    """Code of ``value`` in a table of distinct JSON values"""
+    key = json.dumps(value, sort_keys=True, default=str)
+    code = index.get(key)
+    if code is None:
+        code = index[key] = len(table)
+        table.append(value)
+    return code
+
+
+def _cents(amount):
+    return int(amount.scaleb(2))
+
+
+def _version(updated_at):
+    """``updated_at`` as integer microseconds, comparable in a NumPy array"""
+    return (updated_at - _EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def reason_texts(project_type, stage_reason):
+    """Reason text per bit for a project"""
+    return {
+        PROJECT_TYPE: f"Project type '{project_type}' is supported",
+        GENRE: "Genre alignment found in eligibility criteria",
+        BUDGET: "Budget aligns with grant amount range",
+        PARTIAL_BUDGET: "Grant could cover significant portion of budget",
+        THEME: "Project themes align with grant's social impact focus",
+        DIVERSITY: "Project diversity elements match grant priorities",
+        LOCATION: "Perfect location match",
+        COUNTRY: "Country eligibility confirmed",
+        STAGE: stage_reason,
+        PRIORITY: "Matches your funding priorities",
+    }
+
+
+def build_reasoning(reasons, mask):
+    """Reasoning string from the first three reasons set in ``mask``"""
+    parts = [reasons[bit] for bit, _ in POINTS if mask & bit]
+    if parts:
+        return "Strong match because: " + "; ".join(parts[:3])
+    return "Basic eligibility match - review grant details for specific requirements"
+
+
+def build_details(mask, converted_range, region):
+    """Match details dict, keyed in the order the scalar scorer sets them"""
+    details = {}
+    for bit, _ in POINTS[:2]:
+        if mask & bit:
+            details[DETAIL_KEYS[bit]] = True
+    if converted_range:
+        details['converted_amount_range'] = converted_range
+    for bit, _ in POINTS[2:]:
+        if mask & bit:
+            details[DETAIL_KEYS[bit]] = True
+    if region:
+        details['region_preference'] = True
+    return details
+
+
+class GrantCatalog:
+    """Feature rows for every grant, in a fixed row order"""
+
+    FIELDS = [
+        'id', 'project_types', 'eligibility_criteria', 'amount_min', 'amount_max', 'currency',
+        'description', 'location_restrictions', 'grant_type', 'updated_at',
+    ]
+
+    def __init__(self, rows, key=None):
+        self.key = key
+        ids, versions = [], []
+        grant_types, currencies, states = [], [], []
+        grant_type_index, currency_index, state_index = {}, {}, {}
+        self.project_types, self.genre_texts = [], []
+        project_type_index, genre_index = {}, {}
+
+        columns = {name: [] for name in (
+            'grant_type', 'currency', 'project_types', 'genres', 'has_amounts', 'amount_min', 'amount_max',
+            'social', 'diversity', 'has_location', 'state', 'country_us',
+        )}
+
+        for (grant_id, project_types, eligibility, amount_min, amount_max, code,
+             description, location, grant_type, updated_at) in rows:
+            ids.append(grant_id)
+            versions.append(_version(updated_at))
+
+            if grant_type not in grant_type_index:
+                grant_type_index[grant_type] = len(grant_types)
+                grant_types.append(grant_type)
+            columns['grant_type'].append(grant_type_index[grant_type])
+
+            if code not in currency_index:
+                currency_index[code] = len(currencies)
+                currencies.append(code)
+            columns['currency'].append(currency_index[code])
+
+            columns['project_types'].append(_intern(self.project_types, project_type_index, project_types))
+
+            texts = ()
+            if isinstance(eligibility, dict):
+                texts = tuple(
+                    str(value).lower()
+                    for key, value in eligibility.items()
+                    if any(keyword in key.lower() for keyword in GENRE_KEYWORDS)
+                )
+            columns['genres'].append(_intern(self.genre_texts, genre_index, texts) if texts else -1)
+
+            has_amounts = amount_min is not None and amount_max is not None
+            columns['has_amounts'].append(has_amounts)
+            columns['amount_min'].append(_cents(amount_min) if has_amounts else 0)
+            columns['amount_max'].append(_cents(amount_max) if has_amounts else 0)
+
+            text = (description or '').lower()
+            columns['social'].append(any(keyword in text for keyword in SOCIAL_KEYWORDS))
+            columns['diversity'].append(any(keyword in text for keyword in DIVERSITY_KEYWORDS))
+
+            location = location if isinstance(location, dict) else {}
+            state = location.get('state')
+            state_code = -1
+            if state:
+                state = str(state).lower()
+                if state not in state_index:
+                    state_index[state] = len(states)
+                    states.append(state)
+                state_code = state_index[state]
+            columns['has_location'].append(bool(location))
+            columns['state'].append(state_code)
+            columns['country_us'].append(str(location.get('country') or '').lower() == 'united states')
+
+        self.ids = ids
+        self.index = {grant_id: row for row, grant_id in enumerate(ids)}
+        self.grant_types = grant_types
+        self.grant_type_index = grant_type_index
+        self.currencies = currencies
+        self.states = state_index
+        self.state_names = states
+
+        self.grant_type = np.array(columns['grant_type'], dtype=np.int16)
+        self.currency = np.array(columns['currency'], dtype=np.int16)
+        self.project_type_code = np.array(columns['project_types'], dtype=np.int32)
+        self.genre_code = np.array(columns['genres'], dtype=np.int32)
+        self.has_amounts = np.array(columns['has_amounts'], dtype=bool)
+        self.amount_min = np.array(columns['amount_min'], dtype=np.int64)
+        self.amount_max = np.array(columns['amount_max'], dtype=np.int64)
+        self.social = np.array(columns['social'], dtype=bool)
+        self.diversity = np.array(columns['diversity'], dtype=bool)
+        self.has_location = np.array(columns['has_location'], dtype=bool)
+        self.state = np.array(columns['state'], dtype=np.int32)
+        self.country_us = np.array(columns['country_us'], dtype=bool)
+        self.versions = np.array(versions, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, queryset=None, key=None):
+        queryset = Grant.objects.all() if queryset is None else queryset
+        rows = queryset.order_by().values_list(*cls.FIELDS).iterator(chunk_size=CATALOG_CHUNK_SIZE)
+        return cls(rows, key=key)
+
+    def rows_for(self, grant_ids):
+        """Row numbers for ``grant_ids``, plus the ids the catalog does not have"""
+        rows, missing = [], []
+        for grant_id in grant_ids:
+            row = self.index.get(grant_id)
+            if row is None:
+                missing.append(grant_id)
+            else:
+                rows.append(row)
+        return np.array(rows, dtype=np.int64), missing
+
+    def converted_range(self, row, rate, to_currency):
+        """[min, max, currency] of a row converted as the scalar scorer reports it"""
+        return [
+            float(Decimal(_quantized_cents(int(self.amount_min[row]), rate)).scaleb(-2)),
+            float(Decimal(_quantized_cents(int(self.amount_max[row]), rate)).scaleb(-2)),
+            to_currency,
+        ]
+
+
+def _catalog_key():
+    stats = Grant.objects.order_by().aggregate(count=Count('id'), latest=Max('updated_at'))
+    return stats['count'], stats['latest']
+
+
+def get_catalog():
+    """Process-wide catalog, rebuilt when grants were added, changed or removed"""
+    global _catalog
+    key = _catalog_key()
+    catalog = _catalog
+    if catalog is None or catalog.key != key:
+        with _lock:
+            if _catalog is None or _catalog.key != key:
+                _catalog = GrantCatalog.build(key=key)
+            catalog = _catalog
+    return catalog
+
+
+def clear_cache():
+    global _catalog
+    with _lock:
+        _catalog = None
+        _score_vectors.clear()
+
+
+class ScoreVector:
+    """One project fingerprint's scores over a catalog, with the grant version each was computed from"""
+
+    def __init__(self, catalog):
+        size = len(catalog)
+        self.catalog = catalog
+        self.versions = np.full(size, _UNSCORED, dtype=np.int64)
+        self.scores = np.zeros(size, dtype=np.int16)
+        self.masks = np.zeros(size, dtype=np.int32)
+        self.budget_eligible = np.zeros(size, dtype=bool)
+
+    def rebase(self, catalog):
+        """The same scores laid out over a rebuilt catalog; grants new to it start unscored"""
+        vector = ScoreVector(catalog)
+        old_rows = np.fromiter(
+            (self.catalog.index.get(grant_id, -1) for grant_id in catalog.ids), dtype=np.int64, count=len(catalog)
+        )
+        kept = np.flatnonzero(old_rows >= 0)
+        source = old_rows[kept]
+        vector.scores[kept] = self.scores[source]
+        vector.masks[kept] = self.masks[source]
+        vector.budget_eligible[kept] = self.budget_eligible[source]
+        vector.versions[kept] = self.versions[source]
+        return vector
+
+
+def _score_vector(fingerprint, catalog):
+    """Cached score vector for ``fingerprint`` over ``catalog``, evicting the least recently used"""
+    with _lock:
+        vector = _score_vectors.pop(fingerprint, None)
+        if vector is None:
+            vector = ScoreVector(catalog)
+        elif vector.catalog is not catalog:
+            vector = vector.rebase(catalog)
+        _score_vectors[fingerprint] = vector
+        while len(_score_vectors) > SCORE_CACHE_SIZE:
+            _score_vectors.popitem(last=False)
+    return vector
+
+
+def _quantized_cents(cents, rate):
+    return _cents((Decimal(cents).scaleb(-2) * rate).quantize(currency.CENT))
+
+
+def _last_at_most(rate, limit):
+    """Largest amount in cents whose converted, rounded value is <= ``limit`` cents"""
+    low, high = -_CENTS_LIMIT - 1, _CENTS_LIMIT
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _quantized_cents(middle, rate) <= limit:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _first_at_least(rate, limit):
+    """Smallest amount in cents whose converted, rounded value is >= ``limit`` cents"""
+    low, high = -_CENTS_LIMIT, _CENTS_LIMIT + 1
+    while low < high:
+        middle = (low + high) // 2
+        if _quantized_cents(middle, rate) >= limit:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+class GrantScorer:
+    """
+    Scores one project against a catalog.
+
+    Conversion is monotonic, so each budget comparison on converted amounts
+    becomes an integer threshold on the grant's own amounts, found once per
+    currency by binary search.
+    """
+
+    def __init__(self, matcher, preferences, catalog):
+        self.matcher = matcher
+        self.project = matcher.project
+        self.preferences = preferences
+        self.catalog = catalog
+        self._reasoning = {}
+
+        matcher._load_rates(catalog.currencies)
+        self.rates = [matcher._rates[code] for code in catalog.currencies]
+
+        project_stage = getattr(self.project, 'project_stage', self.project.status)
+        self.project_stage = project_stage
+        self.stage_type, self.stage_reason = STAGE_GRANT_TYPES.get(project_stage, (None, None))
+        self.reasons = reason_texts(self.project.type, self.stage_reason)
+
+    def fingerprint(self):
+        """Digest of every project, preference and rate input the scores depend on"""
+        project = self.project
+        preferences = self.preferences
+        inputs = [
+            project.type,
+            getattr(project, 'genres', []),
+            getattr(project, 'themes', []),
+            getattr(project, 'diversity_flags', []),
+            getattr(project, 'production_location', {}),
+            getattr(project, 'estimated_budget', None),
+            self.project_stage,
+            project.currency,
+            dict(zip(self.catalog.currencies, self.rates)),
+            preferences.funding_priorities if preferences else None,
+            bool(preferences and preferences.preferred_regions),
+        ]
+        return hashlib.sha1(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _table_lookup(self, table, codes, predicate):
+        """Evaluate ``predicate`` once per distinct value and gather it per grant"""
+        results = np.array([bool(predicate(value)) for value in table] + [False], dtype=bool)
+        return results[codes]  # Code -1 picks the trailing False
+
+    def _budget_flags(self, rows):
+        catalog = self.catalog
+        size = len(rows)
+        project_budget = getattr(self.project, 'estimated_budget', None)
+        if not project_budget:
+            return np.zeros(size, dtype=bool), np.zeros(size, dtype=bool), np.zeros(size, dtype=bool)
+
+        budget = Decimal(project_budget).scaleb(2)
+        floor_budget = int(budget.to_integral_value(rounding=ROUND_FLOOR))
+        ceil_budget = int(budget.to_integral_value(rounding=ROUND_CEILING))
+        floor_half = int((budget / 2).to_integral_value(rounding=ROUND_FLOOR))
+
+        # Per currency: [known, zero_low, zero_high, min_le_budget, max_ge_budget, min_le_half]
+        thresholds = np.zeros((len(catalog.currencies), 6), dtype=np.int64)
+        for code, rate in enumerate(self.rates):
+            if rate is None:
+                continue
+            thresholds[code] = [
+                1,
+                _first_at_least(rate, 0),
+                _last_at_most(rate, 0),
+                _last_at_most(rate, floor_budget),
+                _first_at_least(rate, ceil_budget),
+                _last_at_most(rate, floor_half),
+            ]
+        limits = thresholds[catalog.currency[rows]]
+        amount_min = catalog.amount_min[rows]
+        amount_max = catalog.amount_max[rows]
+
+        def nonzero(amounts):
+            return (amounts < limits[:, 1]) | (amounts > limits[:, 2])
+
+        eligible = catalog.has_amounts[rows] & (limits[:, 0] == 1) & nonzero(amount_min) & nonzero(amount_max)
+        min_fits = amount_min <= limits[:, 3]
+        full = eligible & min_fits & (amount_max >= limits[:, 4])
+        partial = eligible & ~full & (amount_min <= limits[:, 5])
+        return eligible, full, partial
+
+    def score(self, rows):
+        """
+        Score the catalog rows ``rows``.
+
+        Returns:
+            (scores, masks): int16 scores and the reason bitmask per row
+        """
+        catalog = self.catalog
+        project = self.project
+        preferences = self.preferences
+        size = len(rows)
+        masks = np.zeros(size, dtype=np.int32)
+
+        project_type = project.type
+        masks |= PROJECT_TYPE * self._table_lookup(
+            catalog.project_types, catalog.project_type_code[rows],
+            lambda value: value and project_type in value
+        )
+
+        project_genres = getattr(project, 'genres', [])
+        if project_genres:
+            masks |= GENRE * self._table_lookup(
+                catalog.genre_texts, catalog.genre_code[rows],
+                lambda texts: any(genre in text for text in texts for genre in project_genres)
+            )
+
+        self.budget_eligible, full, partial = self._budget_flags(rows)
+        masks |= BUDGET * full
+        masks |= PARTIAL_BUDGET * partial
+
+        project_themes = getattr(project, 'themes', [])
+        if any(theme in project_themes for theme in SOCIAL_THEMES):
+            masks |= THEME * catalog.social[rows]
+
+        if getattr(project, 'diversity_flags', []):
+            masks |= DIVERSITY * catalog.diversity[rows]
+
+        project_location = getattr(project, 'production_location', {})
+        if project_location:
+            has_location = catalog.has_location[rows]
+            state = catalog.state[rows]
+            project_state = project_location.get('state')
+            if project_state:
+                both_states = state >= 0
+                state_code = catalog.states.get(project_state.lower(), -2)
+                masks |= LOCATION * (has_location & (state == state_code))
+            else:
+                both_states = np.zeros(size, dtype=bool)
+            if (project_location.get('country') or '').lower() in US_COUNTRY_NAMES:
+                masks |= COUNTRY * (has_location & ~both_states & catalog.country_us[rows])
+
+        grant_type = catalog.grant_type[rows]
+        if self.stage_type in catalog.grant_type_index:
+            masks |= STAGE * (grant_type == catalog.grant_type_index[self.stage_type])
+
+        region = 0
+        if preferences:
+            if preferences.funding_priorities:
+                codes = [
+                    code for name, code in catalog.grant_type_index.items()
+                    if name in preferences.funding_priorities
+                ]
+                masks |= PRIORITY * np.isin(grant_type, codes)
+            if preferences.preferred_regions:
+                region = REGION_POINTS
+
+        scores = np.full(size, BASE_SCORE + region, dtype=np.int16)
+        for bit, points in POINTS:
+            scores += points * ((masks & bit) != 0)
+        np.minimum(scores, MAX_SCORE, out=scores)
+        return scores, masks
+
+    def score_cached(self, rows):
+        """
+        ``score`` backed by the process-wide score vectors: only rows never
+        scored for this fingerprint, or whose grant changed since, are scored.
+        """
+        catalog = self.catalog
+        vector = _score_vector(self.fingerprint(), catalog)
+        stale = rows[vector.versions[rows] != catalog.versions[rows]]
+        if len(stale):
+            scores, masks = self.score(stale)
+            vector.scores[stale] = scores
+            vector.masks[stale] = masks
+            vector.budget_eligible[stale] = self.budget_eligible
+            vector.versions[stale] = catalog.versions[stale]  # Last, so readers never see half-written rows as fresh
+        self.budget_eligible = vector.budget_eligible[rows]
+        return vector.scores[rows], vector.masks[rows]
+
+    def reasoning(self, mask):
+        """Reasoning string for a reason bitmask, memoized"""
+        reasoning = self._reasoning.get(mask)
+        if reasoning is None:
+            reasoning = self._reasoning[mask] = build_reasoning(self.reasons, mask)
+        return reasoning
+
+    def details(self, row, position, mask):
+        """Match details for catalog row ``row`` (``position`` in the scored rows)"""
+        converted = None
+        code = self.catalog.currency[row]
+        if self.budget_eligible[position] and self.catalog.currencies[code] != self.project.currency:
+            converted = self.catalog.converted_range(row, self.rates[code], self.project.currency)
+        return build_details(mask, converted, bool(self.preferences and self.preferences.preferred_regions))
+
+
+class ProjectCatalog:
+    """
+    Feature vectors for a batch of projects, the transpose of GrantCatalog:
+    one grant is scored against every project in the batch at once.
+    Used by reverse matching when grants are added or changed.
+    """
+
+    def __init__(self, projects, preferences=None):
+        preferences = preferences or {}
+        self.projects = list(projects)
+        self.preferences = [preferences.get(project.id) for project in self.projects]
+        self._rates = {}
+        self._reasons = {}
+
+        self.types, self.currencies, self.genre_sets, self.priority_sets = [], [], [], []
+        self.stage_types, self.state_names, self.states = [], [], {}
+        type_index, currency_index, genre_index, priority_index, stage_index = {}, {}, {}, {}, {}
+
+        columns = {name: [] for name in (
+            'type', 'currency', 'genres', 'has_budget', 'floor_budget', 'ceil_budget', 'floor_half',
+            'theme', 'diversity', 'has_location', 'state', 'country_us', 'stage', 'priorities', 'region',
+        )}
+        self.stage_reasons = []
+
+        def code(value, table, index):
+            if value not in index:
+                index[value] = len(table)
+                table.append(value)
+            return index[value]
+
+        for project, project_preferences in zip(self.projects, self.preferences):
+            columns['type'].append(code(project.type, self.types, type_index))
+            columns['currency'].append(code(project.currency, self.currencies, currency_index))
+
+            genres = getattr(project, 'genres', [])
+            columns['genres'].append(code(tuple(genres), self.genre_sets, genre_index) if genres else -1)
+
+            project_budget = getattr(project, 'estimated_budget', None)
+            columns['has_budget'].append(bool(project_budget))
+            if project_budget:
+                budget = Decimal(project_budget).scaleb(2)
+                columns['floor_budget'].append(int(budget.to_integral_value(rounding=ROUND_FLOOR)))
+                columns['ceil_budget'].append(int(budget.to_integral_value(rounding=ROUND_CEILING)))
+                columns['floor_half'].append(int((budget / 2).to_integral_value(rounding=ROUND_FLOOR)))
+            else:
+                columns['floor_budget'].append(0)
+                columns['ceil_budget'].append(0)
+                columns['floor_half'].append(0)
+
+            project_themes = getattr(project, 'themes', [])
+            columns['theme'].append(any(theme in project_themes for theme in SOCIAL_THEMES))
+            columns['diversity'].append(bool(getattr(project, 'diversity_flags', [])))
+
+            location = getattr(project, 'production_location', {})
+            state = location.get('state') if location else None
+            columns['has_location'].append(bool(location))
+            columns['state'].append(code(state.lower(), self.state_names, self.states) if state else -1)
+            columns['country_us'].append(
+                bool(location) and (location.get('country') or '').lower() in US_COUNTRY_NAMES
+            )
+
+            project_stage = getattr(project, 'project_stage', project.status)
+            stage_type, stage_reason = STAGE_GRANT_TYPES.get(project_stage, (None, None))
+            columns['stage'].append(code(stage_type, self.stage_types, stage_index) if stage_type else -1)
+            self.stage_reasons.append(stage_reason)
+
+            priorities = project_preferences.funding_priorities if project_preferences else None
+            columns['priorities'].append(
+                code(tuple(priorities), self.priority_sets, priority_index) if priorities else -1
+            )
+            columns['region'].append(bool(project_preferences and project_preferences.preferred_regions))
+
+        self.type = np.array(columns['type'], dtype=np.int32)
+        self.currency = np.array(columns['currency'], dtype=np.int32)
+        self.genres = np.array(columns['genres'], dtype=np.int32)
+        self.has_budget = np.array(columns['has_budget'], dtype=bool)
+        self.floor_budget = np.array(columns['floor_budget'], dtype=np.int64)
+        self.ceil_budget = np.array(columns['ceil_budget'], dtype=np.int64)
+        self.floor_half = np.array(columns['floor_half'], dtype=np.int64)
+        self.theme = np.array(columns['theme'], dtype=bool)
+        self.diversity = np.array(columns['diversity'], dtype=bool)
+        self.has_location = np.array(columns['has_location'], dtype=bool)
+        self.state = np.array(columns['state'], dtype=np.int32)
+        self.country_us = np.array(columns['country_us'], dtype=bool)
+        self.stage = np.array(columns['stage'], dtype=np.int32)
+        self.priorities = np.array(columns['priorities'], dtype=np.int32)
+        self.region = np.array(columns['region'], dtype=bool)
+
+    def __len__(self):
+        return len(self.projects)
+
+    def _rate(self, from_currency, to_currency):
+        key = (from_currency, to_currency)
+        if key not in self._rates:
+            self._rates[key] = currency.rates_to(to_currency, [from_currency]).get(from_currency)
+        return self._rates[key]
+
+    @staticmethod
+    def _gather(results, codes):
+        return np.array(list(results) + [False], dtype=bool)[codes]  # Code -1 picks the trailing False
+
+    def score(self, grants, row):
+        """
+        Score catalog row ``row`` of a GrantCatalog against every project.
+
+        Returns:
+            (scores, masks, converted): int16 scores, reason bitmasks, and per
+            project the [min, max, currency] converted range or None
+        """
+        size = len(self.projects)
+        masks = np.zeros(size, dtype=np.int32)
+
+        project_types = grants.project_types[grants.project_type_code[row]]
+        masks |= PROJECT_TYPE * self._gather(
+            (bool(project_types) and project_type in project_types for project_type in self.types), self.type
+        )
+
+        genre_code = grants.genre_code[row]
+        if genre_code >= 0:
+            texts = grants.genre_texts[genre_code]
+            masks |= GENRE * self._gather(
+                (any(genre in text for text in texts for genre in genres) for genres in self.genre_sets), self.genres
+            )
+
+        converted = [None] * size
+        grant_currency = grants.currencies[grants.currency[row]]
+        if grants.has_amounts[row]:
+            ranges = []
+            for project_currency in self.currencies:
+                rate = self._rate(grant_currency, project_currency)
+                if rate is None:
+                    ranges.append((False, 0, 0))
+                    continue
+                low = _quantized_cents(int(grants.amount_min[row]), rate)
+                high = _quantized_cents(int(grants.amount_max[row]), rate)
+                ranges.append((low != 0 and high != 0, low, high))
+            eligible = np.array([entry[0] for entry in ranges], dtype=bool)[self.currency] & self.has_budget
+            low = np.array([entry[1] for entry in ranges], dtype=np.int64)[self.currency]
+            high = np.array([entry[2] for entry in ranges], dtype=np.int64)[self.currency]
+            full = eligible & (low <= self.floor_budget) & (high >= self.ceil_budget)
+            masks |= BUDGET * full
+            masks |= PARTIAL_BUDGET * (eligible & ~full & (low <= self.floor_half))
+            for position in np.flatnonzero(eligible):
+                project_currency = self.currencies[self.currency[position]]
+                if project_currency != grant_currency:
+                    converted[position] = [
+                        float(Decimal(int(low[position])).scaleb(-2)),
+                        float(Decimal(int(high[position])).scaleb(-2)),
+                        project_currency,
+                    ]
+
+        if grants.social[row]:
+            masks |= THEME * self.theme
+        if grants.diversity[row]:
+            masks |= DIVERSITY * self.diversity
+
+        if grants.has_location[row]:
+            grant_state = grants.state[row]
+            project_state = self.state >= 0
+            if grant_state >= 0:
+                state_code = self.states.get(grants.state_names[grant_state], -2)
+                masks |= LOCATION * (self.has_location & (self.state == state_code))
+                both_states = project_state
+            else:
+                both_states = np.zeros(size, dtype=bool)
+            if grants.country_us[row]:
+                masks |= COUNTRY * (self.has_location & ~both_states & self.country_us)
+
+        grant_type = grants.grant_types[grants.grant_type[row]]
+        if grant_type in self.stage_types:
+            masks |= STAGE * (self.stage == self.stage_types.index(grant_type))
+        masks |= PRIORITY * self._gather((grant_type in priorities for priorities in self.priority_sets), self.priorities)
+
+        scores = np.full(size, BASE_SCORE, dtype=np.int16)
+        scores += REGION_POINTS * self.region
+        for bit, points in POINTS:
+            scores += points * ((masks & bit) != 0)
+        np.minimum(scores, MAX_SCORE, out=scores)
+        return scores, masks, converted
+
+    def reasoning(self, position, mask):
+        project = self.projects[position]
+        key = (project.type, self.stage_reasons[position])
+        if key not in self._reasons:
+            self._reasons[key] = reason_texts(*key)
+        return build_reasoning(self._reasons[key], mask)
+
+    def details(self, position, mask, converted):
+        return build_details(mask, converted[position], bool(self.region[position]))
+
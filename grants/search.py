@@ -0,0 +1,146 @@
+"""
+Ranked full-text search over grants.
+
+Title, organization and description are indexed with weights A, B and C.
+PostgreSQL uses a stored generated tsvector column with a GIN index.
+SQLite uses an external-content FTS5 table kept in sync by triggers.
+The index is maintained by the database on every insert, update and delete,
+including bulk writes. Other databases fall back to icontains matching,
+ordered by deadline.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from grants.models import Grant
+
+
+TABLE = Grant._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+VECTOR_COLUMN = 'search_vector'
+VECTOR_INDEX = f'{TABLE}_search_vector_gin'
+
+# Relative weight of title, organization and description hits (SQLite bm25)
+FIELD_WEIGHTS = (10.0, 4.0, 1.0)
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def _sqlite_statements():
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            title, organization, description,
+            content='{TABLE}', content_rowid='rowid', tokenize='porter unicode61'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, organization, description)
+            VALUES (new.rowid, new.title, new.organization, new.description);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, organization, description)
+            VALUES ('delete', old.rowid, old.title, old.organization, old.description);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE ON {TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, organization, description)
+            VALUES ('delete', old.rowid, old.title, old.organization, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, title, organization, description)
+            VALUES (new.rowid, new.title, new.organization, new.description);
+        END""",
+        # Re-read the content table; SQLite table rebuilds in later migrations renumber rowids
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    ]
+
+
+def _postgresql_statements():
+    return [
+        f"""ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS {VECTOR_COLUMN} tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(organization, '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'C')
+            ) STORED""",
+        f"CREATE INDEX IF NOT EXISTS {VECTOR_INDEX} ON {TABLE} USING GIN ({VECTOR_COLUMN})",
+    ]
+
+
+def install(connection):
+    """Create (or repair) the search index for ``connection``; safe to run repeatedly"""
+    statements = {
+        'sqlite': _sqlite_statements,
+        'postgresql': _postgresql_statements,
+    }.get(connection.vendor)
+    if statements is None:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements():
+            cursor.execute(statement)
+
+
+def uninstall(connection):
+    statements = {
+        'sqlite': [
+            f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+            f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+            f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+            f"DROP TABLE IF EXISTS {FTS_TABLE}",
+        ],
+        'postgresql': [
+            f"DROP INDEX IF EXISTS {VECTOR_INDEX}",
+            f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS {VECTOR_COLUMN}",
+        ],
+    }.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def _fts5_query(tokens):
+    # Every term must match; the last one is a prefix so results follow the user's typing
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_grants(queryset, query):
+    """
+    Restrict a Grant queryset to ``query`` matches, best first.
+
+    Results are annotated with ``search_rank`` (higher is better) and
+    ordered by it, then by deadline.
+    """
+    tokens = _TOKEN.findall(query.lower())
+    if not tokens:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        # Join the FTS table once: bm25() only works inside the MATCH query itself.
+        # bm25() is lower for better matches; negate it so ranks sort descending everywhere.
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS)
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = {TABLE}.rowid", f"{FTS_TABLE} MATCH %s"],
+            params=[_fts5_query(tokens)],
+            select={'search_rank': f"-bm25({FTS_TABLE}, {weights})"},
+        ).order_by('-search_rank', 'deadline')
+    if vendor == 'postgresql':
+        # Prefix-match the last word, as on SQLite
+        lexemes = [f"'{token}'" for token in tokens]
+        lexemes[-1] += ':*'
+        tsquery = ' & '.join(lexemes)
+        return queryset.filter(
+            RawSQL(f"{TABLE}.{VECTOR_COLUMN} @@ to_tsquery('english', %s)", [tsquery], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank({TABLE}.{VECTOR_COLUMN}, to_tsquery('english', %s))", [tsquery], output_field=FloatField()
+            )
+        ).order_by(F('search_rank').desc(), 'deadline')
+
+    condition = Q()
+    for token in tokens:
+        condition &= Q(title__icontains=token) | Q(organization__icontains=token) | Q(description__icontains=token)
+    return queryset.filter(condition).annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    ).order_by('deadline')
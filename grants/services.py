@@ -1,9 +1,42 @@
 """
 Grant discovery and matching algorithm
 """
+import json
+import numpy as np
+from decimal import Decimal, ROUND_HALF_UP
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
 from django.db.models import Q
+from django.utils import timezone
 from datetime import datetime, timedelta
+from core.utils import currency
+from grants import index, scoring
 from grants.models import Grant, GrantMatch, GrantPreferences
+from projects.models import Project
+
+
+DISCOVERY_CHUNK_SIZE = 2000
+REMATCH_PROJECT_BATCH_SIZE = 2000
+
+# Project columns read by the scorers and the preference filters
+PROJECT_SCORING_FIELDS = [
+    'id', 'type', 'status', 'project_stage', 'genres', 'themes', 'diversity_flags',
+    'production_location', 'estimated_budget', 'currency', 'features_enabled',
+]
+
+# Project and preference values match scores and filters depend on
+PROJECT_MATCH_FIELDS = [
+    'type', 'project_stage', 'genres', 'themes', 'diversity_flags',
+    'production_location', 'estimated_budget', 'currency',
+]
+PREFERENCE_FILTER_FIELDS = ['preferred_funding_types', 'min_amount', 'max_amount', 'lead_time_preference']
+PREFERENCE_SCORE_FIELDS = ['funding_priorities', 'preferred_regions']
+
+# Grant columns read by _calculate_match_score
+SCORING_FIELDS = [
+    'id', 'project_types', 'eligibility_criteria', 'amount_min', 'amount_max', 'currency',
+    'description', 'location_restrictions', 'grant_type',
+]
 
 
 class GrantMatcher:
@@ -11,6 +44,7 @@ class GrantMatcher:
     
     def __init__(self, project):
         self.project = project
+        self._rates = {}  # grant currency -> multiplier into the project's currency (None if unknown)
         
     def discover_grants(self):
         """
@@ -30,25 +64,108 @@ class GrantMatcher:
         # Apply preference filters if they exist
         if preferences:
             available_grants = self._apply_preference_filters(available_grants, preferences)
+
+        # Drop grants whose postings cannot add up to a match before scoring anything
+        candidates = index.candidate_postings(self.project, preferences)
+        if candidates is not None:
+            available_grants = available_grants.filter(id__in=candidates)
         
-        matches_created = 0
-        for grant in available_grants:
-            # Check if match already exists
-            if not GrantMatch.objects.filter(project=self.project, grant=grant).exists():
+        # One query for the grants this project already has, instead of one per grant
+        matched_ids = set(
+            GrantMatch.objects.filter(project=self.project).values_list('grant_id', flat=True)
+        )
+        candidate_ids = [
+            grant_id for grant_id in available_grants.order_by().values_list('id', flat=True)
+            if grant_id not in matched_ids
+        ]
+
+        # Score the whole candidate set in one vectorized pass over the cached catalog,
+        # reusing this project's cached scores for grants unchanged since they were computed
+        catalog = scoring.get_catalog()
+        rows, missing = catalog.rows_for(candidate_ids)
+        scorer = scoring.GrantScorer(self, preferences, catalog)
+        scores, masks = scorer.score_cached(rows)
+
+        new_matches = []
+        for position in np.flatnonzero(scores >= scoring.MATCH_THRESHOLD):  # Only create matches with decent scores
+            row = rows[position]
+            score, mask = int(scores[position]), int(masks[position])
+            new_matches.append(GrantMatch(
+                project=self.project,
+                grant_id=catalog.ids[row],
+                match_score=score,
+                match_quality=GrantMatch.quality_for_score(score),
+                match_reasoning=scorer.reasoning(mask),
+                match_details=scorer.details(row, position, mask)
+            ))
+
+        # Grants saved after the catalog was built are scored one by one
+        if missing:
+            for grant in Grant.objects.filter(id__in=missing).only(*SCORING_FIELDS):
                 score, reasoning, details = self._calculate_match_score(grant, preferences)
-                
-                if score >= 50:  # Only create matches with decent scores
-                    GrantMatch.objects.create(
+                if score >= scoring.MATCH_THRESHOLD:
+                    new_matches.append(GrantMatch(
                         project=self.project,
-                        grant=grant,
+                        grant_id=grant.id,
                         match_score=score,
+                        match_quality=GrantMatch.quality_for_score(score),
                         match_reasoning=reasoning,
                         match_details=details
-                    )
-                    matches_created += 1
+                    ))
+        
+        # ignore_conflicts covers a concurrent discovery run inserting the same pair
+        GrantMatch.objects.bulk_create(new_matches, batch_size=DISCOVERY_CHUNK_SIZE, ignore_conflicts=True)
+        matches_created = len(new_matches)
         
         return matches_created
     
+    def rescore_matches(self, matches, preferences):
+        """
+        Recompute the scores of existing ``matches`` in bulk. Suggested
+        matches that fall below the threshold are removed; the others keep
+        their status and application data.
+
+        Returns:
+            (updated, pruned) counts
+        """
+        matches = list(matches)
+        if not matches:
+            return 0, 0
+        catalog = scoring.get_catalog()
+        rows, missing = catalog.rows_for([match.grant_id for match in matches])
+        scorer = scoring.GrantScorer(self, preferences, catalog)
+        scores, masks = scorer.score_cached(rows)
+
+        results = {}
+        for position, row in enumerate(rows):
+            score, mask = int(scores[position]), int(masks[position])
+            results[catalog.ids[row]] = (score, scorer.reasoning(mask), scorer.details(row, position, mask))
+        for grant in Grant.objects.filter(id__in=missing).only(*SCORING_FIELDS):
+            results[grant.id] = self._calculate_match_score(grant, preferences)
+
+        changed, pruned = [], []
+        now = timezone.now()
+        for match in matches:
+            score, reasoning, details = results[match.grant_id]
+            if score < scoring.MATCH_THRESHOLD and match.status == 'suggested':
+                pruned.append(match.id)
+            elif (score, reasoning, details) != (match.match_score, match.match_reasoning, match.match_details):
+                match.match_score = score
+                match.match_quality = GrantMatch.quality_for_score(score)
+                match.match_reasoning = reasoning
+                match.match_details = details
+                match.updated_at = now  # bulk_update does not apply auto_now
+                changed.append(match)
+
+        GrantMatch.objects.bulk_update(
+            changed,
+            ['match_score', 'match_quality', 'match_reasoning', 'match_details', 'updated_at'],
+            batch_size=DISCOVERY_CHUNK_SIZE
+        )
+        for start in range(0, len(pruned), DISCOVERY_CHUNK_SIZE):
+            GrantMatch.objects.filter(id__in=pruned[start:start + DISCOVERY_CHUNK_SIZE], status='suggested').delete()
+        return len(changed), len(pruned)
+
     def _apply_preference_filters(self, grants, preferences):
         """Apply grant preferences to filter available grants"""
         
@@ -56,14 +173,14 @@ class GrantMatcher:
         if preferences.preferred_funding_types:
             grants = grants.filter(funding_type__in=preferences.preferred_funding_types)
         
-        # Filter by amount range
+        # Filter by amount range (preferences are in the project's currency)
         if preferences.min_amount:
             grants = grants.filter(
-                Q(amount_max__gte=preferences.min_amount) | Q(amount_max__isnull=True)
+                self._amount_filter('amount_max', 'gte', preferences.min_amount) | Q(amount_max__isnull=True)
             )
         if preferences.max_amount:
             grants = grants.filter(
-                Q(amount_min__lte=preferences.max_amount) | Q(amount_min__isnull=True)
+                self._amount_filter('amount_min', 'lte', preferences.max_amount) | Q(amount_min__isnull=True)
             )
         
         # Filter by lead time preference
@@ -72,6 +189,79 @@ class GrantMatcher:
             grants = grants.filter(deadline__gte=min_deadline)
         
         return grants
+
+    def _preference_predicate(self, preferences, today):
+        """
+        In-memory equivalent of _apply_preference_filters, for checking many
+        projects against the same few grants without a query per project.
+        The returned function takes (funding_type, amount_min, amount_max,
+        currency, deadline) and tells whether the grant passes.
+        """
+        funding_types = set(preferences.preferred_funding_types or [])
+        min_deadline = None
+        if preferences.lead_time_preference:
+            min_deadline = today + timedelta(days=preferences.lead_time_preference)
+        table = currency.get_rate_table()
+        try:
+            table.per_usd(self.project.currency)
+            project_currency_known = True
+        except ValueError:
+            project_currency_known = False
+        limits = {}
+
+        def limit(amount, grant_currency):
+            # As currency.amount_filter: converted into the grant's currency; None keeps the grant
+            key = (amount, grant_currency)
+            if key not in limits:
+                if not project_currency_known:
+                    limits[key] = amount
+                elif grant_currency in table.currencies:
+                    rate = table.rate(self.project.currency, grant_currency)
+                    limits[key] = (Decimal(amount) * rate).quantize(currency.CENT, rounding=ROUND_HALF_UP)
+                else:
+                    limits[key] = None
+            return limits[key]
+
+        def allowed(funding_type, amount_min, amount_max, grant_currency, deadline):
+            if funding_types and funding_type not in funding_types:
+                return False
+            if preferences.min_amount and amount_max is not None:
+                bound = limit(preferences.min_amount, grant_currency)
+                if bound is not None and amount_max < bound:
+                    return False
+            if preferences.max_amount and amount_min is not None:
+                bound = limit(preferences.max_amount, grant_currency)
+                if bound is not None and amount_min > bound:
+                    return False
+            return min_deadline is None or deadline >= min_deadline
+
+        return allowed
+
+    def _amount_filter(self, field, lookup, amount):
+        try:
+            return currency.amount_filter(field, lookup, amount, self.project.currency)
+        except ValueError:
+            # Project currency missing from the rate table: compare as-is
+            return Q(**{f'{field}__{lookup}': amount})
+
+    def _load_rates(self, currencies):
+        """Look up conversion rates for a batch of grant currencies in one pass"""
+        missing = set(currencies) - set(self._rates)
+        if missing:
+            rates = currency.rates_to(self.project.currency, missing)
+            for code in missing:
+                self._rates[code] = rates.get(code)
+
+    def _grant_amounts(self, grant):
+        """Grant amount range in the project's currency, or (None, None) if it cannot be converted"""
+        self._load_rates([grant.currency])
+        rate = self._rates[grant.currency]
+        if rate is None or grant.amount_min is None or grant.amount_max is None:
+            return None, None
+        return (
+            (grant.amount_min * rate).quantize(currency.CENT),
+            (grant.amount_max * rate).quantize(currency.CENT),
+        )
     
     def _calculate_match_score(self, grant, preferences):
         """Calculate match score between project and grant"""
@@ -103,12 +293,15 @@ class GrantMatcher:
         
         # Budget alignment
         project_budget = getattr(self.project, 'estimated_budget', None)
-        if project_budget and grant.amount_min and grant.amount_max:
-            if grant.amount_min <= project_budget <= grant.amount_max:
+        amount_min, amount_max = self._grant_amounts(grant)
+        if project_budget and amount_min and amount_max:
+            if grant.currency != self.project.currency:
+                details['converted_amount_range'] = [float(amount_min), float(amount_max), self.project.currency]
+            if amount_min <= project_budget <= amount_max:
                 score += 15
                 reasoning_parts.append("Budget aligns with grant amount range")
                 details['budget_match'] = True
-            elif grant.amount_min <= project_budget * 0.5:  # Grant covers at least 50% of budget
+            elif amount_min <= project_budget / 2:  # Grant covers at least 50% of budget
                 score += 10
                 reasoning_parts.append("Grant could cover significant portion of budget")
                 details['partial_budget_match'] = True
@@ -188,4 +381,184 @@ class GrantMatcher:
         else:
             reasoning = "Basic eligibility match - review grant details for specific requirements"
         
-        return score, reasoning, details
\ No newline at end of file
+        return score, reasoning, details
+
+
+def _grant_enabled_projects(batch_size):
+    """Batches of projects with the grants feature switched on"""
+    batch = []
+    projects = Project.objects.only(*PROJECT_SCORING_FIELDS).order_by('id')
+    for project in projects.iterator(chunk_size=batch_size):
+        if 'grants' in (project.features_enabled or []):
+            batch.append(project)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def rematch_grants(grant_ids, batch_size=REMATCH_PROJECT_BATCH_SIZE):
+    """
+    Reverse matching: score added or changed grants against every
+    grant-enabled project and upsert their GrantMatch rows.
+
+    Projects are loaded in batches into a ProjectCatalog, and each grant is
+    scored against a whole batch in one vectorized pass. The work grows with
+    the number of changed grants rather than the catalog size. Scores,
+    reasoning and details are the ones discover_grants would produce,
+    including the project's preference filters. Existing matches get fresh
+    scores but keep their status and application data.
+
+    Returns:
+        Dict with counts of grants scored, projects scored, and matches created and updated
+    """
+    today = datetime.now().date()
+    changed = Grant.objects.filter(id__in=list(grant_ids), deadline__gte=today)
+    grants = scoring.GrantCatalog.build(queryset=changed)
+    summary = {'grants': len(grants), 'projects': 0, 'matches_created': 0, 'matches_updated': 0}
+    if not len(grants):
+        return summary
+
+    existing = set(GrantMatch.objects.filter(grant_id__in=grants.ids).values_list('project_id', 'grant_id'))
+    filter_values = {
+        row[0]: row[1:]
+        for row in changed.values_list('id', 'funding_type', 'amount_min', 'amount_max', 'currency', 'deadline')
+    }
+    for projects in _grant_enabled_projects(batch_size):
+        preferences = {
+            preference.project_id: preference
+            for preference in GrantPreferences.objects.filter(project__in=projects)
+        }
+        catalog = scoring.ProjectCatalog(projects, preferences)
+        summary['projects'] += len(catalog)
+
+        hits = []  # (project position, grant row, score, mask, converted)
+        for row in range(len(grants)):
+            scores, masks, converted = catalog.score(grants, row)
+            for position in np.flatnonzero(scores >= scoring.MATCH_THRESHOLD):
+                hits.append((position, row, int(scores[position]), int(masks[position]), converted))
+
+        # Projects with preferences only see grants that pass their filters, as in discovery;
+        # the filters are evaluated in memory over the changed grants loaded above
+        allowed = {}
+        for position in {hit[0] for hit in hits if catalog.preferences[hit[0]]}:
+            passes = GrantMatcher(catalog.projects[position])._preference_predicate(
+                catalog.preferences[position], today
+            )
+            allowed[position] = {
+                grant_id for grant_id, values in filter_values.items() if passes(*values)
+            }
+
+        matches = []
+        for position, row, score, mask, converted in hits:
+            grant_id = grants.ids[row]
+            if position in allowed and grant_id not in allowed[position]:
+                continue
+            project = catalog.projects[position]
+            if (project.id, grant_id) in existing:
+                summary['matches_updated'] += 1
+            else:
+                summary['matches_created'] += 1
+            matches.append(GrantMatch(
+                project=project,
+                grant_id=grant_id,
+                match_score=score,
+                match_quality=GrantMatch.quality_for_score(score),
+                match_reasoning=catalog.reasoning(position, mask),
+                match_details=catalog.details(position, mask, converted)
+            ))
+
+        GrantMatch.objects.bulk_create(
+            matches,
+            batch_size=DISCOVERY_CHUNK_SIZE,
+            update_conflicts=True,
+            unique_fields=['project', 'grant'],
+            update_fields=['match_score', 'match_quality', 'match_reasoning', 'match_details', 'updated_at']
+        )
+    return summary
+
+
+def match_inputs(project, preferences):
+    """JSON-safe snapshot of the project and preference values matching reads"""
+    values = {field: getattr(project, field) for field in PROJECT_MATCH_FIELDS}
+    for field in PREFERENCE_FILTER_FIELDS + PREFERENCE_SCORE_FIELDS:
+        values[field] = getattr(preferences, field, None)
+    return json.loads(json.dumps(values, cls=DjangoJSONEncoder))
+
+
+def _filters_widened(previous, current, fields):
+    """Whether the current preference filters can admit grants the previous ones excluded"""
+    for field in fields:
+        old, new = previous[field], current[field]
+        if not new:
+            widened = bool(old)  # An empty value switches the filter off
+        elif not old:
+            widened = False
+        elif field == 'preferred_funding_types':
+            widened = not set(new) <= set(old)
+        elif field == 'max_amount':
+            widened = Decimal(str(new)) > Decimal(str(old))
+        else:  # min_amount and lead_time_preference: higher is stricter
+            widened = Decimal(str(new)) < Decimal(str(old))
+        if widened:
+            return True
+    return False
+
+
+def rescore_project(project, previous):
+    """
+    Targeted rescoring after a project's matching inputs changed.
+
+    ``previous`` maps fields of ``match_inputs`` to their values before the
+    edit. Only the affected work is done: matches whose score can move are
+    rescored (those of grant types added to or dropped from the funding
+    priorities, or all of them when project data or the region bonus
+    changed), suggested matches the new filters exclude are deleted in one
+    query, and discovery only runs when the edit can admit new grants.
+
+    Returns:
+        Dict with counts of matches rescored, pruned and created
+    """
+    summary = {'rescored': 0, 'pruned': 0, 'created': 0}
+    preferences = GrantPreferences.objects.filter(project=project).first()
+    current = match_inputs(project, preferences)
+    changed = {field for field, value in previous.items() if field in current and current[field] != value}
+    if not changed:
+        return summary
+
+    project_changed = bool(changed & set(PROJECT_MATCH_FIELDS))
+    filters_changed = changed & set(PREFERENCE_FILTER_FIELDS)
+    region_changed = 'preferred_regions' in changed and (
+        bool(previous['preferred_regions']) != bool(current['preferred_regions'])
+    )
+    old_priorities = set(previous.get('funding_priorities', current['funding_priorities']) or [])
+    new_priorities = set(current['funding_priorities'] or [])
+
+    matches = GrantMatch.objects.filter(project=project)
+    if project_changed or region_changed:
+        to_rescore = matches
+    elif old_priorities != new_priorities:
+        to_rescore = matches.filter(grant__grant_type__in=old_priorities ^ new_priorities)
+    else:
+        to_rescore = None
+
+    matcher = GrantMatcher(project)
+    with transaction.atomic():
+        if to_rescore is not None:
+            summary['rescored'], summary['pruned'] = matcher.rescore_matches(
+                to_rescore.select_for_update(of=('self',)), preferences
+            )
+
+        # The amount filters compare in the project's currency, so a currency change re-filters too
+        if preferences and (filters_changed or project_changed):
+            allowed = matcher._apply_preference_filters(Grant.objects.all(), preferences)
+            pruned, _ = matches.filter(status='suggested').exclude(grant__in=allowed.values('id')).delete()
+            summary['pruned'] += pruned
+
+        if (project_changed or _filters_widened(previous, current, filters_changed)
+                or new_priorities - old_priorities
+                or (region_changed and current['preferred_regions'])):
+            summary['created'] = matcher.discover_grants()
+    return summary
+
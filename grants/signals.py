@@ -0,0 +1,101 @@
+"""
+Keep the grant attribute index and list facet counts in step with grant
+edits, and queue the typeahead snapshot update and reverse matching of
+changed grants for the agent worker
+"""
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from grants import listing
+from grants.index import index_grant
+from grants.models import Grant
+
+_pending = threading.local()
+
+
+class _Batch:
+    """Grant ids changed in one transaction, flushed once it commits"""
+
+    def __init__(self):
+        self.saved = set()
+        self.deleted = set()
+
+    def flush(self):
+        if getattr(_pending, 'batch', None) is self:
+            _pending.batch = None
+        if not (self.saved or self.deleted):
+            return
+        listing.invalidate_facets()
+        _queue_rematch(self.saved, self.deleted)
+
+
+def _open_batch():
+    """
+    This thread's batch awaiting commit, or None. A batch whose commit
+    callback is no longer registered was rolled back with its transaction,
+    so its ids are dropped.
+    """
+    batch = getattr(_pending, 'batch', None)
+    if batch is not None and any(entry[1] == batch.flush for entry in transaction.get_connection().run_on_commit):
+        return batch
+    return None
+
+
+def _queue_rematch(saved, deleted):
+    """
+    Reverse matching scans every grant-enabled project and a typeahead
+    update rewrites the whole snapshot, so both run in the agent worker.
+    Ids are merged into a rematch job that is still queued, so a burst of
+    edits becomes one job.
+    """
+    from agents.models import AgentJob
+
+    params = {
+        'grant_ids': {str(grant_id) for grant_id in saved},
+        'deleted_ids': {str(grant_id) for grant_id in deleted},
+    }
+    with transaction.atomic():
+        job = AgentJob.objects.select_for_update().filter(
+            agent_type='grant_rematch', status='queued'
+        ).order_by('created_at').first()
+        if job is not None:
+            merged = {key: sorted(ids | set(job.input_params.get(key, []))) for key, ids in params.items()}
+            # The worker claims jobs with a conditional update, so a job it has taken is left alone
+            if AgentJob.objects.filter(id=job.id, status='queued').update(input_params=merged):
+                return
+        AgentJob.objects.create(
+            agent_type='grant_rematch',
+            input_params={key: sorted(ids) for key, ids in params.items()}
+        )
+
+
+def queue_changes(saved=(), deleted=()):
+    """
+    Refresh derived data for grants once the current transaction commits.
+    Grants changed in one transaction are processed together. Bulk writes
+    that skip model signals call this directly.
+    """
+    batch = _open_batch()
+    opened = batch is None
+    if opened:
+        batch = _pending.batch = _Batch()
+    batch.saved.update(saved)
+    batch.deleted.update(deleted)
+    if opened:
+        # Runs at once outside a transaction, so the ids are added first
+        transaction.on_commit(batch.flush)
+
+
+@receiver(post_save, sender=Grant)
+def update_grant_index(sender, instance, **kwargs):
+    # Postings are removed with the grant by the foreign key cascade
+    index_grant(instance)
+    queue_changes(saved=[instance.id])
+
+
+@receiver(post_delete, sender=Grant)
+def forget_grant(sender, instance, **kwargs):
+    queue_changes(deleted=[instance.id])
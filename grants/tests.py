@@ -0,0 +1,177 @@
+import datetime
+import itertools
+from decimal import Decimal
+import shutil
+import tempfile
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from agents.models import AgentJob
+from accounts.models import Company
+from agents.processors import AgentProcessor
+from grants import listing, scoring, typeahead
+from grants.models import Grant, GrantPreferences
+from grants.services import GrantMatcher
+from projects.models import Project
+
+
+class GrantTestCase(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(
+            GRANT_TYPEAHEAD_DIR=directory,
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        typeahead.clear_cache()
+        self.addCleanup(typeahead.clear_cache)
+
+    def make_grant(self, title, **fields):
+        fields.setdefault('deadline', datetime.date.today() + datetime.timedelta(days=30))
+        return Grant.objects.create(
+            title=title, organization='Film Trust', external_id=title, url='https://example.org', **fields
+        )
+
+
+class GrantChangeQueueTests(GrantTestCase):
+
+    def _rematch_jobs(self):
+        return list(AgentJob.objects.filter(agent_type='grant_rematch').order_by('created_at').values_list(
+            'status', 'input_params'
+        ))
+
+    def test_burst_of_saves_shares_one_queued_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.make_grant('Documentary Fund')
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.make_grant('Short Film Award')
+
+        self.assertEqual(
+            self._rematch_jobs(),
+            [('queued', {'grant_ids': sorted([str(first.id), str(second.id)]), 'deleted_ids': []})]
+        )
+
+    def test_claimed_job_is_not_extended(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.make_grant('Documentary Fund')
+        AgentJob.objects.filter(agent_type='grant_rematch').update(status='processing')
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.make_grant('Short Film Award')
+
+        self.assertEqual(self._rematch_jobs(), [
+            ('processing', {'grant_ids': [str(first.id)], 'deleted_ids': []}),
+            ('queued', {'grant_ids': [str(second.id)], 'deleted_ids': []}),
+        ])
+
+    def test_rolled_back_ids_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.make_grant('Withdrawn Fund')
+                    raise ValueError('form rejected')
+            except ValueError:
+                pass
+            kept = self.make_grant('Short Film Award')
+
+        self.assertEqual(self._rematch_jobs(), [('queued', {'grant_ids': [str(kept.id)], 'deleted_ids': []})])
+
+    def test_deletes_are_queued_with_saves(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.make_grant('Documentary Fund')
+        first_id = str(first.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+
+        self.assertEqual(self._rematch_jobs(), [('queued', {'grant_ids': [first_id], 'deleted_ids': [first_id]})])
+
+    def test_typeahead_is_published_by_the_rematch_job(self):
+        self.assertEqual(typeahead.suggest('documentary'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_grant('Documentary Fund')
+        self.assertEqual(typeahead.suggest('documentary'), [])
+
+        job = AgentJob.objects.get(agent_type='grant_rematch')
+        self.assertTrue(AgentProcessor().process_job(job)['success'])
+        self.assertEqual([suggestion['title'] for suggestion in typeahead.suggest('documentary')], ['Documentary Fund'])
+
+
+class FacetCountTests(GrantTestCase):
+
+    def test_grant_writes_drop_cached_counts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_grant('Documentary Fund', grant_type='production')
+        self.assertEqual(listing.facet_counts()['total'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_grant('Short Film Award', grant_type='production')
+        self.assertEqual(listing.facet_counts()['grant_type'], {'production': 2})
+
+
+class ScoringParityTests(GrantTestCase):
+    """The vectorized GrantScorer must agree with GrantMatcher._calculate_match_score"""
+
+    AMOUNTS = [(None, None), (Decimal('0'), Decimal('5000')), (Decimal('1000'), None),
+               (Decimal('20000'), Decimal('150000')), (Decimal('500.50'), Decimal('30000.25'))]
+    CURRENCIES = ['USD', 'EUR', 'GBP', 'ZZZ']
+    LOCATIONS = [{}, {'state': 'CA'}, {'state': 'ny'}, {'country': 'United States'}, {'country': 'Canada'}]
+    GRANT_TYPES = ['development', 'production', 'post_production', 'general']
+
+    def setUp(self):
+        super().setUp()
+        combos = itertools.product(self.AMOUNTS, self.CURRENCIES, self.LOCATIONS, self.GRANT_TYPES)
+        for number, ((amount_min, amount_max), currency, location, grant_type) in enumerate(combos):
+            self.make_grant(
+                f'Grant {number}',
+                amount_min=amount_min, amount_max=amount_max, currency=currency,
+                location_restrictions=location, grant_type=grant_type,
+                deadline=datetime.date.today() + datetime.timedelta(days=number % 90 + 1),
+                project_types=[['feature'], ['documentary', 'short'], []][number % 3],
+                eligibility_criteria=[{}, {'genre': 'Drama'}, {'notes': 'horror'}][number % 3],
+                description=['', 'Community impact fund', 'Supporting emerging voices'][number % 3],
+            )
+        self.company = Company.objects.create(name='Studio')
+
+    def _project(self, **fields):
+        return Project.objects.create(company=self.company, name='Feature', **fields)
+
+    def _assert_parity(self, project, preferences=None):
+        matcher = GrantMatcher(project)
+        catalog = scoring.GrantCatalog.build()
+        grants = list(Grant.objects.order_by('title'))
+        rows, missing = catalog.rows_for([grant.id for grant in grants])
+        self.assertEqual(missing, [])
+        scorer = scoring.GrantScorer(matcher, preferences, catalog)
+        scores, masks = scorer.score(rows)
+
+        for position, (grant, row) in enumerate(zip(grants, rows)):
+            mask = int(masks[position])
+            with self.subTest(grant=grant.title):
+                self.assertEqual(
+                    (int(scores[position]), scorer.reasoning(mask), scorer.details(row, position, mask)),
+                    matcher._calculate_match_score(grant, preferences)
+                )
+
+    def test_usd_project_with_preferences(self):
+        project = self._project(
+            type='feature', project_stage='production', genres=['drama'], themes=['community'],
+            diversity_flags=['female_director'], production_location={'state': 'CA', 'country': 'USA'},
+            estimated_budget=Decimal('25000'), currency='USD',
+        )
+        preferences = GrantPreferences.objects.create(
+            project=project, funding_priorities=['production'], preferred_regions=['west']
+        )
+        self._assert_parity(project, preferences)
+
+    def test_converted_budget_without_preferences(self):
+        project = self._project(
+            type='documentary', project_stage='development', production_location={'country': 'us'},
+            estimated_budget=Decimal('60000'), currency='EUR',
+        )
+        self._assert_parity(project)
+
+    def test_project_without_budget_or_location(self):
+        self._assert_parity(self._project(type='short', project_stage='post_production'))
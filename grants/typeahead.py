@@ -0,0 +1,322 @@
+"""
+In-process typeahead index for grant search suggestions.
+
+Titles and organizations of non-expired grants are split into words. Each
+word is posted under its 2, 3 and 4 character prefixes. A query walks the
+shortest posting list among its words, in deadline order, and checks that
+every query word starts some word of the grant. It stops after ``limit``
+hits, so suggestions never touch the database.
+
+Workers share the index through versioned snapshot files in
+settings.GRANT_TYPEAHEAD_DIR: ``typeahead-<version>.pickle`` plus a
+``CURRENT`` pointer. Grant saves and deletes are queued on the grant
+rematch job, and the agent worker applies each batch to the latest
+snapshot under a file lock and publishes a new version. Each worker notices a new
+version with one stat() of the pointer and reloads it. The index is
+rebuilt from the database once a day to drop expired grants.
+"""
+import bisect
+import datetime
+import os
+import pickle
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from grants.models import Grant
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshot writes are not serialized across processes
+    fcntl = None
+
+
+MIN_PREFIX = 2
+MAX_PREFIX = 4
+SNAPSHOTS_KEPT = 2
+BULK_APPLY_SIZE = 200
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+_lock = threading.Lock()
+_index = None
+_pointer_stat = None
+
+
+def _tokens(text):
+    return _TOKEN.findall((text or '').lower())
+
+
+def _amount_range(amount_min, amount_max):
+    if amount_min and amount_max:
+        return f"${amount_min:,.0f} - ${amount_max:,.0f}"
+    return "Amount varies"
+
+
+class TypeaheadIndex:
+    """Prefix postings over grant titles and organizations"""
+
+    FIELDS = ['id', 'title', 'organization', 'deadline', 'amount_min', 'amount_max']
+
+    def __init__(self, built_on, version=0):
+        self.built_on = built_on
+        self.version = version
+        self.entries = {}   # grant id -> (order key, words, suggestion dict)
+        self.postings = {}  # prefix -> grant ids sorted by order key
+
+    @classmethod
+    def build(cls, today=None, version=0):
+        today = today or datetime.date.today()
+        index = cls(today, version)
+        rows = Grant.objects.filter(deadline__gte=today).order_by().values_list(*cls.FIELDS)
+        for row in rows.iterator(chunk_size=2000):
+            index._add_entry(*row)
+
+        # Sort each posting list once instead of inserting in order
+        order = {grant_id: entry[0] for grant_id, entry in index.entries.items()}
+        for grant_ids in index.postings.values():
+            grant_ids.sort(key=order.__getitem__)
+        return index
+
+    def __len__(self):
+        return len(self.entries)
+
+    def copy(self):
+        """Independent copy for applying changes while readers use this one"""
+        index = TypeaheadIndex(self.built_on, self.version)
+        index.entries = dict(self.entries)
+        index.postings = {prefix: list(grant_ids) for prefix, grant_ids in self.postings.items()}
+        return index
+
+    @staticmethod
+    def _prefixes(words):
+        return {word[:length] for word in words for length in range(MIN_PREFIX, min(len(word), MAX_PREFIX) + 1)}
+
+    def _add_entry(self, grant_id, title, organization, deadline, amount_min, amount_max, ordered=False):
+        grant_id = str(grant_id)
+        key = (deadline.toordinal(), title.lower(), grant_id)
+        words = tuple(sorted(set(_tokens(title) + _tokens(organization))))
+        suggestion = {
+            'id': grant_id,
+            'title': title,
+            'organization': organization,
+            'deadline': deadline.strftime('%b %d, %Y'),
+            'amount_range': _amount_range(amount_min, amount_max),
+        }
+        self.entries[grant_id] = (key, words, suggestion)
+        for prefix in self._prefixes(words):
+            postings = self.postings.setdefault(prefix, [])
+            if ordered:
+                postings.insert(bisect.bisect(postings, key, key=lambda other: self.entries[other][0]), grant_id)
+            else:
+                postings.append(grant_id)
+
+    def _remove_entry(self, grant_id):
+        entry = self.entries.pop(grant_id, None)
+        if entry is None:
+            return
+        for prefix in self._prefixes(entry[1]):
+            postings = self.postings.get(prefix)
+            if postings is not None:
+                postings.remove(grant_id)
+                if not postings:
+                    del self.postings[prefix]
+
+    def apply(self, grant_ids):
+        """Re-read ``grant_ids`` from the database and update their entries in place"""
+        grant_ids = {str(grant_id) for grant_id in grant_ids}
+        rows = Grant.objects.filter(id__in=grant_ids, deadline__gte=self.built_on).values_list(*self.FIELDS)
+        if len(grant_ids) <= BULK_APPLY_SIZE:
+            for grant_id in grant_ids:
+                self._remove_entry(grant_id)
+            for row in rows:
+                self._add_entry(*row, ordered=True)
+            return
+
+        # Large batches (feed ingestion): filter and re-sort each touched posting list once
+        touched = set()
+        for grant_id in grant_ids:
+            entry = self.entries.pop(grant_id, None)
+            if entry is not None:
+                touched |= self._prefixes(entry[1])
+        for prefix in touched:
+            self.postings[prefix] = [grant_id for grant_id in self.postings[prefix] if grant_id not in grant_ids]
+        for row in rows.iterator(chunk_size=2000):
+            self._add_entry(*row)
+            touched |= self._prefixes(self.entries[str(row[0])][1])
+        for prefix in touched:
+            if self.postings.get(prefix):
+                self.postings[prefix].sort(key=lambda grant_id: self.entries[grant_id][0])
+            else:
+                self.postings.pop(prefix, None)
+
+    def suggest(self, query, limit=10, today=None):
+        """Up to ``limit`` suggestion dicts for ``query``, soonest deadline first"""
+        words = _tokens(query)
+        lookups = [word[:MAX_PREFIX] for word in words if len(word) >= MIN_PREFIX]
+        if not lookups:
+            return []
+        candidates = min((self.postings.get(prefix, []) for prefix in lookups), key=len)
+
+        today = (today or datetime.date.today()).toordinal()
+        results = []
+        for grant_id in candidates:
+            entry = self.entries.get(grant_id)  # None if removed by a concurrent update
+            if entry is None:
+                continue
+            key, grant_words, suggestion = entry
+            if key[0] < today:
+                continue
+            if all(any(grant_word.startswith(word) for grant_word in grant_words) for word in words):
+                results.append(dict(suggestion))
+                if len(results) >= limit:
+                    break
+        return results
+
+
+def _directory():
+    return settings.GRANT_TYPEAHEAD_DIR
+
+
+def _pointer_path():
+    return os.path.join(_directory(), 'CURRENT')
+
+
+def _snapshot_path(version):
+    return os.path.join(_directory(), f'typeahead-{version}.pickle')
+
+
+@contextmanager
+def _writer_lock():
+    os.makedirs(_directory(), exist_ok=True)
+    with open(os.path.join(_directory(), 'lock'), 'a') as handle:
+        if fcntl:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _published_version():
+    try:
+        with open(_pointer_path()) as handle:
+            return int(handle.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _read_snapshot():
+    """Latest published index, or None. May be this process's live index; copy before changing it"""
+    version = _published_version()
+    if version is None:
+        return None
+    if _index is not None and _index.version == version:
+        return _index  # Already loaded in this process
+    try:
+        with open(_snapshot_path(version), 'rb') as handle:
+            return pickle.load(handle)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _publish(index):
+    """Write ``index`` as the next version and point CURRENT at it (caller holds the writer lock)"""
+    index.version += 1
+    directory = _directory()
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(handle, 'wb') as output:
+        pickle.dump(index, output, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, _snapshot_path(index.version))
+
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(handle, 'w') as output:
+        output.write(str(index.version))
+    os.replace(temporary, _pointer_path())
+
+    stale = index.version - SNAPSHOTS_KEPT
+    for name in os.listdir(directory):
+        if name.startswith('typeahead-') and name.endswith('.pickle'):
+            try:
+                if int(name[len('typeahead-'):-len('.pickle')]) <= stale:
+                    os.remove(os.path.join(directory, name))
+            except (ValueError, OSError):
+                continue
+
+
+def _pointer_state():
+    try:
+        stat = os.stat(_pointer_path())
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _rebuild(today):
+    try:
+        with _writer_lock():
+            index = _read_snapshot()  # Another worker may have rebuilt it while we waited
+            if index is None or index.built_on != today:
+                index = TypeaheadIndex.build(today, version=index.version if index else 0)
+                _publish(index)
+            return index
+    except OSError:
+        # Snapshot directory unavailable: keep a private index in this process
+        return TypeaheadIndex.build(today)
+
+
+def _current(today):
+    """This process's index, reloaded when another worker published a newer version"""
+    global _index, _pointer_stat
+    state = _pointer_state()
+    if _index is not None and _index.built_on == today and state in (None, _pointer_stat):
+        return _index
+
+    with _lock:
+        index = _read_snapshot()
+        if index is None or index.built_on != today:
+            index = _rebuild(today)
+        _index = index
+        _pointer_stat = _pointer_state()
+    return _index
+
+
+def suggest(query, limit=10):
+    """Suggestions for ``query`` from the shared snapshot"""
+    today = datetime.date.today()
+    return _current(today).suggest(query, limit=limit, today=today)
+
+
+def apply_changes(grant_ids):
+    """Publish a new snapshot with ``grant_ids`` re-read (added, changed or deleted)"""
+    global _index, _pointer_stat
+    today = datetime.date.today()
+    try:
+        with _writer_lock():
+            index = _read_snapshot()
+            if index is None or index.built_on != today:
+                index = TypeaheadIndex.build(today, version=index.version if index else 0)
+            else:
+                # Concurrent suggest() calls may be walking the live index
+                index = index.copy() if index is _index else index
+                index.apply(grant_ids)
+            _publish(index)
+    except OSError:
+        if _index is None:
+            return
+        index = _index.copy()
+        index.apply(grant_ids)
+    with _lock:
+        _index = index
+        _pointer_stat = _pointer_state()
+
+
+def clear_cache():
+    global _index, _pointer_stat
+    with _lock:
+        _index = None
+        _pointer_stat = None
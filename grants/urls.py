@@ -16,5 +16,6 @@ urlpatterns = [
     
     # Grant management
     path('bookmark/<uuid:grant_id>/', views.GrantBookmarkView.as_view(), name='bookmark'),
+    path('bookmarks/', views.GrantBookmarkListView.as_view(), name='bookmarks'),
     path('apply/<uuid:grant_id>/', views.GrantApplyView.as_view(), name='apply'),
 ]
\ No newline at end of file
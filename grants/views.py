@@ -3,13 +3,16 @@ from django.views.generic import ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import JsonResponse
 from django.views import View
-from django.db.models import Q, Count, Avg
+from django.db.models import Q, Count, Avg, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
 import json
 
-from .models import Grant, GrantMatch, GrantPreferences
+from core.utils import currency
+from . import listing, search, typeahead
+from .models import Grant, GrantBookmark, GrantMatch, GrantPreferences
 from projects.models import Project
 
 
@@ -18,23 +21,21 @@ class GrantListView(LoginRequiredMixin, ListView):
     model = Grant
     template_name = 'grants/list.html'
     context_object_name = 'grants'
-    paginate_by = 20
 
     def get_queryset(self):
+        # Match counts come from a correlated subquery rather than a join + GROUP BY,
+        # which keeps the full-text rank usable (SQLite's bm25() cannot run in an aggregate)
+        matches = GrantMatch.objects.filter(grant=OuterRef('pk')).order_by().values('grant')
         queryset = Grant.objects.filter(
             deadline__gte=timezone.now().date()
         ).annotate(
-            matches_count=Count('matches')
+            matches_count=Coalesce(Subquery(matches.annotate(count=Count('id')).values('count')), 0)
         ).order_by('deadline')
 
-        # Apply search filter
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(organization__icontains=search) |
-                Q(description__icontains=search)
-            )
+        # Apply search filter (full-text, best matches first)
+        search_query = self.request.GET.get('search')
+        if search_query:
+            queryset = search.search_grants(queryset, search_query)
 
         # Apply filters
         grant_type = self.request.GET.get('grant_type')
@@ -45,12 +46,15 @@ class GrantListView(LoginRequiredMixin, ListView):
         if funding_type:
             queryset = queryset.filter(funding_type=funding_type)
 
+        # Amount filters are entered in one currency and compared across grant currencies
+        amount_currency = self.request.GET.get('currency', 'USD')
         min_amount = self.request.GET.get('min_amount')
         if min_amount:
             try:
                 min_amount = Decimal(min_amount)
                 queryset = queryset.filter(
-                    Q(amount_min__gte=min_amount) | Q(amount_min__isnull=True)
+                    currency.amount_filter('amount_min', 'gte', min_amount, amount_currency) |
+                    Q(amount_min__isnull=True)
                 )
             except:
                 pass
@@ -60,15 +64,27 @@ class GrantListView(LoginRequiredMixin, ListView):
             try:
                 max_amount = Decimal(max_amount)
                 queryset = queryset.filter(
-                    Q(amount_max__lte=max_amount) | Q(amount_max__isnull=True)
+                    currency.amount_filter('amount_max', 'lte', max_amount, amount_currency) |
+                    Q(amount_max__isnull=True)
                 )
             except:
                 pass
 
         return queryset
 
+    def paginate(self, queryset):
+        """Keyset page for the current request; search results page by rank"""
+        page = listing.paginate(queryset, self.request.GET, ranked=bool(self.request.GET.get('search')))
+        listing.mark_bookmarked(page.object_list, self.request.user)
+        return {
+            'grants': page.object_list,
+            'page': page,
+            'is_paginated': page.has_next or page.has_previous,
+        }
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context.update(self.paginate(self.object_list))
         
         # Get user's projects for quick apply functionality
         user_projects = Project.objects.filter(
@@ -77,24 +93,25 @@ class GrantListView(LoginRequiredMixin, ListView):
         
         context['user_projects'] = user_projects
         
-        # Grant statistics
-        total_grants = Grant.objects.filter(deadline__gte=timezone.now().date()).count()
-        closing_soon = Grant.objects.filter(
-            deadline__gte=timezone.now().date(),
-            deadline__lte=timezone.now().date() + timedelta(days=30)
-        ).count()
+        # Grant statistics and per-option counts (one cached grouped query)
+        facets = listing.facet_counts()
         
         context.update({
-            'total_grants': total_grants,
-            'closing_soon': closing_soon,
-            'grant_types': Grant.GRANT_TYPES,
-            'funding_types': Grant.FUNDING_TYPES,
+            'total_grants': facets['total'],
+            'closing_soon': facets['closing_soon'],
+            'grant_types': [
+                (value, f"{label} ({facets['grant_type'].get(value, 0)})") for value, label in Grant.GRANT_TYPES
+            ],
+            'funding_types': [
+                (value, f"{label} ({facets['funding_type'].get(value, 0)})") for value, label in Grant.FUNDING_TYPES
+            ],
             'current_filters': {
                 'search': self.request.GET.get('search', ''),
                 'grant_type': self.request.GET.get('grant_type', ''),
                 'funding_type': self.request.GET.get('funding_type', ''),
                 'min_amount': self.request.GET.get('min_amount', ''),
                 'max_amount': self.request.GET.get('max_amount', ''),
+                'currency': self.request.GET.get('currency', 'USD'),
             }
         })
         
@@ -146,7 +163,7 @@ class GrantFilterView(LoginRequiredMixin, View):
         queryset = view.get_queryset()
         
         context = {
-            'grants': queryset[:20],  # Limit to first 20 for performance
+            **view.paginate(queryset),
             'user_projects': Project.objects.filter(
                 company__members__user=request.user,
                 features_enabled__icontains='grants'
@@ -165,23 +182,8 @@ class GrantSearchView(LoginRequiredMixin, View):
         if len(query) < 2:
             return JsonResponse({'results': []})
         
-        grants = Grant.objects.filter(
-            Q(title__icontains=query) |
-            Q(organization__icontains=query),
-            deadline__gte=timezone.now().date()
-        )[:10]
-        
-        results = []
-        for grant in grants:
-            results.append({
-                'id': str(grant.id),
-                'title': grant.title,
-                'organization': grant.organization,
-                'deadline': grant.deadline.strftime('%b %d, %Y'),
-                'amount_range': f"${grant.amount_min:,.0f} - ${grant.amount_max:,.0f}" if grant.amount_min and grant.amount_max else "Amount varies"
-            })
-        
-        return JsonResponse({'results': results})
+        # Served from the in-process typeahead index; no database query per keystroke
+        return JsonResponse({'results': typeahead.suggest(query, limit=10)})
 
 
 class GrantBookmarkView(LoginRequiredMixin, View):
@@ -189,19 +191,12 @@ class GrantBookmarkView(LoginRequiredMixin, View):
     
     def post(self, request, grant_id):
         grant = get_object_or_404(Grant, id=grant_id)
+        self._import_session_bookmarks(request)
         
-        # For now, we'll use a simple session-based bookmarking
-        # In a real app, you might want a proper bookmark model
-        bookmarks = request.session.get('grant_bookmarks', [])
-        
-        if str(grant_id) in bookmarks:
-            bookmarks.remove(str(grant_id))
-            bookmarked = False
-        else:
-            bookmarks.append(str(grant_id))
-            bookmarked = True
-        
-        request.session['grant_bookmarks'] = bookmarks
+        deleted, _ = GrantBookmark.objects.filter(user=request.user, grant=grant).delete()
+        bookmarked = not deleted
+        if bookmarked:
+            GrantBookmark.objects.get_or_create(user=request.user, grant=grant)
         
         return JsonResponse({
             'status': 'success',
@@ -209,6 +204,35 @@ class GrantBookmarkView(LoginRequiredMixin, View):
             'message': 'Grant bookmarked!' if bookmarked else 'Bookmark removed'
         })
 
+    def _import_session_bookmarks(self, request):
+        """Carry over bookmarks kept in the session before they were stored per user"""
+        grant_ids = request.session.pop('grant_bookmarks', None)
+        if grant_ids:
+            GrantBookmark.objects.bulk_create(
+                [GrantBookmark(user=request.user, grant=grant) for grant in Grant.objects.filter(id__in=grant_ids)],
+                ignore_conflicts=True
+            )
+
+
+class GrantBookmarkListView(LoginRequiredMixin, View):
+    """The user's bookmarked grants, paginated like the main list"""
+
+    def get(self, request):
+        queryset = Grant.objects.filter(bookmarks__user=request.user)
+        page = listing.paginate(queryset, request.GET)
+        for grant in page.object_list:
+            grant.is_bookmarked = True
+
+        return render(request, 'grants/bookmarks.html', {
+            'grants': page.object_list,
+            'page': page,
+            'is_paginated': page.has_next or page.has_previous,
+            'user_projects': Project.objects.filter(
+                company__members__user=request.user,
+                features_enabled__icontains='grants'
+            ),
+        })
+
 
 class GrantApplyView(LoginRequiredMixin, View):
     """Quick apply for a grant (creates a grant match)"""
@@ -17,7 +17,7 @@ django.setup()
 
 from django.contrib.auth.models import User
 from accounts.models import Company, Profile
-from grants.models import Grant
+from grants import ingest
 from festivals.models import Festival
 from django.utils import timezone
 
@@ -65,17 +65,9 @@ def create_initial_data():
         }
     ]
     
-    grants_created = 0
-    for grant_data in sample_grants:
-        grant, created = Grant.objects.get_or_create(
-            title=grant_data['title'],
-            organization=grant_data['organization'],
-            defaults=grant_data
-        )
-        if created:
-            grants_created += 1
+    summary = ingest.ingest(sample_grants)
     
-    print(f"✓ Created {grants_created} sample grants")
+    print(f"✓ Created {summary['inserted']} sample grants")
     
     # Create sample festivals
     sample_festivals = [
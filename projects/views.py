@@ -10,6 +10,10 @@ from django.utils import timezone
 from .models import Project, ProjectFeature
 from .forms import ProjectSetupForm, ProjectCoreDataForm, GrantPreferencesForm, ProjectFeatureSetupForm
 from grants.models import GrantPreferences, Grant, GrantMatch
+from grants.services import match_inputs
+from agents.models import AgentJob
+from budgets.models import Budget
+from budgets import rollups as budget_rollups
 
 
 class ProjectListView(LoginRequiredMixin, ListView):
@@ -151,6 +155,8 @@ class ProjectGrantSetupView(LoginRequiredMixin, View):
     def post(self, request, project_id):
         project = get_object_or_404(Project, id=project_id)
         grant_preferences, created = GrantPreferences.objects.get_or_create(project=project)
+        # Taken before validation, which writes the submitted values onto the instances
+        previous = match_inputs(project, grant_preferences)
         
         core_data_form = ProjectCoreDataForm(instance=project, data=request.POST)
         grant_prefs_form = GrantPreferencesForm(instance=grant_preferences, data=request.POST)
@@ -160,6 +166,16 @@ class ProjectGrantSetupView(LoginRequiredMixin, View):
                 core_data_form.save()
                 grant_prefs_form.save()
                 
+                # Rescore only what the edit affects, in the agent worker rather than this request
+                current = match_inputs(project, grant_preferences)
+                changed = {field: value for field, value in previous.items() if current[field] != value}
+                if changed:
+                    AgentJob.objects.create(
+                        project=project,
+                        agent_type='grant_rescore',
+                        input_params={'previous': changed}
+                    )
+                
                 # Mark grant feature as setup completed
                 try:
                     grant_feature = ProjectFeature.objects.get(project=project, feature='grants')
@@ -200,6 +216,18 @@ class ProjectBudgetView(LoginRequiredMixin, DetailView):
     model = Project
     template_name = 'projects/tabs/budget.html'
     pk_url_kwarg = 'project_id'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        project = self.object
+        
+        # Totals come from the materialized rollups, not a scan over items
+        budget = Budget.objects.filter(project=project).order_by('-version').first()
+        context['budget'] = budget
+        context['budget_versions'] = Budget.objects.filter(project=project).order_by('-version').values('id', 'version', 'status', 'total_budget')
+        context['budget_summary'] = budget_rollups.summary(budget) if budget else []
+        
+        return context
 
 
 class ProjectScheduleView(LoginRequiredMixin, DetailView):
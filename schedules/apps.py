@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class SchedulesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'schedules'
\ No newline at end of file
+    name = 'schedules'
+
+    def ready(self):
+        from schedules import signals  # noqa: F401
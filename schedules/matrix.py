@@ -0,0 +1,213 @@
+"""
+Day-out-of-days and cast/location reports from a precomputed schedule matrix.
+
+The matrix is built once per schedule version from ShootDay and Scene rows.
+Reports then only unpack a few small arrays and run in O(days x cast)
+without touching Scene rows.
+"""
+import numpy as np
+
+from breakdown.models import ScriptBreakdown
+from schedules.models import ScheduleMatrix
+
+
+def _pack(matrix):
+    return np.packbits(matrix.astype(bool), axis=1).tobytes() if matrix.size else b''
+
+
+def _unpack(data, rows, columns):
+    if not rows or not columns:
+        return np.zeros((rows, columns), dtype=bool)
+    packed = np.frombuffer(bytes(data), dtype=np.uint8).reshape(rows, -1)
+    return np.unpackbits(packed, axis=1, count=columns).astype(bool)
+
+
+def build_matrix(schedule):
+    """Compute and store the matrix for a schedule version"""
+    days = list(schedule.shoot_days.order_by('order_index', 'day_number').values('day_number', 'date', 'scenes'))
+    try:
+        scene_rows = schedule.project.breakdown.scenes.values('number', 'location', 'characters', 'est_shoot_hours')
+        scenes = {row['number']: row for row in scene_rows}
+    except ScriptBreakdown.DoesNotExist:
+        scenes = {}
+
+    characters = sorted({name for row in scenes.values() for name in (row['characters'] or [])})
+    locations = sorted({row['location'] for row in scenes.values()})
+    character_index = {name: idx for idx, name in enumerate(characters)}
+    location_index = {name: idx for idx, name in enumerate(locations)}
+
+    scene_numbers = []
+    offsets = [0]
+    for day in days:
+        scene_numbers.extend(number for number in day['scenes'] if number in scenes)
+        offsets.append(len(scene_numbers))
+
+    scene_cast = np.zeros((len(scene_numbers), len(characters)), dtype=bool)
+    scene_location = np.zeros(len(scene_numbers), dtype=np.int32)
+    scene_hours = np.zeros(len(scene_numbers), dtype=np.float32)
+    for idx, number in enumerate(scene_numbers):
+        row = scenes[number]
+        for name in row['characters'] or []:
+            scene_cast[idx, character_index[name]] = True
+        scene_location[idx] = location_index[row['location']]
+        scene_hours[idx] = float(row['est_shoot_hours'])
+
+    day_cast = np.zeros((len(days), len(characters)), dtype=bool)
+    day_locations = np.zeros((len(days), len(locations)), dtype=bool)
+    day_hours = np.zeros(len(days), dtype=np.float32)
+    for day_index in range(len(days)):
+        start, end = offsets[day_index], offsets[day_index + 1]
+        if start == end:
+            continue
+        day_cast[day_index] = scene_cast[start:end].any(axis=0)
+        day_locations[day_index, scene_location[start:end]] = True
+        day_hours[day_index] = scene_hours[start:end].sum()
+
+    matrix, _ = ScheduleMatrix.objects.update_or_create(
+        schedule=schedule,
+        defaults={
+            'day_numbers': [day['day_number'] for day in days],
+            'day_dates': [day['date'].isoformat() if day['date'] else None for day in days],
+            'characters': characters,
+            'locations': locations,
+            'scene_numbers': np.array(scene_numbers, dtype=np.int32).tobytes(),
+            'day_offsets': np.array(offsets, dtype=np.int32).tobytes(),
+            'day_hours': day_hours.tobytes(),
+            'day_cast': _pack(day_cast),
+            'day_locations': _pack(day_locations),
+            'scene_cast': _pack(scene_cast),
+        }
+    )
+    return matrix
+
+
+def get_matrix(schedule):
+    """Stored matrix for a schedule, rebuilding it if it was invalidated"""
+    matrix = ScheduleMatrix.objects.filter(schedule=schedule).first()
+    return matrix or build_matrix(schedule)
+
+
+def _arrays(matrix):
+    days = len(matrix.day_numbers)
+    offsets = np.frombuffer(bytes(matrix.day_offsets), dtype=np.int32)
+    return {
+        'days': days,
+        'day_cast': _unpack(matrix.day_cast, days, len(matrix.characters)),
+        'day_locations': _unpack(matrix.day_locations, days, len(matrix.locations)),
+        'day_hours': np.frombuffer(bytes(matrix.day_hours), dtype=np.float32),
+        'scene_numbers': np.frombuffer(bytes(matrix.scene_numbers), dtype=np.int32),
+        'offsets': offsets,
+    }
+
+
+def day_out_of_days(matrix):
+    """
+    DOOD report: one row per character with a status code per shoot day.
+
+    Codes: SW start work, W work, WF work finish, SWF start-work-finish,
+    H hold (on the payroll between first and last work day), '' off.
+    """
+    arrays = _arrays(matrix)
+    day_cast = arrays['day_cast']
+    days = arrays['days']
+    day_range = np.arange(days)
+
+    rows = []
+    for idx, name in enumerate(matrix.characters):
+        working = day_cast[:, idx]
+        if not working.any():
+            continue
+        worked = np.flatnonzero(working)
+        first, last = int(worked[0]), int(worked[-1])
+
+        codes = np.full(days, '', dtype=object)
+        codes[(day_range >= first) & (day_range <= last)] = 'H'
+        codes[working] = 'W'
+        if first == last:
+            codes[first] = 'SWF'
+        else:
+            codes[first] = 'SW'
+            codes[last] = 'WF'
+
+        work_days = int(working.sum())
+        span = last - first + 1
+        rows.append({
+            'character': name,
+            'days': codes.tolist(),
+            'start_day': matrix.day_numbers[first],
+            'finish_day': matrix.day_numbers[last],
+            'work_days': work_days,
+            'hold_days': span - work_days,
+            'total_days': span,
+        })
+
+    rows.sort(key=lambda row: (-row['work_days'], row['character']))
+    return {
+        'day_numbers': matrix.day_numbers,
+        'dates': matrix.day_dates,
+        'cast': rows,
+    }
+
+
+def location_usage(matrix):
+    """Days, hours and first/last use per location"""
+    arrays = _arrays(matrix)
+    day_locations = arrays['day_locations']
+    day_hours = arrays['day_hours']
+    scenes_per_day = np.diff(arrays['offsets'])
+    locations_per_day = np.maximum(day_locations.sum(axis=1), 1)
+
+    rows = []
+    for idx, name in enumerate(matrix.locations):
+        used = np.flatnonzero(day_locations[:, idx])
+        if not used.size:
+            continue
+        rows.append({
+            'location': name,
+            'days': int(used.size),
+            'day_numbers': [matrix.day_numbers[day] for day in used],
+            'first_day': matrix.day_numbers[used[0]],
+            'last_day': matrix.day_numbers[used[-1]],
+            # Shared days are split evenly between their locations
+            'estimated_hours': round(float((day_hours[used] / locations_per_day[used]).sum()), 2),
+            'shared_days': int((locations_per_day[used] > 1).sum()),
+            'scene_count_on_days': int(scenes_per_day[used].sum()),
+        })
+    rows.sort(key=lambda row: row['first_day'])
+    return {'locations': rows}
+
+
+def cast_holds(matrix):
+    """
+    Hold days per character, with the longest run of consecutive holds
+    (the best candidate for a drop/pick-up deal).
+    """
+    day_cast = _arrays(matrix)['day_cast']
+
+    rows = []
+    for idx, name in enumerate(matrix.characters):
+        working = day_cast[:, idx]
+        worked = np.flatnonzero(working)
+        if worked.size < 2:
+            continue
+        gaps = np.diff(worked) - 1
+        hold_days = int(gaps.sum())
+        if not hold_days:
+            continue
+        longest = int(gaps.argmax())
+        rows.append({
+            'character': name,
+            'hold_days': hold_days,
+            'held_day_numbers': [
+                matrix.day_numbers[day]
+                for day in range(worked[0], worked[-1] + 1)
+                if not working[day]
+            ],
+            'longest_hold': int(gaps[longest]),
+            'longest_hold_after_day': matrix.day_numbers[worked[longest]],
+        })
+    rows.sort(key=lambda row: (-row['hold_days'], row['character']))
+    return {
+        'total_hold_days': sum(row['hold_days'] for row in rows),
+        'cast': rows,
+    }
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='scene_fingerprints',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0002_schedule_scene_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleMatrix',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_numbers', models.JSONField(default=list)),
+                ('day_dates', models.JSONField(default=list)),
+                ('characters', models.JSONField(default=list)),
+                ('locations', models.JSONField(default=list)),
+                ('scene_numbers', models.BinaryField()),
+                ('day_offsets', models.BinaryField()),
+                ('day_hours', models.BinaryField()),
+                ('day_cast', models.BinaryField()),
+                ('day_locations', models.BinaryField()),
+                ('scene_cast', models.BinaryField()),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('schedule', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='matrix', to='schedules.schedule')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0003_schedule_matrix'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='calendar',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -16,6 +16,8 @@ class Schedule(models.Model):
     version = models.IntegerField(default=1)
     total_days = models.IntegerField(default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+    scene_fingerprints = models.JSONField(default=dict, blank=True)  # Scene number -> hash of scheduling fields
+    calendar = models.JSONField(default=dict, blank=True)  # Start date, rest weekdays, turnaround, call time
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -45,4 +47,30 @@ class ShootDay(models.Model):
         unique_together = ['schedule', 'day_number']
     
     def __str__(self):
-        return f"Day {self.day_number}: {self.location}"
\ No newline at end of file
+        return f"Day {self.day_number}: {self.location}"
+
+
+class ScheduleMatrix(models.Model):
+    """
+    Precomputed day x scene x character incidence for a schedule version.
+
+    Arrays are stored as raw bytes: boolean matrices are bit-packed row by
+    row with numpy.packbits, scene numbers are int32 in CSR form (per-day
+    offsets into one flat array). Rebuilt on demand after ShootDay or Scene
+    changes (see schedules.signals).
+    """
+    schedule = models.OneToOneField(Schedule, on_delete=models.CASCADE, related_name='matrix')
+    day_numbers = models.JSONField(default=list)  # Shooting order
+    day_dates = models.JSONField(default=list)  # ISO dates or None, aligned with day_numbers
+    characters = models.JSONField(default=list)
+    locations = models.JSONField(default=list)
+    scene_numbers = models.BinaryField()  # int32, all days' scenes back to back
+    day_offsets = models.BinaryField()  # int32, len(days) + 1
+    day_hours = models.BinaryField()  # float32 per day
+    day_cast = models.BinaryField()  # Packed bool, days x characters
+    day_locations = models.BinaryField()  # Packed bool, days x locations
+    scene_cast = models.BinaryField()  # Packed bool, scenes (flat order) x characters
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Matrix for {self.schedule}"
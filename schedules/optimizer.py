@@ -0,0 +1,400 @@
+"""
+Shooting schedule optimizer.
+
+A schedule is searched for as an ordering of scenes. Each ordering is decoded
+into shoot days greedily: scenes are added to the current day until the hour
+cap is reached, a company move no longer fits, or the lighting changes (night
+work is never mixed with day work). Simulated annealing then searches over
+orderings to minimize a weighted cost of shoot days, company moves, cast days
+held, cast availability conflicts and exterior work left late in the shoot
+(when no interior cover days remain).
+
+This module has no Django dependencies so it can run in worker processes;
+schedules.services builds the problem from a project and saves the result.
+"""
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+MAX_DAY_HOURS = 10.0
+MOVE_HOURS = 1.0  # Time lost to a company move within a day when travel times are unknown
+
+# Cost weights
+DAY_WEIGHT = 100.0
+MOVE_WEIGHT = 25.0  # Company move within a day
+MOVE_HOUR_WEIGHT = 20.0  # Per hour of company-move time within a day
+RELOCATION_WEIGHT = 5.0  # Different location from the previous day
+CAST_DAY_WEIGHT = 10.0  # Every day a character is on the schedule, working or held
+UNAVAILABLE_WEIGHT = 1000.0  # Character scheduled on a day they are unavailable
+WEATHER_WEIGHT = 5.0  # Per exterior hour, scaled by how late in the shoot it falls
+
+NIGHT_LIGHTING = {'NIGHT'}
+
+DEFAULT_TIME_BUDGET = 10.0
+DEFAULT_SEEDS = 4
+ITERATIONS_PER_SCENE = 4000
+TIME_CHECK_INTERVAL = 200
+
+
+class SchedulingProblem:
+    """
+    Plain-data description of the scenes to schedule.
+
+    Args:
+        scenes: Iterable of dicts with 'number', 'location', 'hours', 'int_ext',
+            'day_night' and 'characters'
+        unavailable: Mapping of character name -> iterable of shoot day numbers
+            (1-based) on which the character cannot work
+        max_day_hours: Hour cap per shoot day
+        move_hours: Hours lost to each company move within a day when no
+            travel time is known
+        travel_hours: Optional mapping of location -> {location: hours} with
+            company-move times (see breakdown.geo.travel_hours)
+    """
+
+    def __init__(self, scenes, unavailable=None, max_day_hours=MAX_DAY_HOURS, move_hours=MOVE_HOURS,
+                 travel_hours=None):
+        scenes = list(scenes)
+        unavailable = unavailable or {}
+        characters = sorted({name for scene in scenes for name in scene['characters']} | set(unavailable))
+        character_index = {name: idx for idx, name in enumerate(characters)}
+        locations = sorted({scene['location'] for scene in scenes})
+        location_index = {name: idx for idx, name in enumerate(locations)}
+
+        self.numbers = [scene['number'] for scene in scenes]
+        self.hours = [float(scene['hours']) for scene in scenes]
+        self.locations = locations
+        self.location = [location_index[scene['location']] for scene in scenes]
+        self.night = [scene['day_night'] in NIGHT_LIGHTING for scene in scenes]
+        self.exterior = [scene['int_ext'] == 'EXT' for scene in scenes]
+        self.characters = characters
+        self.cast = [
+            sum(1 << character_index[name] for name in set(scene['characters']))
+            for scene in scenes
+        ]
+
+        # Day number -> bitmask of characters unavailable that day
+        self.unavailable = {}
+        for name, days in unavailable.items():
+            for day in days:
+                self.unavailable[int(day)] = self.unavailable.get(int(day), 0) | (1 << character_index[name])
+
+        self.max_day_hours = float(max_day_hours)
+        self.move_hours = float(move_hours)
+
+        # Location x location company-move hours, looked up on every decode
+        travel_hours = travel_hours or {}
+        self.move = [
+            [
+                0.0 if origin == destination
+                else float(travel_hours.get(origin, {}).get(destination, self.move_hours))
+                for destination in locations
+            ]
+            for origin in locations
+        ]
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def initial_order(self):
+        """Scenes clustered by lighting and location, exteriors first, in script order"""
+        first_seen = {}
+        for idx in range(len(self)):
+            first_seen.setdefault(self.location[idx], idx)
+        return sorted(
+            range(len(self)),
+            key=lambda idx: (
+                self.night[idx],
+                not self.exterior[idx],
+                first_seen[self.location[idx]],
+                self.numbers[idx],
+            )
+        )
+
+
+def decode(problem, order):
+    """
+    Split an ordering of scene indexes into days.
+
+    Returns:
+        List of days, each a list of scene indexes
+    """
+    days = []
+    current = []
+    hours = 0.0
+    for idx in order:
+        scene_hours = problem.hours[idx]
+        if current:
+            last = current[-1]
+            needed = scene_hours + problem.move[problem.location[last]][problem.location[idx]]
+            if problem.night[idx] != problem.night[last] or hours + needed > problem.max_day_hours:
+                days.append(current)
+                current = []
+                hours = 0.0
+            else:
+                scene_hours = needed
+        current.append(idx)
+        hours += scene_hours
+    if current:
+        days.append(current)
+    return days
+
+
+def day_fits(problem, day):
+    """Whether a day of scene indexes respects the lighting rule and the hour cap"""
+    if len(day) < 2:
+        return True
+    hours = problem.hours[day[0]]
+    for previous, idx in zip(day, day[1:]):
+        if problem.night[idx] != problem.night[day[0]]:
+            return False
+        hours += problem.hours[idx] + problem.move[problem.location[previous]][problem.location[idx]]
+    return hours <= problem.max_day_hours
+
+
+def evaluate(problem, order):
+    """
+    Cost of an ordering and its breakdown.
+
+    Returns:
+        (cost, metrics) where metrics holds days, moves, relocations,
+        cast_days, held_days, conflicts and weather
+    """
+    return score_days(problem, decode(problem, order))
+
+
+def score_days(problem, days):
+    """Cost and metrics of an explicit list of days; see evaluate()"""
+    days = [day for day in days if day]
+    moves = 0
+    move_hours = 0.0
+    relocations = 0
+    conflicts = 0
+    weather = 0.0
+    first_day = {}
+    last_day = {}
+    work_days = 0
+    previous_location = None
+
+    for day_index, day in enumerate(days):
+        cast = 0
+        location = None
+        for idx in day:
+            if location is not None and problem.location[idx] != location:
+                moves += 1
+                move_hours += problem.move[location][problem.location[idx]]
+            location = problem.location[idx]
+            cast |= problem.cast[idx]
+            if problem.exterior[idx]:
+                weather += problem.hours[idx] * day_index
+
+        if previous_location is not None and problem.location[day[0]] != previous_location:
+            relocations += 1
+        previous_location = location
+
+        blocked = problem.unavailable.get(day_index + 1)
+        if blocked:
+            conflicts += bin(cast & blocked).count('1')
+
+        while cast:
+            bit = cast & -cast
+            cast ^= bit
+            first_day.setdefault(bit, day_index)
+            last_day[bit] = day_index
+            work_days += 1
+
+    total_days = len(days)
+    cast_days = sum(last_day[bit] - first_day[bit] + 1 for bit in first_day)
+    weather = weather / max(total_days - 1, 1)
+
+    cost = (
+        DAY_WEIGHT * total_days
+        + MOVE_WEIGHT * moves
+        + MOVE_HOUR_WEIGHT * move_hours
+        + RELOCATION_WEIGHT * relocations
+        + CAST_DAY_WEIGHT * cast_days
+        + UNAVAILABLE_WEIGHT * conflicts
+        + WEATHER_WEIGHT * weather
+    )
+    metrics = {
+        'days': total_days,
+        'moves': moves,
+        'move_hours': round(move_hours, 2),
+        'relocations': relocations,
+        'cast_days': cast_days,
+        'held_days': cast_days - work_days,
+        'conflicts': conflicts,
+        'weather': round(weather, 2),
+    }
+    return cost, metrics
+
+
+def _neighbour(order, rng):
+    """Random swap, insertion, reversal or block move"""
+    n = len(order)
+    i, j = sorted(rng.sample(range(n), 2))
+    candidate = list(order)
+    move = rng.random()
+    if move < 0.25:
+        candidate[i], candidate[j] = candidate[j], candidate[i]
+    elif move < 0.55:
+        scene = candidate.pop(i if rng.random() < 0.5 else j)
+        candidate.insert(rng.randrange(n), scene)
+    elif move < 0.75:
+        candidate[i:j + 1] = reversed(candidate[i:j + 1])
+    else:
+        block = candidate[i:j + 1]
+        del candidate[i:j + 1]
+        position = rng.randrange(len(candidate) + 1)
+        candidate[position:position] = block
+    return candidate
+
+
+def anneal(problem, seed, time_budget, max_iterations=None):
+    """
+    Simulated annealing from the clustered initial order.
+
+    Returns:
+        (cost, order, metrics, iterations) for the best ordering found
+    """
+    rng = random.Random(seed)
+    order = problem.initial_order()
+    if seed:
+        # Other seeds start from a perturbed order to spread the search
+        for _ in range(len(order) // 4):
+            if len(order) > 1:
+                order = _neighbour(order, rng)
+    cost, metrics = evaluate(problem, order)
+    best = (cost, order, metrics)
+    if len(problem) < 2:
+        return cost, order, metrics, 0
+
+    # Start hot enough to accept a typical uphill move about half the time
+    samples = [abs(evaluate(problem, _neighbour(order, rng))[0] - cost) for _ in range(20)]
+    start_temperature = max(sum(samples) / len(samples) / math.log(2), 1.0)
+    end_temperature = 0.5
+
+    max_iterations = max_iterations or ITERATIONS_PER_SCENE * len(problem)
+    deadline = time.monotonic() + time_budget
+    started = time.monotonic()
+    temperature = start_temperature
+    iteration = 0
+
+    while iteration < max_iterations:
+        iteration += 1
+        if iteration % TIME_CHECK_INTERVAL == 0:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            progress = max((now - started) / time_budget, iteration / max_iterations)
+            temperature = start_temperature * (end_temperature / start_temperature) ** progress
+
+        candidate = _neighbour(order, rng)
+        candidate_cost, candidate_metrics = evaluate(problem, candidate)
+        delta = candidate_cost - cost
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            order, cost, metrics = candidate, candidate_cost, candidate_metrics
+            if cost < best[0]:
+                best = (cost, order, metrics)
+
+    return best[0], best[1], best[2], iteration
+
+
+def repair(problem, days, locked, scenes):
+    """
+    Insert scenes into a partially fixed schedule by cheapest insertion.
+
+    Locked days are never touched. Each scene goes to the position with the
+    lowest total cost among the feasible slots of unlocked days and a new day
+    at any point in the sequence. Longer scenes are placed first.
+
+    Args:
+        problem: SchedulingProblem
+        days: Lists of scene indexes, in shooting order
+        locked: Booleans aligned with ``days``
+        scenes: Scene indexes to place
+
+    Returns:
+        List of (source, day) pairs in shooting order, where source is the
+        position of the day in ``days`` or None for a new day. Emptied
+        unlocked days are dropped.
+    """
+    plan = [(position, list(day), is_locked) for position, (day, is_locked) in enumerate(zip(days, locked))]
+
+    for scene in sorted(scenes, key=lambda idx: -problem.hours[idx]):
+        current = [day for _, day, _ in plan]
+        best_cost = None
+        best_move = None
+
+        for slot, (_, day, is_locked) in enumerate(plan):
+            if is_locked:
+                continue
+            for position in range(len(day) + 1):
+                candidate = day[:position] + [scene] + day[position:]
+                if not day_fits(problem, candidate):
+                    continue
+                cost = score_days(problem, current[:slot] + [candidate] + current[slot + 1:])[0]
+                if best_cost is None or cost < best_cost:
+                    best_cost, best_move = cost, ('into', slot, position)
+
+        for slot in range(len(plan) + 1):
+            cost = score_days(problem, current[:slot] + [[scene]] + current[slot:])[0]
+            if best_cost is None or cost < best_cost:
+                best_cost, best_move = cost, ('new', slot, None)
+
+        kind, slot, position = best_move
+        if kind == 'into':
+            plan[slot][1].insert(position, scene)
+        else:
+            plan.insert(slot, (None, [scene], False))
+
+    return [(source, day) for source, day, is_locked in plan if day or is_locked]
+
+
+def _run_seed(args):
+    problem, seed, time_budget, max_iterations = args
+    return anneal(problem, seed, time_budget, max_iterations=max_iterations)
+
+
+def optimize(problem, time_budget=DEFAULT_TIME_BUDGET, seeds=DEFAULT_SEEDS, workers=None, max_iterations=None):
+    """
+    Run several annealing seeds in a process pool and keep the best schedule.
+
+    Args:
+        problem: SchedulingProblem
+        time_budget: Wall-clock seconds each seed may use
+        seeds: Number of independent runs
+        workers: Pool size; defaults to min(seeds, CPU count). 1 runs inline.
+        max_iterations: Cap on annealing steps per seed (for reproducible runs)
+
+    Returns:
+        Dict with 'days' (lists of scene numbers), 'cost', 'metrics',
+        'baseline' metrics for the initial clustered order, and 'seeds'
+    """
+    baseline_cost, baseline_metrics = evaluate(problem, problem.initial_order())
+    workers = workers or min(seeds, os.cpu_count() or 1)
+    tasks = [(problem, seed, time_budget, max_iterations) for seed in range(seeds)]
+
+    if workers > 1 and seeds > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_seed, tasks))
+    else:
+        # Share the budget between seeds when running in this process
+        tasks = [(problem, seed, time_budget / seeds, max_iterations) for seed in range(seeds)]
+        results = [_run_seed(task) for task in tasks]
+
+    cost, order, metrics, _ = min(results, key=lambda result: result[0])
+    if baseline_cost <= cost:
+        order, cost, metrics = problem.initial_order(), baseline_cost, baseline_metrics
+
+    return {
+        'days': [[problem.numbers[idx] for idx in day] for day in decode(problem, order)],
+        'cost': round(cost, 2),
+        'metrics': metrics,
+        'baseline': baseline_metrics,
+        'seeds': seeds,
+        'iterations': sum(result[3] for result in results),
+    }
@@ -0,0 +1,253 @@
+"""
+Schedule generation on top of the optimizer
+"""
+import hashlib
+import json
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Max
+
+from breakdown.geo import travel_hours
+from schedules import optimizer
+from schedules.matrix import build_matrix
+from schedules.shoot_calendar import DEFAULT_CALL_TIME, reflow_from
+from schedules.models import Schedule, ShootDay
+
+
+# Scene fields that affect where a scene can go in the schedule
+SCHEDULING_FIELDS = ['location', 'est_shoot_hours', 'int_ext', 'day_night', 'characters']
+
+
+def _scene_rows(project):
+    return list(project.breakdown.scenes.order_by('number').values('number', *SCHEDULING_FIELDS))
+
+
+def _fingerprint(row):
+    payload = {field: row[field] for field in SCHEDULING_FIELDS}
+    payload['est_shoot_hours'] = str(payload['est_shoot_hours'])
+    payload['characters'] = sorted(payload['characters'] or [])
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def scene_fingerprints(rows):
+    """Scene number (as a string, for JSON) -> fingerprint of its scheduling fields"""
+    return {str(row['number']): _fingerprint(row) for row in rows}
+
+
+def build_problem(project, max_day_hours=optimizer.MAX_DAY_HOURS, rows=None):
+    """
+    Load a project's breakdown into a SchedulingProblem.
+    Cast availability comes from Character.meta['unavailable_days'] (shoot day numbers);
+    company-move times come from the breakdown's cached location distance matrix.
+    """
+    rows = _scene_rows(project) if rows is None else rows
+    scenes = [
+        {
+            'number': row['number'],
+            'location': row['location'],
+            'hours': row['est_shoot_hours'],
+            'int_ext': row['int_ext'],
+            'day_night': row['day_night'],
+            'characters': row['characters'] or [],
+        }
+        for row in rows
+    ]
+    unavailable = {}
+    for name, meta in project.breakdown.characters.values_list('name', 'meta'):
+        days = (meta or {}).get('unavailable_days')
+        if days:
+            unavailable[name] = days
+    return optimizer.SchedulingProblem(
+        scenes,
+        unavailable=unavailable,
+        max_day_hours=max_day_hours,
+        travel_hours=travel_hours(project.breakdown, {scene['location'] for scene in scenes})
+    )
+
+
+def _day_fields(problem, scene_numbers):
+    """Location label and notes for a decoded day"""
+    index = {number: idx for idx, number in enumerate(problem.numbers)}
+    hours = Counter()
+    order = []
+    for number in scene_numbers:
+        location = problem.locations[problem.location[index[number]]]
+        if location not in hours:
+            order.append(location)
+        hours[location] += problem.hours[index[number]]
+
+    lighting = 'Night' if problem.night[index[scene_numbers[0]]] else 'Day'
+    notes = f"Scenes {', '.join(str(number) for number in scene_numbers)} ({lighting})"
+    if len(order) > 1:
+        notes += f"; {len(order) - 1} company move{'s' if len(order) > 2 else ''}"
+    return ' / '.join(order)[:200], notes
+
+
+@transaction.atomic
+def save_schedule(project, days, problem, created_by=None, fingerprints=None, sources=None, calendar=None):
+    """
+    Create the next Schedule version from days of scene numbers.
+
+    Args:
+        sources: Optional list aligned with ``days`` of (ShootDay, pinned) pairs
+            or None. Pinned days are copied as they were; other days keep the
+            source's date and call/wrap times but get fresh location and notes.
+    """
+    latest = Schedule.objects.filter(project=project).aggregate(Max('version'))['version__max'] or 0
+    schedule = Schedule.objects.create(
+        project=project,
+        version=latest + 1,
+        total_days=len(days),
+        scene_fingerprints=fingerprints or {},
+        calendar=calendar or {},
+        created_by=created_by
+    )
+    sources = sources or [None] * len(days)
+
+    shoot_days = []
+    for idx, (scene_numbers, source) in enumerate(zip(days, sources)):
+        source_day, pinned = source or (None, False)
+        if pinned:
+            location, notes = source_day.location, source_day.notes
+        else:
+            location, notes = _day_fields(problem, scene_numbers)
+        shoot_days.append(ShootDay(
+            schedule=schedule,
+            day_number=idx + 1,
+            date=source_day.date if source_day else None,
+            location=location,
+            scenes=scene_numbers,
+            call_time=source_day.call_time if source_day else DEFAULT_CALL_TIME,
+            wrap_time=source_day.wrap_time if source_day else None,
+            notes=notes,
+            order_index=idx
+        ))
+    ShootDay.objects.bulk_create(shoot_days)
+    build_matrix(schedule)
+    return schedule
+
+
+def generate_schedule(project, time_budget=optimizer.DEFAULT_TIME_BUDGET, seeds=optimizer.DEFAULT_SEEDS,
+                      max_day_hours=optimizer.MAX_DAY_HOURS, created_by=None):
+    """
+    Optimize a project's breakdown into a new schedule version.
+
+    Returns:
+        (schedule, result) where result is the optimizer output
+    """
+    rows = _scene_rows(project)
+    problem = build_problem(project, max_day_hours=max_day_hours, rows=rows)
+    if not len(problem):
+        raise ValueError("The breakdown has no scenes to schedule")
+    result = optimizer.optimize(problem, time_budget=time_budget, seeds=seeds)
+    schedule = save_schedule(
+        project, result['days'], problem,
+        created_by=created_by,
+        fingerprints=scene_fingerprints(rows)
+    )
+    return schedule, result
+
+
+def reschedule(project, schedule=None, max_day_hours=optimizer.MAX_DAY_HOURS, created_by=None):
+    """
+    Repair an existing schedule after breakdown changes instead of starting over.
+
+    Scenes are compared with the fingerprints stored on the schedule; a scene
+    without a stored fingerprint counts as changed. Removed scenes are dropped from their days. Changed scenes stay where they are
+    while their day is still feasible, and are otherwise moved out. New and
+    moved-out scenes are inserted by cheapest insertion into the touched days
+    or into new days. Untouched days are pinned and copied as they are,
+    keeping their manual order, dates and notes.
+
+    Returns:
+        (schedule, result). The schedule is the current one when nothing
+        changed, otherwise a new version (generated from scratch when the
+        project has no schedule yet). The result summarises the repair.
+    """
+    schedule = schedule or Schedule.objects.filter(project=project).order_by('-version').first()
+    if schedule is None:
+        schedule, result = generate_schedule(project, max_day_hours=max_day_hours, created_by=created_by)
+        return schedule, {'unchanged': False, 'generated': True, 'metrics': result['metrics']}
+
+    rows = _scene_rows(project)
+    fingerprints = scene_fingerprints(rows)
+    previous = schedule.scene_fingerprints or {}
+    problem = build_problem(project, max_day_hours=max_day_hours, rows=rows)
+    index = {number: idx for idx, number in enumerate(problem.numbers)}
+
+    old_days = list(schedule.shoot_days.order_by('order_index', 'day_number'))
+    scheduled = set()
+    days = []
+    locked = []
+    to_place = []
+    changed = set()
+    removed = set()
+
+    for shoot_day in old_days:
+        day = []
+        touched = False
+        for number in shoot_day.scenes:
+            key = str(number)
+            if number not in index or number in scheduled:
+                # Scene gone from the breakdown (or listed twice)
+                removed.add(number)
+                touched = True
+                continue
+            scheduled.add(number)
+            day.append(index[number])
+            # Schedules saved before fingerprints were stored have none: treat every scene as changed
+            if previous.get(key) != fingerprints[key]:
+                changed.add(number)
+                touched = True
+
+        if touched:
+            while not optimizer.day_fits(problem, day):
+                victim = next((idx for idx in reversed(day) if problem.numbers[idx] in changed), day[-1])
+                day.remove(victim)
+                to_place.append(victim)
+        days.append(day)
+        locked.append(not touched)
+
+    added = [idx for number, idx in index.items() if number not in scheduled]
+    to_place.extend(added)
+    removed -= scheduled
+
+    if not (changed or removed or to_place):
+        return schedule, {'unchanged': True, 'days_pinned': len(old_days), 'days_repaired': 0}
+
+    plan = optimizer.repair(problem, days, locked, to_place)
+    new_days = [[problem.numbers[idx] for idx in day] for _, day in plan]
+    sources = [
+        (old_days[source], locked[source]) if source is not None else None
+        for source, _ in plan
+    ]
+    new_schedule = save_schedule(
+        project, new_days, problem,
+        created_by=created_by,
+        fingerprints=fingerprints,
+        sources=sources,
+        calendar=schedule.calendar
+    )
+
+    # Re-date from the first repaired day; pinned days before it keep their dates
+    first_repaired = next(
+        (idx + 1 for idx, (source, _) in enumerate(plan) if source is None or not locked[source]),
+        None
+    )
+    if first_repaired is not None:
+        reflow_from(new_schedule, first_repaired)
+
+    cost, metrics = optimizer.score_days(problem, [day for _, day in plan])
+    pinned = sum(1 for source, _ in plan if source is not None and locked[source])
+    return new_schedule, {
+        'unchanged': False,
+        'scenes_added': len(added),
+        'scenes_changed': len(changed),
+        'scenes_removed': len(removed),
+        'scenes_moved': len(to_place) - len(added),
+        'days_pinned': pinned,
+        'days_repaired': len(plan) - pinned,
+        'cost': round(cost, 2),
+        'metrics': metrics,
+    }
@@ -0,0 +1,263 @@
+"""
+Calendar engine: real dates and call/wrap times for shoot days.
+
+Days are laid out in shooting order from a start date, skipping weekly rest
+days and local holidays (settings.HOLIDAYS_FILE). Each day's length comes
+from its scenes plus company-move travel times and a meal break. Night days get a late
+call. The next call is pushed back until the crew has had the minimum
+turnaround since the previous wrap.
+"""
+import csv
+import datetime
+import math
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from breakdown.geo import travel_hours
+from breakdown.models import ScriptBreakdown
+from schedules.models import ScheduleMatrix, ShootDay
+from schedules.optimizer import MOVE_HOURS, NIGHT_LIGHTING
+
+
+DEFAULT_CALL_TIME = datetime.time(hour=8, minute=0)
+NIGHT_CALL_TIME = datetime.time(hour=18, minute=0)
+DEFAULT_REST_WEEKDAYS = [5, 6]  # Saturday, Sunday
+DEFAULT_TURNAROUND_HOURS = 12
+MEAL_BREAK_HOURS = 1.0
+WRAP_ROUNDING_MINUTES = 5
+
+_lock = threading.Lock()
+_holidays = None
+
+
+def load_holidays():
+    """Holiday dates from settings.HOLIDAYS_FILE, cached per process"""
+    global _holidays
+    if _holidays is None:
+        with _lock:
+            if _holidays is None:
+                holidays = set()
+                path = getattr(settings, 'HOLIDAYS_FILE', None)
+                if path:
+                    try:
+                        with open(path, newline='', encoding='utf-8') as handle:
+                            for row in csv.DictReader(handle):
+                                if row.get('date'):
+                                    holidays.add(datetime.date.fromisoformat(row['date'].strip()))
+                    except FileNotFoundError:
+                        pass
+                _holidays = frozenset(holidays)
+    return _holidays
+
+
+def clear_cache():
+    global _holidays
+    with _lock:
+        _holidays = None
+
+
+class CalendarSettings:
+    """Calendar options, stored on Schedule.calendar so later reflows reuse them"""
+
+    def __init__(self, start_date=None, rest_weekdays=None, turnaround_hours=DEFAULT_TURNAROUND_HOURS,
+                 call_time=DEFAULT_CALL_TIME, holidays=None):
+        self.start_date = start_date
+        self.rest_weekdays = set(DEFAULT_REST_WEEKDAYS if rest_weekdays is None else rest_weekdays)
+        self.turnaround = datetime.timedelta(hours=float(turnaround_hours))
+        self.call_time = call_time
+        self.holidays = load_holidays() if holidays is None else frozenset(holidays)
+
+    @classmethod
+    def from_schedule(cls, schedule, **overrides):
+        stored = dict(schedule.calendar or {})
+        stored.update({key: value for key, value in overrides.items() if value is not None})
+        start_date = stored.get('start_date')
+        call_time = stored.get('call_time')
+        return cls(
+            start_date=datetime.date.fromisoformat(start_date) if isinstance(start_date, str) else start_date,
+            rest_weekdays=stored.get('rest_weekdays'),
+            turnaround_hours=stored.get('turnaround_hours', DEFAULT_TURNAROUND_HOURS),
+            call_time=datetime.time.fromisoformat(call_time) if isinstance(call_time, str) else (call_time or DEFAULT_CALL_TIME),
+        )
+
+    def as_json(self):
+        return {
+            'start_date': self.start_date.isoformat() if self.start_date else None,
+            'rest_weekdays': sorted(self.rest_weekdays),
+            'turnaround_hours': self.turnaround.total_seconds() / 3600,
+            'call_time': self.call_time.strftime('%H:%M'),
+        }
+
+    def is_working(self, date):
+        return date.weekday() not in self.rest_weekdays and date not in self.holidays
+
+    def next_working(self, date):
+        """First working date on or after ``date``"""
+        for _ in range(366):
+            if self.is_working(date):
+                return date
+            date += datetime.timedelta(days=1)
+        raise ValueError("No working days within a year; check rest days and holidays")
+
+
+def _day_profiles(schedule, days):
+    """(hours, night) for each day, from one query over the breakdown's scenes"""
+    try:
+        scenes = {
+            row['number']: row
+            for row in schedule.project.breakdown.scenes.values('number', 'day_night', 'est_shoot_hours', 'location')
+        }
+    except ScriptBreakdown.DoesNotExist:
+        scenes = {}
+
+    moves = travel_hours(schedule.project.breakdown) if scenes else {}
+
+    profiles = []
+    for day in days:
+        rows = [scenes[number] for number in day.scenes if number in scenes]
+        hours = sum(float(row['est_shoot_hours']) for row in rows) + MEAL_BREAK_HOURS
+        for previous, row in zip(rows, rows[1:]):
+            if row['location'] != previous['location']:
+                hours += moves.get(previous['location'], {}).get(row['location'], MOVE_HOURS)
+        night = bool(rows) and rows[0]['day_night'] in NIGHT_LIGHTING
+        profiles.append((hours, night))
+    return profiles
+
+
+def plan_days(profiles, calendar, first_date, previous_wrap=None):
+    """
+    Lay out consecutive shoot days.
+
+    Args:
+        profiles: (hours, night) per day in shooting order
+        calendar: CalendarSettings
+        first_date: Earliest date for the first day (moved to a working day)
+        previous_wrap: Wrap datetime of the day before the first one, if any
+
+    Returns:
+        List of (date, call datetime, wrap datetime)
+    """
+    plan = []
+    date = first_date
+    for hours, night in profiles:
+        date = calendar.next_working(date)
+        call = datetime.datetime.combine(date, NIGHT_CALL_TIME if night else calendar.call_time)
+        if previous_wrap is not None and call < previous_wrap + calendar.turnaround:
+            call = previous_wrap + calendar.turnaround
+            date = call.date()
+            if not calendar.is_working(date):
+                # Turnaround pushed the call into a rest day: start the next working morning
+                date = calendar.next_working(date)
+                call = max(datetime.datetime.combine(date, calendar.call_time), call)
+        wrap = call + datetime.timedelta(minutes=math.ceil(hours * 60 / WRAP_ROUNDING_MINUTES) * WRAP_ROUNDING_MINUTES)
+        plan.append((date, call, wrap))
+        previous_wrap = wrap
+        date = date + datetime.timedelta(days=1)
+    return plan
+
+
+def _ordered_days(schedule):
+    return list(schedule.shoot_days.order_by('order_index', 'day_number'))
+
+
+@transaction.atomic
+def _write(schedule, days, plan):
+    for day, (date, call, wrap) in zip(days, plan):
+        day.date = date
+        day.call_time = call.time()
+        day.wrap_time = wrap.time()
+    ShootDay.objects.bulk_update(days, ['date', 'call_time', 'wrap_time'])
+    # bulk_update skips signals; the matrix carries day dates
+    ScheduleMatrix.objects.filter(schedule=schedule).delete()
+
+
+def _check_editable(schedule):
+    if schedule.status == 'locked':
+        raise ValueError("Locked schedules cannot be re-dated")
+
+
+def assign_dates(schedule, start_date, **options):
+    """
+    Date the whole schedule in one pass from ``start_date``.
+
+    Options: rest_weekdays, turnaround_hours, call_time (see CalendarSettings).
+
+    Returns:
+        Number of days dated
+    """
+    _check_editable(schedule)
+    calendar = CalendarSettings.from_schedule(schedule, start_date=start_date, **options)
+    days = _ordered_days(schedule)
+    if days:
+        plan = plan_days(_day_profiles(schedule, days), calendar, calendar.start_date)
+        _write(schedule, days, plan)
+    schedule.calendar = calendar.as_json()
+    schedule.save(update_fields=['calendar'])
+    return len(days)
+
+
+def _previous_wrap(day, calendar):
+    if day.wrap_time is None:
+        return None
+    wrap = datetime.datetime.combine(day.date, day.wrap_time)
+    if day.wrap_time < (day.call_time or calendar.call_time):
+        wrap += datetime.timedelta(days=1)  # Wrapped after midnight
+    return wrap
+
+
+def _reflow(schedule, calendar, days, position, first_date):
+    previous_wrap = None
+    if position > 0:
+        previous = days[position - 1]
+        if previous.date is None:
+            raise ValueError("Assign dates to the schedule before moving a day")
+        if first_date <= previous.date:
+            raise ValueError(
+                f"Day {days[position].day_number} must stay after day {previous.day_number} ({previous.date})"
+            )
+        previous_wrap = _previous_wrap(previous, calendar)
+
+    downstream = days[position:]
+    plan = plan_days(_day_profiles(schedule, downstream), calendar, first_date, previous_wrap=previous_wrap)
+    _write(schedule, downstream, plan)
+    return len(downstream)
+
+
+def move_day(schedule, day_number, new_date):
+    """
+    Move one shoot day to ``new_date`` and reflow only the days after it.
+    Earlier days keep their dates and times. A rest day or holiday moves to
+    the next working day.
+
+    Returns:
+        Number of days re-dated (the moved day and everything downstream)
+    """
+    _check_editable(schedule)
+    calendar = CalendarSettings.from_schedule(schedule)
+    days = _ordered_days(schedule)
+    position = next((idx for idx, day in enumerate(days) if day.day_number == day_number), None)
+    if position is None:
+        raise ValueError(f"Day {day_number} is not in this schedule")
+    return _reflow(schedule, calendar, days, position, new_date)
+
+
+def reflow_from(schedule, day_number):
+    """
+    Re-date ``day_number`` and everything after it, starting the day after
+    the previous shoot day (or the calendar's start date for the first day).
+    Used after incremental rescheduling inserts or removes days.
+    """
+    calendar = CalendarSettings.from_schedule(schedule)
+    if calendar.start_date is None:
+        return 0
+    days = _ordered_days(schedule)
+    position = next((idx for idx, day in enumerate(days) if day.day_number == day_number), None)
+    if position is None:
+        return 0
+    if position == 0:
+        first_date = calendar.start_date
+    else:
+        first_date = days[position - 1].date + datetime.timedelta(days=1)
+    return _reflow(schedule, calendar, days, position, first_date)
@@ -0,0 +1,25 @@
+"""
+Keep precomputed schedule matrices in step with their source rows.
+Stale matrices are dropped here and rebuilt on next read (schedules.matrix.get_matrix).
+Scene edits only reach the latest schedule version, unless it is locked;
+earlier versions keep the matrix built from the scenes they were saved with.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from breakdown.models import Scene
+from schedules.models import Schedule, ScheduleMatrix, ShootDay
+
+
+@receiver([post_save, post_delete], sender=ShootDay)
+def invalidate_schedule_matrix(sender, instance, **kwargs):
+    ScheduleMatrix.objects.filter(schedule_id=instance.schedule_id).delete()
+
+
+@receiver([post_save, post_delete], sender=Scene)
+def invalidate_project_matrices(sender, instance, **kwargs):
+    latest = Schedule.objects.filter(
+        project__breakdown__id=instance.breakdown_id
+    ).order_by('-version').values('id', 'status').first()
+    if latest and latest['status'] != 'locked':
+        ScheduleMatrix.objects.filter(schedule_id=latest['id']).delete()
@@ -0,0 +1,201 @@
+import datetime
+import os
+import random
+import tempfile
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from accounts.models import Company
+from breakdown.models import Scene, ScriptBreakdown
+from projects.models import Project
+from schedules import optimizer, shoot_calendar
+from schedules.models import ScheduleMatrix
+from schedules.services import generate_schedule, reschedule
+
+
+class ScheduleTestCase(TestCase):
+
+    # (location, hours, int_ext, day_night, characters)
+    SCENES = [
+        ('Diner', 2, 'INT', 'DAY', ['ANNA', 'BEN']),
+        ('Diner', 3, 'INT', 'DAY', ['ANNA']),
+        ('Street', 2, 'EXT', 'NIGHT', ['BEN']),
+        ('Street', 4, 'EXT', 'NIGHT', ['ANNA', 'BEN']),
+        ('Office', 5, 'INT', 'DAY', ['CARL']),
+        ('Office', 3, 'INT', 'DAY', ['CARL', 'ANNA']),
+        ('Roof', 2, 'EXT', 'NIGHT', ['CARL']),
+        ('Diner', 4, 'INT', 'DAY', ['BEN']),
+    ]
+
+    def setUp(self):
+        company = Company.objects.create(name='Studio')
+        self.project = Project.objects.create(company=company, name='Feature')
+        self.breakdown = ScriptBreakdown.objects.create(project=self.project)
+        Scene.objects.bulk_create([
+            Scene(breakdown=self.breakdown, number=number, slug=location, header=location, location=location,
+                  est_shoot_hours=Decimal(hours), int_ext=int_ext, day_night=day_night, characters=characters)
+            for number, (location, hours, int_ext, day_night, characters) in enumerate(self.SCENES, start=1)
+        ])
+
+
+class RescheduleTests(ScheduleTestCase):
+
+    def test_schedule_without_fingerprints_repairs_edited_scenes(self):
+        schedule, _ = generate_schedule(self.project, time_budget=0.5, seeds=1)
+        schedule.scene_fingerprints = {}  # Saved before fingerprints were stored
+        schedule.save()
+        Scene.objects.filter(breakdown=self.breakdown, number=1).update(est_shoot_hours=Decimal('9'))
+
+        new_schedule, result = reschedule(self.project)
+
+        self.assertFalse(result['unchanged'])
+        self.assertEqual(result['scenes_changed'], len(self.SCENES))
+        self.assertEqual(result['days_pinned'], 0)
+        self.assertEqual(new_schedule.version, schedule.version + 1)
+        self.assertTrue(new_schedule.scene_fingerprints)
+
+
+class MatrixInvalidationTests(ScheduleTestCase):
+
+    def _edit_scene(self):
+        scene = Scene.objects.get(breakdown=self.breakdown, number=1)
+        scene.characters = ['ANNA', 'BEN', 'DORA']
+        scene.save()
+
+    def test_scene_edit_only_drops_the_latest_matrix(self):
+        first, _ = generate_schedule(self.project, time_budget=0.2, seeds=1)
+        second, _ = generate_schedule(self.project, time_budget=0.2, seeds=1)
+
+        self._edit_scene()
+
+        self.assertTrue(ScheduleMatrix.objects.filter(schedule=first).exists())
+        self.assertFalse(ScheduleMatrix.objects.filter(schedule=second).exists())
+
+    def test_locked_latest_matrix_is_kept(self):
+        schedule, _ = generate_schedule(self.project, time_budget=0.2, seeds=1)
+        schedule.status = 'locked'
+        schedule.save()
+
+        self._edit_scene()
+
+        self.assertTrue(ScheduleMatrix.objects.filter(schedule=schedule).exists())
+
+
+def make_problem(count=30, seed=7, **options):
+    rng = random.Random(seed)
+    scenes = [
+        {
+            'number': number,
+            'location': rng.choice(['Diner', 'Street', 'Office', 'Roof', 'Harbour']),
+            'hours': rng.choice([0.5, 1, 2, 3, 4]),
+            'int_ext': rng.choice(['INT', 'EXT']),
+            'day_night': rng.choice(['DAY', 'DAY', 'NIGHT']),
+            'characters': rng.sample(['ANNA', 'BEN', 'CARL', 'DORA', 'EVE'], rng.randint(1, 3)),
+        }
+        for number in range(1, count + 1)
+    ]
+    return optimizer.SchedulingProblem(scenes, **options)
+
+
+class OptimizerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.problem = make_problem(unavailable={'ANNA': [2]}, max_day_hours=8)
+        self.result = optimizer.optimize(self.problem, time_budget=30, seeds=2, workers=1, max_iterations=300)
+        position = {number: idx for idx, number in enumerate(self.problem.numbers)}
+        self.days = [[position[number] for number in day] for day in self.result['days']]
+
+    def test_every_scene_is_scheduled_once(self):
+        self.assertEqual(sorted(idx for day in self.days for idx in day), list(range(len(self.problem))))
+
+    def test_night_and_day_work_are_never_mixed(self):
+        for day in self.days:
+            self.assertEqual(len({self.problem.night[idx] for idx in day}), 1)
+
+    def test_days_respect_the_hour_cap(self):
+        for day in self.days:
+            self.assertTrue(optimizer.day_fits(self.problem, day))
+
+    def test_never_worse_than_the_baseline(self):
+        baseline_cost, _ = optimizer.evaluate(self.problem, self.problem.initial_order())
+        self.assertLessEqual(self.result['cost'], round(baseline_cost, 2))
+        self.assertEqual(self.result['cost'], round(optimizer.score_days(self.problem, self.days)[0], 2))
+
+    def test_runs_are_reproducible(self):
+        again = optimizer.optimize(self.problem, time_budget=30, seeds=2, workers=1, max_iterations=300)
+        self.assertEqual(again['days'], self.result['days'])
+
+    def test_repair_leaves_locked_days_untouched(self):
+        days = optimizer.decode(self.problem, self.problem.initial_order())
+        locked = [idx % 2 == 0 for idx in range(len(days))]
+        # Pull the last scene out of every unlocked day and add them back by repair
+        to_place = [day.pop() for day, is_locked in zip(days, locked) if not is_locked and len(day) > 1]
+        original = [list(day) for day in days]
+
+        plan = optimizer.repair(self.problem, days, locked, to_place)
+
+        for source, day in plan:
+            if source is not None and locked[source]:
+                self.assertEqual(day, original[source])
+            self.assertTrue(optimizer.day_fits(self.problem, day))
+        pinned = [source for source, _ in plan if source is not None and locked[source]]
+        self.assertEqual(pinned, [idx for idx, is_locked in enumerate(locked) if is_locked])
+        self.assertEqual(sorted(idx for _, day in plan for idx in day), list(range(len(self.problem))))
+
+
+MONDAY = datetime.date(2026, 3, 2)
+
+
+class PlanDaysTests(SimpleTestCase):
+
+    def test_night_wrap_pushes_the_next_day_call(self):
+        calendar = shoot_calendar.CalendarSettings(rest_weekdays=[], holidays=[])
+
+        plan = shoot_calendar.plan_days([(10, True), (4, False)], calendar, MONDAY)
+
+        self.assertEqual(plan[0][2], datetime.datetime(2026, 3, 3, 4, 0))
+        # 04:00 wrap plus 12h turnaround beats the 08:00 call
+        self.assertEqual(plan[1], (
+            datetime.date(2026, 3, 3), datetime.datetime(2026, 3, 3, 16, 0), datetime.datetime(2026, 3, 3, 20, 0)
+        ))
+
+    def test_holidays_and_rest_days_are_skipped(self):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as holidays:
+            holidays.write('date,name\n2026-03-03,Carnival\n')
+        self.addCleanup(os.remove, path)
+        self.addCleanup(shoot_calendar.clear_cache)
+
+        with override_settings(HOLIDAYS_FILE=path):
+            shoot_calendar.clear_cache()
+            calendar = shoot_calendar.CalendarSettings()
+
+        plan = shoot_calendar.plan_days([(8, False)] * 5, calendar, MONDAY)
+
+        self.assertEqual([date.day for date, _, _ in plan], [2, 4, 5, 6, 9])
+        self.assertTrue(all(call.time() == shoot_calendar.DEFAULT_CALL_TIME for _, call, _ in plan))
+
+
+class MoveDayTests(ScheduleTestCase):
+
+    def _dates(self, schedule):
+        return list(schedule.shoot_days.order_by('order_index', 'day_number').values_list(
+            'day_number', 'date', 'call_time', 'wrap_time'
+        ))
+
+    def test_move_day_keeps_earlier_days(self):
+        schedule, _ = generate_schedule(self.project, time_budget=0.5, seeds=1)
+        shoot_calendar.assign_dates(schedule, MONDAY)
+        before = self._dates(schedule)
+        self.assertGreaterEqual(len(before), 3)
+        moved_number = before[2][0]
+
+        count = shoot_calendar.move_day(schedule, moved_number, MONDAY + datetime.timedelta(days=14))
+
+        after = self._dates(schedule)
+        self.assertEqual(count, len(before) - 2)
+        self.assertEqual(after[:2], before[:2])
+        self.assertGreaterEqual(after[2][1], MONDAY + datetime.timedelta(days=14))
+        dates = [date for _, date, _, _ in after]
+        self.assertEqual(dates, sorted(set(dates)))
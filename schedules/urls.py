@@ -0,0 +1,13 @@
+from django.urls import path
+from . import views
+
+app_name = 'schedules'
+
+urlpatterns = [
+    # Reports (report: dood, locations or holds)
+    path('<uuid:project_id>/<int:version>/reports/<slug:report>/', views.ScheduleReportView.as_view(), name='report'),
+    
+    # Calendar
+    path('<uuid:project_id>/<int:version>/calendar/', views.ScheduleCalendarView.as_view(), name='calendar'),
+    path('<uuid:project_id>/<int:version>/days/<int:day_number>/move/', views.ShootDayMoveView.as_view(), name='move_day'),
+]
@@ -0,0 +1,86 @@
+import datetime
+
+from django.shortcuts import get_object_or_404
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from django.views import View
+
+from .models import Schedule
+from .matrix import get_matrix, day_out_of_days, location_usage, cast_holds
+from .shoot_calendar import assign_dates, move_day
+from projects.models import Project
+
+
+class ScheduleReportView(LoginRequiredMixin, View):
+    """DOOD, location-usage and cast-hold reports for a schedule version"""
+    
+    REPORTS = {
+        'dood': day_out_of_days,
+        'locations': location_usage,
+        'holds': cast_holds,
+    }
+    
+    def get(self, request, project_id, version, report):
+        project = get_object_or_404(Project, id=project_id, company__members__user=request.user)
+        schedule = get_object_or_404(Schedule, project=project, version=version)
+        
+        build_report = self.REPORTS.get(report)
+        if build_report is None:
+            return JsonResponse({
+                'status': 'error',
+                'message': f"Unknown report '{report}'. Use one of: {', '.join(self.REPORTS)}"
+            }, status=404)
+        
+        return JsonResponse({
+            'status': 'success',
+            'schedule_id': str(schedule.id),
+            'version': schedule.version,
+            'report': build_report(get_matrix(schedule))
+        })
+
+
+
+class ScheduleCalendarView(LoginRequiredMixin, View):
+    """Assign dates and call/wrap times to every day of a schedule version"""
+    
+    def post(self, request, project_id, version):
+        project = get_object_or_404(Project, id=project_id, company__members__user=request.user)
+        schedule = get_object_or_404(Schedule, project=project, version=version)
+        
+        try:
+            start_date = datetime.date.fromisoformat(request.POST.get('start_date', ''))
+            options = {}
+            if request.POST.get('rest_weekdays') is not None:
+                options['rest_weekdays'] = [int(day) for day in request.POST.getlist('rest_weekdays') if day != '']
+            if request.POST.get('turnaround_hours'):
+                options['turnaround_hours'] = float(request.POST['turnaround_hours'])
+            if request.POST.get('call_time'):
+                options['call_time'] = datetime.time.fromisoformat(request.POST['call_time'])
+            days_dated = assign_dates(schedule, start_date, **options)
+        except ValueError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+        
+        return JsonResponse({
+            'status': 'success',
+            'days_dated': days_dated,
+            'calendar': schedule.calendar
+        })
+
+
+class ShootDayMoveView(LoginRequiredMixin, View):
+    """Move one shoot day to a new date and reflow the days after it"""
+    
+    def post(self, request, project_id, version, day_number):
+        project = get_object_or_404(Project, id=project_id, company__members__user=request.user)
+        schedule = get_object_or_404(Schedule, project=project, version=version)
+        
+        try:
+            new_date = datetime.date.fromisoformat(request.POST.get('date', ''))
+            days_updated = move_day(schedule, day_number, new_date)
+        except ValueError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+        
+        return JsonResponse({
+            'status': 'success',
+            'days_updated': days_updated
+        })